@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.gis",
+    "django.contrib.postgres",
     "django_htmx",
     "csvexport",
     "leaflet",
@@ -65,7 +66,13 @@ INSTALLED_APPS = [
     "django_browser_reload",
 ]
 
+# Log timings and query counts for each request and send a Server-Timing
+# header, see caim_base/request_metrics.py
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "0") == "1"
+
 MIDDLEWARE = [
+    # First, so it times the other middleware too
+    "caim_base.request_metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -91,6 +98,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "caim_base.context_processors.global_template_variables",
+                "caim_base.context_processors.shortlist",
             ],
         },
     },
@@ -192,7 +200,68 @@ CRISPY_FAIL_SILENTLY = False
 IMAGE_RESIZE_USE_IMAGKIT = os.getenv("IMAGE_RESIZE_USE_IMAGKIT", "0") == "1"
 IMAGE_RESIZE_ORIGIN = os.getenv("IMAGE_RESIZE_ORIGIN", None)
 IMAGE_RESIZE_CDN = os.getenv("IMAGE_RESIZE_CDN", None)
+# Threads per process that resize newly uploaded photos (when not using ImageKit)
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+# Processes per web process that render foster application PDFs, 0 to render
+# them in the request
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "1"))
+
+
+# Cache
+# CACHE_BACKEND is "redis" (shared by all workers, set REDIS_URL), "file"
+# (shared by workers on one machine, set CACHE_DIR) or "locmem" (per process,
+# for local development and tests). Redis is the default if REDIS_URL is set
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "redis" if os.getenv("REDIS_URL") else "locmem"
+)
+# A change only invalidates the cache of the process that made it unless the
+# cache is shared, so nothing is cached for longer than this with locmem
+CACHE_MAX_TIMEOUT = None if CACHE_BACKEND != "locmem" else 60
+# Bump to invalidate everything cached by a previous deploy
+CACHE_VERSION = int(os.getenv("CACHE_VERSION", "1"))
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL", "redis://127.0.0.1:6379"),
+            "KEY_PREFIX": "caim",
+            "VERSION": CACHE_VERSION,
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", "/tmp/caim-cache"),
+            "VERSION": CACHE_VERSION,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "VERSION": CACHE_VERSION,
+        }
+    }
 
+# Foster application PDFs, encrypted (see caim_base.pdf_rendering). Kept
+# apart from the default cache so a per-process cache holds only a few
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "20"))
+CACHES["pdfs"] = {
+    **CACHES["default"],
+    "KEY_PREFIX": "caim-pdf",
+    "OPTIONS": {"MAX_ENTRIES": PDF_CACHE_MAX_ENTRIES},
+}
+if CACHE_BACKEND == "redis":
+    # Redis evicts by its own memory policy
+    del CACHES["pdfs"]["OPTIONS"]
+elif CACHE_BACKEND == "file":
+    CACHES["pdfs"]["LOCATION"] = os.path.join(
+        os.getenv("CACHE_DIR", "/tmp/caim-cache"), "pdfs"
+    )
+else:
+    CACHES["pdfs"]["LOCATION"] = "pdfs"
 
 # Avatar
 AVATAR_GRAVATAR_DEFAULT = "mp"
@@ -202,11 +271,26 @@ LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "filters": {},
+    "formatters": {
+        "request_metrics": {"format": "%(asctime)s request_metrics %(message)s"},
+    },
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
             "stream": "ext://sys.stdout",
-        }
+        },
+        "request_metrics": {
+            "class": "logging.StreamHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": "request_metrics",
+        },
+    },
+    "loggers": {
+        "caim_base.request_metrics": {
+            "handlers": ["request_metrics"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
     "root": {
         "handlers": ["console"],
@@ -251,6 +335,8 @@ if EMAIL_ENABLED:
     EMAIL_USE_TLS = True
     EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
     EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
+    # Connections are kept open between sends, so don't hang on a dead one
+    EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "30"))
 else:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
@@ -258,6 +344,10 @@ TEMPLATED_EMAIL_TEMPLATE_DIR = "emails/"
 TEMPLATED_EMAIL_FILE_EXTENSION = "email"
 DEFAULT_FROM_EMAIL = "notifications@caim.org"
 
+# Sent by the cron rule that requests the saved search digest. The endpoint
+# refuses every request if it isn't set
+SAVED_SEARCH_DIGEST_TOKEN = os.getenv("SAVED_SEARCH_DIGEST_TOKEN")
+
 if PRODUCTION:
     GOOGLE_TAG_MANAGER_ID = "GTM-52CTCWP"
 else:
@@ -94,6 +94,16 @@ urlpatterns = [
         awg.import_animal,
         name="awg_import_animal",
     ),
+    path(
+        "organization/<awg_id>/animals/import/bulk",
+        awg.bulk_import_animals,
+        name="awg_bulk_import_animals",
+    ),
+    path(
+        "organization/<awg_id>/animals/import/bulk/<import_id>",
+        awg.bulk_import_status,
+        name="awg_bulk_import_status",
+    ),
     path(
         "organization/<awg_id>/animals/<animal_id>",
         awg.edit_animal,
@@ -122,6 +132,11 @@ urlpatterns = [
         awg.list_applications,
         name="awg_list_applications",
     ),
+    path(
+        "organization/<awg_id>/applications/download",
+        awg.download_applications,
+        name="awg_download_applications",
+    ),
     path(
         "organization/<awg_id>/applications/<application_id>",
         awg.update_application_status_submit_modal,
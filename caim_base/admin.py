@@ -1,8 +1,10 @@
 from csvexport.actions import csvexport
 from django.contrib import admin
+from django.utils import timezone
 from leaflet.admin import LeafletGeoAdmin
 
 from .admin_widgets import AdminImageMixin
+from .animal_search import text_search
 from .models.animals import (
     Animal,
     AnimalComment,
@@ -10,9 +12,13 @@ from .models.animals import (
     AnimalSubComment,
     Awg,
     Breed,
+    PetfinderImport,
+    SavedSearchDigestRun,
     User,
 )
 from .models.awg import AwgMember
+from .models.outbox import OutboxMessage
+from .models.salesforce import SalesforceContactSync
 from .models.fosterer import (
     FostererProfile,
     FosterApplication,
@@ -57,9 +63,19 @@ class AnimalAdmin(AdminImageMixin, admin.ModelAdmin):
         "age",
         "primary_breed",
     )
+    # Only so the search box is shown, see get_search_results
     search_fields = ["name"]
     list_filter = ["animal_type", "awg"]
 
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed text search instead of an ILIKE scan of names. The change
+        # list applies its own ordering, so the rank isn't used
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        match, _ = text_search(search_term)
+        return queryset.filter(match), False
+
 
 class AwgMemberInline(AdminImageMixin, admin.StackedInline):
     model = AwgMember
@@ -112,3 +128,70 @@ admin.site.register(Awg, AwgAdmin)
 admin.site.register(AnimalComment, CommentAdmin)
 admin.site.register(FostererProfile, FostererProfileAdmin)
 admin.site.register(FosterApplication)
+
+
+@admin.register(SavedSearchDigestRun)
+class SavedSearchDigestRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "checked_at",
+        "started_at",
+        "finished_at",
+        "is_active",
+        "last_saved_search_id",
+        "emails_sent",
+    )
+
+
+@admin.register(PetfinderImport)
+class PetfinderImportAdmin(admin.ModelAdmin):
+    list_display = ("awg", "created_by", "status", "created_at", "finished_at")
+    list_filter = ("status",)
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        "notification",
+        "object_model",
+        "object_id",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "sent_at",
+    )
+    list_filter = ("status", "notification")
+    search_fields = ("dedup_key",)
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected messages")
+    def retry(self, request, queryset):
+        queryset.exclude(status=OutboxMessage.Statuses.SENT).update(
+            status=OutboxMessage.Statuses.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+
+
+@admin.register(SalesforceContactSync)
+class SalesforceContactSyncAdmin(admin.ModelAdmin):
+    list_display = (
+        "user_profile",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "updated_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = ("created_at", "updated_at", "last_error")
+    actions = ["retry"]
+
+    @admin.action(description="Retry selected contacts")
+    def retry(self, request, queryset):
+        queryset.update(
+            status=SalesforceContactSync.Statuses.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
@@ -21,7 +21,7 @@ class AdminImageWidget(forms.ClearableFileInput):
         )  # Using <label> causes a layout issue with the clear button
         if value and hasattr(value, "url"):
             try:
-                mini_url = image_resize(value.url, "80x80")
+                mini_url = image_resize(value, "80x80")
             except Exception as e:
                 logger.warning("Unable to get the thumbnail", exc_info=e)
             else:
@@ -1,38 +1,102 @@
-import os
-import requests
 import json
 import html
-import urllib.request
+import logging
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .breed_resolver import breed_resolver
+from .caching import invalidate_keys, make_key
 from .models import animals
-from django.core.files import File
+from .photo_fetcher import (
+    REQUEST_TIMEOUT,
+    PhotoFetchError,
+    delete_photos,
+    fetch_photos,
+    get_session,
+)
+from .search_index import update_search_vectors
+from .thumbnails import schedule_renditions
+
+logger = logging.getLogger(__name__)
+
+# Petfinder pages fetched at once during a bulk import, and the most fetched
+# a second
+BULK_WORKERS = 4
+BULK_RATE = 2
+
+# A running import that hasn't recorded progress for this long is assumed
+# to belong to a worker that died, and is run again
+STALE_IMPORT_AFTER = timedelta(minutes=15)
 
 
 class ImportAnimalError(Exception):
     pass
 
 
+class PetfinderPageError(ImportAnimalError):
+    """A Petfinder page doesn't have the animal data in the expected form"""
+
+
+class PageDataNotFound(PetfinderPageError):
+    pass
+
+
+class PageDataInvalid(PetfinderPageError):
+    pass
+
+
+# Petfinder animal pages set this to a JSON object with the animal's data
+PAGE_CONFIG_MARKER = b"global.PF.pageConfig ="
+
+_json_decoder = json.JSONDecoder()
+
+
 def load_html(url):
+    """The page at url, as bytes"""
     headers = {
         "User-Agent": (
             "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1; SV1;"
             " .NET CLR 1.0.3705; .NET CLR 1.1.4322)"
         )
     }
-    response = requests.get(url, headers=headers)
+    response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
     response.raise_for_status()
-    return response.content.decode("UTF-8")
+    return response.content
 
 
-def extract_animal_data(html):
+def extract_animal_data(page):
+    """
+    The animal data from a Petfinder animal page, as bytes or str.
+
+    Finds the page config with one scan of the raw bytes, and only decodes
+    and parses the JSON after it. Raises PageDataNotFound if there is no
+    page config, or PageDataInvalid if it can't be parsed or has no animal.
+    """
+    if isinstance(page, str):
+        page = page.encode("UTF-8")
+    start = page.find(PAGE_CONFIG_MARKER)
+    if start == -1:
+        raise PageDataNotFound("No Petfinder animal data found on the page.")
+    start += len(PAGE_CONFIG_MARKER)
+    # The JSON ends before the end of its script tag. raw_decode stops at the
+    # end of the object, so whatever follows it is ignored
+    end = page.find(b"</script>", start)
+    span = page[start:end] if end != -1 else page[start:]
     try:
-        lines = html.split("\n")
-        for line in lines:
-            if "global.PF.pageConfig =" in line:
-                json_data = (line.partition("=")[2]).rstrip(" ;")
-                return json.loads(json_data)["animal"]
-    except Exception as e:
-        print(e)
-        return None
+        config, _ = _json_decoder.raw_decode(
+            span.decode("UTF-8", errors="replace").lstrip()
+        )
+    except ValueError as e:
+        raise PageDataInvalid("The animal data on the page couldn't be read.") from e
+    if not isinstance(config, dict) or not isinstance(config.get("animal"), dict):
+        raise PageDataInvalid("The page isn't a Petfinder animal page.")
+    return config["animal"]
 
 
 def clean_text(str):
@@ -57,6 +121,8 @@ def map_size(str):
         return animals.Animal.AnimalSize.M
     if str == "large":
         return animals.Animal.AnimalSize.L
+    if str == "extra large":
+        return animals.Animal.AnimalSize.XL
     return None
 
 
@@ -77,21 +143,34 @@ def map_sex(v):
     return None
 
 
-def lookup_breed(pfbreed, is_primary):
-    breed = animals.Breed.objects.filter(slug=pfbreed["slug"]).first()
-    if not breed and is_primary:
-        breed = animals.Breed.objects.filter(slug="unknown-dog").first()
-    return breed
+def resolve_breeds(data, animal_type):
+    """
+    Ids of a Petfinder animal's (primary, secondary) breeds. A primary breed
+    we don't have falls back to the animal type's unknown breed.
+    """
+    primary_breed_id = None
+    secondary_breed_id = None
+    if data.get("primary_breed"):
+        primary_breed_id = breed_resolver.resolve(
+            data["primary_breed"]["slug"], animal_type, fallback=True
+        )
+    if data.get("secondary_breed"):
+        secondary_breed_id = breed_resolver.resolve(
+            data["secondary_breed"]["slug"], animal_type
+        )
+    return primary_breed_id, secondary_breed_id
+
 
+# Animal fields that can't be empty, and that Petfinder may not give a value
+# we have for (eg a sex of "Unknown")
+REQUIRED_FIELDS = ("sex", "size", "age")
 
-def create_animal_from_petfinder_data(awg, data):
-    primary_breed = None
-    secondary_breed = None
-    if "primary_breed" in data and data["primary_breed"]:
-        primary_breed = lookup_breed(data["primary_breed"], True)
-    if "secondary_breed" in data and data["secondary_breed"]:
-        secondary_breed = lookup_breed(data["primary_breed"], False)
 
+def build_animal(awg, data):
+    """
+    An unsaved Animal from a Petfinder animal page's data. Raises
+    ImportAnimalError if the data doesn't give one of REQUIRED_FIELDS.
+    """
     animal_size = map_size(data["size"].lower())
 
     animal_type = animals.AnimalType.DOG
@@ -99,11 +178,12 @@ def create_animal_from_petfinder_data(awg, data):
         animal_type = animals.AnimalType.CAT
         animal_size = animals.Animal.AnimalSize.S
 
+    primary_breed_id, secondary_breed_id = resolve_breeds(data, animal_type)
     animal = animals.Animal(
         name=clean_text(data["name"]),
         animal_type=animal_type,
-        primary_breed=primary_breed,
-        secondary_breed=secondary_breed,
+        primary_breed_id=primary_breed_id,
+        secondary_breed_id=secondary_breed_id,
         petfinder_id=data["id"],
         awg=awg,
         is_mixed_breed=data["is_mixed_breed"],
@@ -127,22 +207,48 @@ def create_animal_from_petfinder_data(awg, data):
             data["home_environment_attributes"].get("good_with_cats", False)
         ),
     )
-    image_url = data["primary_photo_url"]
-    img_result = urllib.request.urlretrieve(image_url)
-    animal.primary_photo.save(
-        os.path.basename(image_url), File(open(img_result[0], "rb"))
-    )
-    animal.save()
-
-    if data["photo_urls"]:
-        for image_url in data["photo_urls"]:
-            if image_url != data["primary_photo_url"]:
-                ai = animals.AnimalImage(animal=animal)
-                img_result = urllib.request.urlretrieve(image_url)
-                ai.photo.save(
-                    os.path.basename(image_url), File(open(img_result[0], "rb"))
-                )
-                ai.save()
+    missing = [field for field in REQUIRED_FIELDS if not getattr(animal, field)]
+    if missing:
+        raise ImportAnimalError(
+            f"The animal's {' and '.join(missing)} on Petfinder isn't one we"
+            " support."
+        )
+    return animal
+
+
+def photo_urls(data):
+    """The animal's photo URLs, primary photo first"""
+    primary_url = data.get("primary_photo_url")
+    if not primary_url:
+        return []
+    return [primary_url] + [
+        url for url in data["photo_urls"] or [] if url != primary_url
+    ]
+
+
+def create_animal_from_petfinder_data(awg, data):
+    animal = build_animal(awg, data)
+
+    # Download every photo at once, straight into storage
+    photo_field = animals.Animal._meta.get_field("primary_photo")
+    photos = fetch_photos(photo_urls(data), photo_field)
+    if photos and isinstance(photos[0], PhotoFetchError):
+        delete_photos(photos, photo_field)
+        raise photos[0]
+
+    # The animal and its images are saved together, so if either fails
+    # nothing refers to the photos and they can be deleted
+    try:
+        with transaction.atomic():
+            if photos:
+                animal.primary_photo = photos[0]
+            animal.save()
+            for photo in photos[1:]:
+                if not isinstance(photo, PhotoFetchError):
+                    animals.AnimalImage.objects.create(animal=animal, photo=photo)
+    except Exception:
+        delete_photos(photos, photo_field)
+        raise
     return animal
 
 
@@ -161,17 +267,25 @@ def import_animal_from_petfinder(awg, url):
         print(e)
         raise ImportAnimalError("Could not load webpage. Please check URL.") from e
 
-    data = extract_animal_data(html)
-    if not data:
+    try:
+        data = extract_animal_data(html)
+    except PetfinderPageError as e:
+        print(e)
         raise ImportAnimalError(
             "Could not extract animal data from page. Please check URL."
-        )
+        ) from e
     print(data)
 
     try:
         animal = create_animal_from_petfinder_data(awg, data)
     except Exception as e:
         print(e)
+        if isinstance(e, ImportAnimalError):
+            raise
+        if isinstance(e, PhotoFetchError):
+            raise ImportAnimalError(
+                "Could not download the animal's photo. Please try again."
+            ) from e
         if e.__class__.__name__ == "IntegrityError":
             error_message = "We had a problem putting this animal in our database."
             if "petfinder_id" in e.__str__():
@@ -181,3 +295,275 @@ def import_animal_from_petfinder(awg, url):
             raise ImportAnimalError("Could not create animal. Please check URL.") from e
 
     return animal
+
+
+class RateLimiter:
+    """Spaces out calls to wait(), from any thread, to at most rate a second"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+def _fetch_page_data(url, limiter):
+    if "www.petfinder.com" not in url:
+        raise ImportAnimalError("Not a www.petfinder.com URL.")
+    limiter.wait()
+    try:
+        page_html = load_html(url)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Could not load %s: %s", url, e)
+        raise ImportAnimalError("Could not load webpage.") from e
+    return extract_animal_data(page_html)
+
+
+def import_animals_from_petfinder(
+    awg, urls=(), pages=(), workers=BULK_WORKERS, rate=BULK_RATE, progress=None
+):
+    """
+    Import many animals for an AWG at once, from Petfinder animal page URLs
+    and/or saved pages given as (name, html bytes) pairs.
+
+    Pages are fetched concurrently, no more than rate a second, breeds are
+    resolved with breed_resolver, then every photo is downloaded
+    concurrently and the animals are inserted with
+    bulk_create in one transaction. progress(stage, done, total) is called as
+    pages and photos are fetched.
+
+    Returns (animals, errors), errors being (url or page name, message) for
+    each page that couldn't be imported.
+    """
+    report = progress or (lambda stage, done, total: None)
+    errors = []
+    items = []
+
+    for name, page_html in pages:
+        try:
+            items.append((name, extract_animal_data(page_html)))
+        except ImportAnimalError as e:
+            errors.append((name, str(e)))
+
+    if urls:
+        limiter = RateLimiter(rate)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_fetch_page_data, url, limiter) for url in urls]
+            for done, _ in enumerate(as_completed(futures), 1):
+                report("pages", done, len(futures))
+        for url, future in zip(urls, futures):
+            try:
+                items.append((url, future.result()))
+            except ImportAnimalError as e:
+                errors.append((url, str(e)))
+
+    # Skip animals that have already been imported, or are listed twice
+    existing = set(
+        animals.Animal.objects.filter(
+            petfinder_id__in=[str(data.get("id")) for _, data in items]
+        ).values_list("petfinder_id", flat=True)
+    )
+    to_import = []
+    for source, data in items:
+        petfinder_id = str(data.get("id"))
+        if petfinder_id in existing:
+            errors.append((source, "An animal with this PetFinder ID already exists."))
+            continue
+        existing.add(petfinder_id)
+        try:
+            animal = build_animal(awg, data)
+            animal_photo_urls = photo_urls(data)
+        except ImportAnimalError as e:
+            errors.append((source, str(e)))
+            continue
+        except (KeyError, AttributeError, TypeError) as e:
+            logger.warning("Could not read Petfinder data from %s: %r", source, e)
+            errors.append((source, "Could not read the animal data on the page."))
+            continue
+        to_import.append((source, animal, animal_photo_urls))
+
+    photo_field = animals.Animal._meta.get_field("primary_photo")
+    photos = iter(
+        fetch_photos(
+            [url for _, _, animal_photo_urls in to_import for url in animal_photo_urls],
+            photo_field,
+            progress=lambda done, total: report("photos", done, total),
+        )
+    )
+    created = []
+    images = []
+    for source, animal, animal_photo_urls in to_import:
+        animal_photos = [next(photos) for _ in animal_photo_urls]
+        if animal_photos and isinstance(animal_photos[0], PhotoFetchError):
+            delete_photos(animal_photos, photo_field)
+            errors.append((source, "Could not download the animal's photo."))
+            continue
+        if animal_photos:
+            animal.primary_photo = animal_photos[0]
+        created.append(animal)
+        images.extend(
+            animals.AnimalImage(animal=animal, photo=photo)
+            for photo in animal_photos[1:]
+            if not isinstance(photo, PhotoFetchError)
+        )
+
+    try:
+        with transaction.atomic():
+            # Imported animals aren't published, so Animal.save and the
+            # search index have nothing to do, but they need search vectors
+            animals.Animal.objects.bulk_create(created)
+            animals.AnimalImage.objects.bulk_create(images)
+            update_search_vectors(
+                animals.Animal.objects.filter(id__in=[a.id for a in created])
+            )
+    except Exception:
+        delete_photos(
+            [animal.primary_photo.name for animal in created]
+            + [image.photo.name for image in images],
+            photo_field,
+        )
+        raise
+
+    # bulk_create doesn't send post_save
+    for instance in created + images:
+        schedule_renditions(instance)
+    invalidate_keys(*(make_key("animal", animal.pk) for animal in created))
+    return created, errors
+
+
+def queue_petfinder_import(awg, user, urls, pages):
+    """
+    Queue a PetfinderImport for the run_petfinder_imports worker, from page
+    URLs and uploaded saved pages. It can take longer than the request
+    timeout, so isn't run in the request.
+    """
+    with transaction.atomic():
+        petfinder_import = animals.PetfinderImport.objects.create(
+            awg=awg,
+            created_by=user,
+            urls=urls,
+            total=len(pages) + len(urls),
+        )
+        animals.PetfinderImportPage.objects.bulk_create(
+            animals.PetfinderImportPage(
+                petfinder_import=petfinder_import, name=page.name, html=page.read()
+            )
+            for page in pages
+        )
+    return petfinder_import
+
+
+def claim_petfinder_import():
+    """
+    Mark the oldest pending import as running and return it, or None. Imports
+    being claimed by another worker are skipped, and running imports that
+    haven't recorded progress for STALE_IMPORT_AFTER (eg the worker was
+    restarted) are run again.
+    """
+    statuses = animals.PetfinderImport.Statuses
+    with transaction.atomic():
+        petfinder_import = (
+            animals.PetfinderImport.objects.select_for_update(skip_locked=True)
+            .select_related("awg")
+            .filter(
+                Q(status=statuses.PENDING)
+                | Q(
+                    status=statuses.RUNNING,
+                    updated_at__lt=timezone.now() - STALE_IMPORT_AFTER,
+                )
+            )
+            .order_by("created_at")
+            .first()
+        )
+        if petfinder_import:
+            petfinder_import.status = statuses.RUNNING
+            petfinder_import.save(update_fields=["status", "updated_at"])
+    return petfinder_import
+
+
+def retry_petfinder_import(petfinder_import):
+    """
+    Queue a failed import to run again from its URLs and saved pages.
+    Returns False if it hadn't failed.
+    """
+    statuses = animals.PetfinderImport.Statuses
+    retried = animals.PetfinderImport.objects.filter(
+        pk=petfinder_import.pk, status=statuses.FAILED
+    ).update(
+        status=statuses.PENDING,
+        stage="",
+        done=0,
+        animal_ids=[],
+        errors=[],
+        finished_at=None,
+        updated_at=timezone.now(),
+    )
+    return bool(retried)
+
+
+def run_pending_imports():
+    """Run queued imports one at a time until none are left, returning how many"""
+    count = 0
+    while petfinder_import := claim_petfinder_import():
+        try:
+            run_petfinder_import(petfinder_import)
+        except Exception:  # pylint: disable=broad-except
+            # Recorded as failed on the import
+            logger.exception("Petfinder import #%s failed", petfinder_import.pk)
+        count += 1
+    return count
+
+
+def run_petfinder_import(petfinder_import):
+    """Run a PetfinderImport, recording its progress and outcome on the row"""
+    statuses = animals.PetfinderImport.Statuses
+    queryset = animals.PetfinderImport.objects.filter(pk=petfinder_import.pk)
+    queryset.update(status=statuses.RUNNING, updated_at=timezone.now())
+    last_update = 0
+
+    def progress(stage, done, total):
+        nonlocal last_update
+        # Record progress at most once a second
+        if done < total and time.monotonic() - last_update < 1:
+            return
+        last_update = time.monotonic()
+        queryset.update(stage=stage, done=done, total=total, updated_at=timezone.now())
+
+    try:
+        pages = [
+            (page.name, bytes(page.html))
+            for page in petfinder_import.saved_pages.order_by("id")
+        ]
+        created, errors = import_animals_from_petfinder(
+            petfinder_import.awg,
+            urls=petfinder_import.urls,
+            pages=pages,
+            progress=progress,
+        )
+    except Exception:
+        # The saved pages are kept, see retry_petfinder_import
+        petfinder_import.status = statuses.FAILED
+        raise
+    else:
+        petfinder_import.status = statuses.DONE
+        petfinder_import.animal_ids = [animal.id for animal in created]
+        petfinder_import.errors = errors
+        petfinder_import.saved_pages.all().delete()
+    finally:
+        petfinder_import.finished_at = timezone.now()
+        petfinder_import.save(
+            update_fields=[
+                "status",
+                "animal_ids",
+                "errors",
+                "finished_at",
+                "updated_at",
+            ]
+        )
+    return petfinder_import
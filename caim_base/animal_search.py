@@ -1,16 +1,122 @@
+import math
 from datetime import timedelta, datetime
 from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Polygon
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
 from django.core.exceptions import BadRequest
-from django.db.models import Q
-from .models.animals import Animal, AnimalShortList
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from .breed_resolver import breed_resolver
+from .models.animals import Animal
 from .models.awg import Awg
-from .models.geo import ZipCode
+from .models.search_index import AnimalSearchIndex
+from .search_index import SEARCH_CONFIG
+from .shortlist import get_shortlist_ids
+from .zip_resolver import zip_resolver
 
 
-# This function deals with searching for animals with certain common filters
+MILES_TO_METERS = 1609.34
+# Sphere radius used by PostGIS ST_DistanceSphere, which the exact distance
+# checks use
+EARTH_RADIUS_METERS = 6370986
+# Widens the prefilters a little, so rounding never drops an animal the
+# exact check would keep
+RADIUS_MARGIN = 1.01
 
 
-def query_animals(
+def radius_degrees(lat, radius_meters):
+    """
+    Half the height and width, in degrees, of the smallest lon/lat envelope
+    containing every point within radius_meters of a point at latitude lat,
+    plus RADIUS_MARGIN. The width is None if the circle reaches a pole, in
+    which case it covers every longitude.
+    """
+    angle = radius_meters / EARTH_RADIUS_METERS
+    lat_delta = math.degrees(angle) * RADIUS_MARGIN
+    # The circle's widest point isn't at lat but nearer the pole, this is
+    # the longitude of its tangent meridian
+    sin_ratio = math.sin(angle) / math.cos(math.radians(lat))
+    if abs(lat) + lat_delta >= 90 or sin_ratio >= 1:
+        return lat_delta, None
+    return lat_delta, math.degrees(math.asin(sin_ratio)) * RADIUS_MARGIN
+
+
+def radius_bounding_box(point, radius_meters):
+    """
+    Lon/lat envelope containing every point within radius_meters of point.
+    Returns None if the envelope would wrap around the antimeridian or cover
+    a pole, in which case callers should skip the prefilter and rely on the
+    exact distance check.
+    """
+    lat_delta, lon_delta = radius_degrees(point.y, radius_meters)
+    if lon_delta is None:
+        return None
+    min_x, max_x = point.x - lon_delta, point.x + lon_delta
+    if min_x < -180 or max_x > 180:
+        return None
+    box = Polygon.from_bbox((min_x, point.y - lat_delta, max_x, point.y + lat_delta))
+    box.srid = point.srid or 4326
+    return box
+
+
+def text_search(q, prefix=""):
+    """
+    Filter and rank expression for a free text search of animals. Matches
+    Animal.search_vector (name, breeds, description and special needs) or
+    names similar to q, so typos in names still match. prefix is the path to
+    the Animal, eg "animal__" from AnimalSearchIndex.
+    Returns (Q, rank), higher ranks being better matches.
+    """
+    query = SearchQuery(q, config=SEARCH_CONFIG, search_type="websearch")
+    match = Q(**{f"{prefix}search_vector": query}) | Q(
+        **{f"{prefix}name__trigram_similar": q}
+    )
+    # ts_rank and similarity are single precision. As a double the rank reads
+    # back exactly, so it can be compared with a pagination cursor
+    rank = Cast(
+        SearchRank(F(f"{prefix}search_vector"), query)
+        + TrigramSimilarity(f"{prefix}name", q),
+        FloatField(),
+    )
+    return match, rank
+
+
+def _animal_breed(breed):
+    return Q(primary_breed__slug=breed) | Q(secondary_breed__slug=breed)
+
+
+def _index_breed(breed):
+    breed_id = breed_resolver.resolve(breed)
+    if breed_id is None:
+        return None
+    return Q(breed_ids__contains=[breed_id])
+
+
+# Where _filter_animals finds each filter on Animal and on AnimalSearchIndex.
+# "breed" returns the Q for a breed slug, or None if nothing can match
+ANIMAL_FIELDS = {
+    "id": "id",
+    "geo_location": "awg__geo_location",
+    "text_prefix": "",
+    "breed": _animal_breed,
+    "goodwith_cats": ("behaviour_cats", Animal.AnimalBehaviourGrade.GOOD),
+    "goodwith_dogs": ("behaviour_dogs", Animal.AnimalBehaviourGrade.GOOD),
+    "goodwith_kids": ("behaviour_kids", Animal.AnimalBehaviourGrade.GOOD),
+}
+SEARCH_INDEX_FIELDS = {
+    "id": "animal_id",
+    "geo_location": "geo_location",
+    "text_prefix": "animal__",
+    "breed": _index_breed,
+    "goodwith_cats": ("good_with_cats", True),
+    "goodwith_dogs": ("good_with_dogs", True),
+    "goodwith_kids": ("good_with_kids", True),
+}
+
+
+def _filter_animals(
+    query,
+    fields,
     user,
     animal_type=None,
     zip=None,
@@ -26,32 +132,26 @@ def query_animals(
     goodwith_kids=None,
     shortlist=False,
     sort="-created_at",
-    hide_unpublished_animals=True,
-    hide_unpublished_awgs=True,
     published_since=None,
+    q=None,
 ):
-    query = Animal.objects.prefetch_related("primary_breed", "secondary_breed", "awg")
-
+    """
+    The search filters and sort shared by query_animals and search_animals,
+    applied to query, a queryset of Animal or AnimalSearchIndex. fields is
+    ANIMAL_FIELDS or SEARCH_INDEX_FIELDS.
+    """
     if animal_type:
         query = query.filter(animal_type=animal_type)
 
-    if hide_unpublished_animals:
-        query = query.filter(is_published=True)
-
-    if hide_unpublished_awgs:
-        query = query.filter(awg__status=Awg.AwgStatus.PUBLISHED)
-
     if published_since:
         query = query.filter(first_published_at__gt=published_since)
 
-    zip_info = None
+    zip_location = None
     if zip:
-        zip_info = ZipCode.objects.filter(zip_code=zip).first()
-        if not zip_info:
+        zip_location = zip_resolver.get_point(zip)
+        if not zip_location:
             raise BadRequest("Invalid ZIP parameter")
-        query = query.annotate(
-            distance=Distance("awg__geo_location", zip_info.geo_location)
-        )
+        query = query.annotate(distance=Distance(fields["geo_location"], zip_location))
 
     if age:
         query = query.filter(age=age.upper())
@@ -72,29 +172,93 @@ def query_animals(
         query = query.filter(sex=sex.upper())
 
     if breed:
-        query = query.filter(
-            Q(primary_breed__slug=breed) | Q(secondary_breed__slug=breed)
-        )
+        match = fields["breed"](breed)
+        if match is None:
+            return query.none()
+        query = query.filter(match)
 
-    if goodwith_cats:
-        query = query.filter(behaviour_cats=Animal.AnimalBehaviourGrade.GOOD)
+    for name, wanted in (
+        ("goodwith_cats", goodwith_cats),
+        ("goodwith_dogs", goodwith_dogs),
+        ("goodwith_kids", goodwith_kids),
+    ):
+        if wanted:
+            field, value = fields[name]
+            query = query.filter(**{field: value})
 
-    if goodwith_dogs:
-        query = query.filter(behaviour_dogs=Animal.AnimalBehaviourGrade.GOOD)
-
-    if goodwith_kids:
-        query = query.filter(behaviour_kids=Animal.AnimalBehaviourGrade.GOOD)
+    if q:
+        match, rank = text_search(q, prefix=fields["text_prefix"])
+        query = query.filter(match).annotate(rank=rank)
 
     if radius and zip:
-        radius_meters = radius * 1609.34  # Miles to meters
+        radius_meters = radius * MILES_TO_METERS
+        # Cheap bounding box test first so it can use the GiST index on the
+        # location, then the exact distance check on what is left
+        box = radius_bounding_box(zip_location, radius_meters)
+        if box:
+            query = query.filter(**{f"{fields['geo_location']}__bboverlaps": box})
         query = query.filter(distance__lte=radius_meters)
 
     if sort:
-        query = query.order_by(sort, "id")
+        query = query.order_by(sort, fields["id"])
 
     if shortlist and user.is_authenticated:
-        shortlists = AnimalShortList.objects.filter(user=user.id)
-        shortlist_animal_ids = [s.animal_id for s in shortlists]
-        query = query.filter(id__in=shortlist_animal_ids)
+        query = query.filter(**{f"{fields['id']}__in": get_shortlist_ids(user)})
 
     return query
+
+
+# This function deals with searching for animals with certain common filters
+
+
+def query_animals(
+    user,
+    hide_unpublished_animals=True,
+    hide_unpublished_awgs=True,
+    **filters,
+):
+    """
+    Animals matching filters, see _filter_animals for what they are.
+    Includes unpublished animals and AWGs if asked to.
+    """
+    query = Animal.objects.select_related("primary_breed", "secondary_breed", "awg")
+
+    if hide_unpublished_animals:
+        query = query.filter(is_published=True)
+
+    if hide_unpublished_awgs:
+        query = query.filter(awg__status=Awg.AwgStatus.PUBLISHED)
+
+    return _filter_animals(query, ANIMAL_FIELDS, user, **filters)
+
+
+def search_animals(user, **filters):
+    """
+    query_animals for publicly visible animals, filtering and sorting the
+    AnimalSearchIndex table without joining Awg or Breed (a text search, q,
+    joins Animal). Returns a queryset of index rows, page it with
+    KeysetPaginator(..., load=load_animals).
+    """
+    return _filter_animals(
+        AnimalSearchIndex.objects.all(), SEARCH_INDEX_FIELDS, user, **filters
+    )
+
+
+def load_animals(rows):
+    """
+    The animals for a list of AnimalSearchIndex rows, in the same order,
+    with their AWG and breeds, and distance if the rows have it
+    """
+    animals = Animal.objects.select_related(
+        "awg", "primary_breed", "secondary_breed"
+    ).in_bulk([row.animal_id for row in rows])
+    result = []
+    for row in rows:
+        animal = animals.get(row.animal_id)
+        # Deleted since the index was read
+        if animal is None:
+            continue
+        if hasattr(row, "distance"):
+            animal.distance = row.distance
+        result.append(animal)
+    return result
@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class CaimBaseConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "caim_base"
+
+    def ready(self):
+        # Connect the signal handlers that keep the caches and search index
+        # in sync, including in management commands that never import the
+        # views
+        # pylint: disable=import-outside-toplevel,unused-import
+        from . import (  # noqa: F401
+            awg_permissions,
+            breed_resolver,
+            cached_models,
+            pdf_rendering,
+            search_index,
+            shortlist,
+            zip_resolver,
+        )
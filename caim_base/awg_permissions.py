@@ -0,0 +1,91 @@
+from enum import IntFlag
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models.awg import AwgMember
+
+
+class AwgPermission(IntFlag):
+    EDIT_PROFILE = 1
+    MANAGE_ANIMALS = 2
+    MANAGE_MEMBERS = 4
+    MANAGE_APPLICATIONS = 8
+    VIEW_APPLICATIONS = 16
+
+    def __contains__(self, other):
+        # So templates can check by name: {% if 'MANAGE_ANIMALS' in perms %}
+        if isinstance(other, str):
+            other = AwgPermission.__members__.get(other)
+            if other is None:
+                return False
+        return super().__contains__(other)
+
+
+# CAIM staff can do everything in every AWG
+STAFF_PERMISSIONS = (
+    AwgPermission.EDIT_PROFILE
+    | AwgPermission.MANAGE_ANIMALS
+    | AwgPermission.MANAGE_MEMBERS
+    | AwgPermission.MANAGE_APPLICATIONS
+)
+
+_MEMBER_FIELDS = (
+    ("canEditProfile", AwgPermission.EDIT_PROFILE),
+    ("canManageAnimals", AwgPermission.MANAGE_ANIMALS),
+    ("canManageMembers", AwgPermission.MANAGE_MEMBERS),
+    ("canManageApplications", AwgPermission.MANAGE_APPLICATIONS),
+    ("canViewApplications", AwgPermission.VIEW_APPLICATIONS),
+)
+
+# Bumped whenever a membership changes, so memberships loaded earlier in a
+# request are loaded again
+_generation = 0
+
+
+def _load_memberships(user):
+    """{awg id: AwgPermission} for every AWG the user is a member of"""
+    memberships = {}
+    rows = AwgMember.objects.filter(user=user).values_list(
+        "awg_id", *(field for field, _ in _MEMBER_FIELDS)
+    )
+    for awg_id, *flags in rows:
+        permissions = AwgPermission(0)
+        for flag, (_, permission) in zip(flags, _MEMBER_FIELDS):
+            if flag:
+                permissions |= permission
+        memberships[awg_id] = permissions
+    return memberships
+
+
+def _memberships(request):
+    """
+    The user's memberships, loaded with one query the first time they are
+    needed in a request
+    """
+    if not request.user.is_authenticated:
+        return {}
+    cached = getattr(request, "_awg_memberships", None)
+    if cached is None or cached[0] != _generation:
+        cached = (_generation, _load_memberships(request.user))
+        request._awg_memberships = cached  # pylint: disable=protected-access
+    return cached[1]
+
+
+def is_awg_member(request, awg):
+    return awg.id in _memberships(request)
+
+
+def get_awg_permissions(request, awg) -> AwgPermission:
+    """What the request's user can do in awg"""
+    permissions = _memberships(request).get(awg.id, AwgPermission(0))
+    if request.user.is_authenticated and request.user.is_staff:
+        permissions |= STAFF_PERMISSIONS
+    return permissions
+
+
+@receiver(post_save, sender=AwgMember)
+@receiver(post_delete, sender=AwgMember)
+def invalidate_memberships(sender, instance, **kwargs):
+    global _generation  # pylint: disable=global-statement
+    _generation += 1
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import cache_aside, invalidate_namespace, versioned_key
+from .models.animals import AnimalType, Breed
+
+logger = logging.getLogger(__name__)
+
+
+class BreedRow(NamedTuple):
+    id: int
+    slug: str
+    name: str
+    animal_type: str
+
+
+class BreedResolver:
+    """
+    Resolves breed slugs to Breed ids from an in-memory copy of the Breed
+    table (a few hundred rows), loaded once per process and kept in the
+    shared cache, instead of a query per lookup.
+
+    Slugs that aren't known for the animal type can fall back to the type's
+    unknown breed. Saving or deleting a Breed invalidates the copy in the
+    current process and the shared cache. Other processes reload after
+    max_age seconds.
+    """
+
+    max_age = 60 * 60
+
+    # Breed used for each animal type when a breed isn't known
+    fallback_slugs = {
+        AnimalType.DOG: "unknown-dog",
+        AnimalType.CAT: "unknown-cat",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._by_slug: Dict[str, BreedRow] = {}
+
+    def invalidate(self):
+        invalidate_namespace("breeds")
+        self._loaded_at = None
+
+    def _is_fresh(self):
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.max_age
+        )
+
+    def _table(self) -> Dict[str, BreedRow]:
+        if not self._is_fresh():
+            with self._lock:
+                if not self._is_fresh():
+                    self._by_slug = cache_aside(
+                        versioned_key("breeds", "table"), self._load_table
+                    )
+                    self._loaded_at = time.monotonic()
+        return self._by_slug
+
+    @staticmethod
+    def _load_table():
+        rows = Breed.objects.order_by("name").values_list(
+            "id", "slug", "name", "animal_type"
+        )
+        table = {row[1]: BreedRow(*row) for row in rows}
+        logger.info("Loaded %d breeds", len(table))
+        return table
+
+    def get(self, slug, animal_type=None) -> Optional[BreedRow]:
+        """The breed with this slug, if it is for animal_type (when given)"""
+        breed = self._table().get(slug) if slug else None
+        if breed and animal_type and breed.animal_type != animal_type:
+            return None
+        return breed
+
+    def fallback(self, animal_type) -> Optional[int]:
+        """Id of the unknown breed for the animal type, if there is one"""
+        breed = self.get(self.fallback_slugs.get(animal_type), animal_type)
+        return breed.id if breed else None
+
+    def resolve(self, slug, animal_type=None, fallback=False) -> Optional[int]:
+        """
+        Id of the breed with this slug. If it isn't known for animal_type,
+        the type's unknown breed when fallback is set, else None.
+        """
+        breed = self.get(slug, animal_type)
+        if breed:
+            return breed.id
+        return self.fallback(animal_type) if fallback else None
+
+    def resolve_many(
+        self, slugs: Iterable[str], animal_type=None, fallback=False
+    ) -> Dict[str, Optional[int]]:
+        """resolve() for a batch of slugs, as a dict of slug to id"""
+        return {slug: self.resolve(slug, animal_type, fallback) for slug in slugs}
+
+    def choices(self, animal_type=None) -> List[BreedRow]:
+        """Breeds for an animal type, or all of them, by name"""
+        return [
+            breed
+            for breed in self._table().values()
+            if not animal_type or breed.animal_type == animal_type
+        ]
+
+
+breed_resolver = BreedResolver()
+
+
+@receiver(post_save, sender=Breed)
+@receiver(post_delete, sender=Breed)
+def invalidate_breed_resolver(sender, **kwargs):
+    breed_resolver.invalidate()
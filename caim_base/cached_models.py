@@ -0,0 +1,50 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import cache_aside, invalidate_keys, make_key
+from .models.animals import Animal, Breed
+from .models.awg import Awg
+
+
+def get_awg(awg_id):
+    """The AWG with this id, or None"""
+    return cache_aside(
+        make_key("awg", awg_id), lambda: Awg.objects.filter(pk=awg_id).first()
+    )
+
+
+def get_animal(animal_id):
+    """The animal with this id, with its AWG and breeds loaded, or None"""
+    return cache_aside(
+        make_key("animal", animal_id),
+        lambda: Animal.objects.select_related("awg", "primary_breed", "secondary_breed")
+        .filter(pk=animal_id)
+        .first(),
+    )
+
+
+@receiver(post_save, sender=Breed)
+@receiver(post_delete, sender=Breed)
+def invalidate_breed(sender, instance, **kwargs):
+    # Cached animals include their breeds. breed_resolver invalidates itself
+    animal_ids = Animal.objects.filter(
+        Q(primary_breed=instance.pk) | Q(secondary_breed=instance.pk)
+    ).values_list("id", flat=True)
+    invalidate_keys(*(make_key("animal", i) for i in animal_ids))
+
+
+@receiver(post_save, sender=Awg)
+@receiver(post_delete, sender=Awg)
+def invalidate_awg(sender, instance, **kwargs):
+    # Cached animals include their AWG
+    animal_ids = Animal.objects.filter(awg=instance.pk).values_list("id", flat=True)
+    invalidate_keys(
+        make_key("awg", instance.pk), *(make_key("animal", i) for i in animal_ids)
+    )
+
+
+@receiver(post_save, sender=Animal)
+@receiver(post_delete, sender=Animal)
+def invalidate_animal(sender, instance, **kwargs):
+    invalidate_keys(make_key("animal", instance.pk))
@@ -0,0 +1,106 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60 * 60
+
+_MISSING = object()
+
+
+def make_key(namespace, *parts):
+    return ":".join([namespace, *(str(part) for part in parts)])
+
+
+def _version_key(namespace):
+    return make_key(namespace, "version")
+
+
+def namespace_version(namespace):
+    """
+    Current version of a namespace. Keys built with versioned_key include it,
+    so bump_namespace invalidates every key in the namespace at once.
+    """
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # A clock based version can't collide with keys written before the
+        # version was evicted
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_namespace(namespace):
+    cache.set(_version_key(namespace), time.time_ns(), None)
+
+
+def versioned_key(namespace, *parts):
+    return make_key(namespace, f"v{namespace_version(namespace)}", *parts)
+
+
+def _timeout(timeout):
+    """timeout, capped at CACHE_MAX_TIMEOUT if set"""
+    limit = getattr(settings, "CACHE_MAX_TIMEOUT", None)
+    if limit is None:
+        return timeout
+    if timeout is None:
+        return limit
+    return min(timeout, limit)
+
+
+def cache_aside(key, loader, timeout=DEFAULT_TIMEOUT):
+    """
+    Returns the cached value for key, or calls loader() and caches what it
+    returns (including None). If the cache is unavailable the value is
+    loaded every time rather than failing the request.
+    """
+    try:
+        value = cache.get(key, _MISSING)
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Cache get failed for %s", key, exc_info=True)
+        return loader()
+    if value is not _MISSING:
+        return value
+    value = loader()
+    cache_set(key, value, timeout)
+    return value
+
+
+def cache_set(key, value, timeout=DEFAULT_TIMEOUT, using="default"):
+    """
+    cache.set, on the cache using, that logs rather than raises if the
+    cache is unavailable
+    """
+    try:
+        caches[using].set(key, value, _timeout(timeout))
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Cache set failed for %s", key, exc_info=True)
+
+
+def _now_and_on_commit(fn):
+    """
+    Run fn now, and again once the transaction commits. Otherwise a request
+    reading between the two could cache the old rows again.
+    """
+
+    def run():
+        try:
+            fn()
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Cache invalidation failed", exc_info=True)
+
+    run()
+    transaction.on_commit(run)
+
+
+def invalidate_keys(*keys):
+    _now_and_on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_namespace(namespace):
+    _now_and_on_commit(lambda: bump_namespace(namespace))
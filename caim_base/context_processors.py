@@ -1,4 +1,7 @@
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .shortlist import get_shortlist_ids
 
 
 # These variables are always inserted into all page templates
@@ -7,3 +10,10 @@ def global_template_variables(request):
         "isProduction": settings.PRODUCTION,
         "googleTagManagerId": settings.GOOGLE_TAG_MANAGER_ID,
     }
+
+
+def shortlist(request):
+    # Only looked up if the page shows animal cards
+    return {
+        "shortlistAnimalIds": SimpleLazyObject(lambda: get_shortlist_ids(request.user)),
+    }
@@ -0,0 +1,163 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.core.mail import get_connection
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from templated_email import get_templated_mail
+
+logger = logging.getLogger(__name__)
+
+# Messages handed to the backend per send_messages call
+BATCH_SIZE = 100
+
+# Attempts per message on transient failures, and the delay before the first
+# retry in seconds (doubled after each attempt)
+MAX_ATTEMPTS = 4
+BACKOFF = 1.0
+
+# One open connection per thread, reused across calls
+_local = threading.local()
+
+
+class DeliveryError(Exception):
+    pass
+
+
+def _is_transient(error):
+    # 4xx replies are temporary failures the server expects us to retry
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # Socket errors, but not eg SMTPNotSupportedError
+    return not isinstance(error, smtplib.SMTPException)
+
+
+def _is_rejection(error):
+    """The server refused this one message, but will accept others"""
+    return isinstance(
+        error,
+        (
+            smtplib.SMTPRecipientsRefused,
+            smtplib.SMTPSenderRefused,
+            smtplib.SMTPDataError,
+        ),
+    )
+
+
+def get_pooled_connection():
+    """
+    The email backend connection for this thread, opened on first use and
+    kept open for later sends
+    """
+    connection = getattr(_local, "connection", None)
+    # A forked process inherits the parent's socket, which it must not use
+    if connection is not None and _local.pid != os.getpid():
+        connection = None
+    if connection is None:
+        connection = get_connection()
+        connection.open()
+        _local.connection = connection
+        _local.pid = os.getpid()
+    return connection
+
+
+def close_pooled_connection():
+    connection = getattr(_local, "connection", None)
+    _local.connection = None
+    if connection is not None and _local.pid == os.getpid():
+        try:
+            connection.close()
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Error closing email connection", exc_info=True)
+
+
+@receiver(setting_changed)
+def _reset_connection(setting, **kwargs):
+    # eg tests overriding EMAIL_BACKEND
+    if setting.startswith("EMAIL_"):
+        close_pooled_connection()
+
+
+def _send_batch(batch, sent):
+    """
+    Send a batch on the pooled connection, appending each message to sent once
+    the backend has sent it. If the backend raises, sent tells us exactly
+    which messages went out so none are sent twice.
+    """
+
+    def track():
+        for message in batch:
+            yield message
+            # The backend only asks for the next message once this one is sent
+            sent.append(message)
+
+    get_pooled_connection().send_messages(track())
+
+
+def send_messages(messages, batch_size=BATCH_SIZE, attempts=MAX_ATTEMPTS, backoff=None):
+    """
+    Send email messages over this thread's pooled connection, batch_size at
+    a time.
+
+    Transient failures (dropped connections, 4xx replies) reconnect and retry
+    from the failed message with exponential backoff, raising DeliveryError
+    once a message has failed attempts times. Messages the server rejects
+    outright are logged and skipped.
+
+    Returns the number of messages sent.
+    """
+    backoff = BACKOFF if backoff is None else backoff
+    messages = list(messages)
+    num_sent = 0
+    failures = 0
+    position = 0
+    while position < len(messages):
+        batch = messages[position : position + batch_size]
+        sent = []
+        try:
+            _send_batch(batch, sent)
+        except OSError as e:  # smtplib errors are OSErrors too
+            failed = batch[len(sent)]
+            if sent:
+                # Failures are counted per message
+                failures = 0
+            if _is_transient(e):
+                close_pooled_connection()
+                failures += 1
+                if failures >= attempts:
+                    raise DeliveryError(f"Failed to send email to {failed.to}") from e
+                delay = backoff * 2 ** (failures - 1)
+                logger.warning(
+                    "Email to %s failed, retrying in %.1fs: %s", failed.to, delay, e
+                )
+                time.sleep(delay)
+            elif _is_rejection(e):
+                logger.error("Email to %s rejected: %s", failed.to, e)
+                sent.append(None)
+                failures = 0
+            else:
+                raise DeliveryError(f"Failed to send email to {failed.to}") from e
+        else:
+            failures = 0
+        num_sent += len([m for m in sent if m is not None])
+        position += len(sent)
+    return num_sent
+
+
+def send_message(message):
+    return send_messages([message])
+
+
+def send_templated_mail(template_name, context, from_email, recipient_list, **kwargs):
+    """templated_email.send_templated_mail, sent on the pooled connection"""
+    message = get_templated_mail(
+        template_name, context, from_email=from_email, to=recipient_list, **kwargs
+    )
+    return send_message(message)
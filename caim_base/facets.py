@@ -0,0 +1,157 @@
+import hashlib
+import json
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, Q, Value
+
+from .animal_search import SEARCH_INDEX_FIELDS, search_animals
+from .caching import cache_aside, make_key
+
+# Counts go stale as animals are published, but a minute old is close enough
+# for a filter sidebar
+FACETS_TIMEOUT = 60
+
+GROUPED_FACETS = ("age", "size", "sex")
+GOOD_WITH_FACETS = ("good_with_cats", "good_with_dogs", "good_with_kids")
+# Facets that are counted without their own filter, so picking an age still
+# shows how many there are of each other age. (A good with count is the
+# same either way, it only counts the animals that are.)
+SELECTABLE_FACETS = (*GROUPED_FACETS, "breed")
+
+# Everything is counted in one statement: the rows matching every filter
+# except the selectable facets' are read once into a CTE, with a column per
+# selectable facet saying if the row passes that facet's filter. Each facet
+# is counted over the rows passing all the other facets' filters, and the
+# total and good with counts over the rows passing them all. Breeds, which
+# are an array, are counted from the unnested rows.
+FACETS_SQL = """
+WITH matches AS ({matches})
+SELECT
+    'total', NULL, NULL,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE good_with_cats),
+    COUNT(*) FILTER (WHERE good_with_dogs),
+    COUNT(*) FILTER (WHERE good_with_kids)
+FROM matches
+WHERE {where[total]}
+UNION ALL
+SELECT 'age', age, NULL, COUNT(*), 0, 0, 0
+FROM matches
+WHERE {where[age]}
+GROUP BY age
+UNION ALL
+SELECT 'size', size, NULL, COUNT(*), 0, 0, 0
+FROM matches
+WHERE {where[size]}
+GROUP BY size
+UNION ALL
+SELECT 'sex', sex, NULL, COUNT(*), 0, 0, 0
+FROM matches
+WHERE {where[sex]}
+GROUP BY sex
+UNION ALL
+SELECT 'breed', NULL, breed_id, COUNT(DISTINCT animal_id), 0, 0, 0
+FROM matches, unnest(breed_ids) AS breed_id
+WHERE {where[breed]}
+GROUP BY breed_id
+"""
+
+
+def _facet_filter(facet, value):
+    """
+    Expression for whether a row passes search_animals' filter for facet,
+    as in animal_search._filter_animals
+    """
+    if not value:
+        return Value(True)
+    if facet == "breed":
+        match = SEARCH_INDEX_FIELDS["breed"](value)
+        if match is None:
+            # Nothing can match
+            return Value(False)
+    else:
+        match = Q(**{facet: value.upper()})
+    return ExpressionWrapper(match, output_field=BooleanField())
+
+
+def _passes(facets):
+    return " AND ".join(f"matches_{facet}" for facet in facets)
+
+
+def count_facets(user, search):
+    """
+    Facet counts for the animals matching search (search_animals arguments).
+    Returns {"total": n, "age": {value: n}, "size": ..., "sex": ...,
+    "breed": {breed id: n}, "good_with_cats": n, ...}. The counts for a
+    facet ignore the search's filter on that facet.
+    """
+    unfaceted = {**search, **{facet: None for facet in SELECTABLE_FACETS}}
+    matches = (
+        search_animals(user, **unfaceted)
+        .order_by()
+        .annotate(
+            **{
+                f"matches_{facet}": _facet_filter(facet, search.get(facet))
+                for facet in SELECTABLE_FACETS
+            }
+        )
+        .values(
+            "animal_id",
+            *GROUPED_FACETS,
+            *GOOD_WITH_FACETS,
+            "breed_ids",
+            *(f"matches_{facet}" for facet in SELECTABLE_FACETS),
+        )
+    )
+    counts = {"total": 0, "breed": {}}
+    for facet in GROUPED_FACETS:
+        counts[facet] = {}
+    for facet in GOOD_WITH_FACETS:
+        counts[facet] = 0
+    try:
+        sql, params = matches.query.sql_with_params()
+    except EmptyResultSet:
+        # eg an empty shortlist
+        return counts
+
+    where = {"total": _passes(SELECTABLE_FACETS)}
+    for facet in SELECTABLE_FACETS:
+        where[facet] = _passes(other for other in SELECTABLE_FACETS if other != facet)
+    with connection.cursor() as cursor:
+        cursor.execute(FACETS_SQL.format(matches=sql, where=where), params)
+        for facet, value, breed_id, count, *good_with in cursor:
+            if facet == "total":
+                counts["total"] = count
+                counts.update(zip(GOOD_WITH_FACETS, good_with))
+            elif facet == "breed":
+                counts["breed"][breed_id] = count
+            else:
+                counts[facet][value] = count
+    return counts
+
+
+def facets_key(search):
+    """Cache key for the facet counts of a search_animals search"""
+    signature = json.dumps(
+        {name: value for name, value in search.items() if value and name != "sort"},
+        sort_keys=True,
+        default=str,
+    )
+    return make_key("facets", hashlib.sha1(signature.encode()).hexdigest())
+
+
+def get_facets(user, search):
+    """
+    Facet counts for the animals matching search (search_animals arguments),
+    cached for FACETS_TIMEOUT seconds per set of filters
+    """
+    search = {**search, "sort": None}
+
+    def load():
+        return count_facets(user, search)
+
+    # Shortlists are per user, so not worth caching
+    if search.get("shortlist") and user.is_authenticated:
+        return load()
+    return cache_aside(facets_key(search), load, FACETS_TIMEOUT)
@@ -1,18 +1,45 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import ValidationError
-from django.db.models import Q
 
 from .models.awg import User
-from .models.geo import ZipCode
 from .states import form_states
+from .zip_resolver import zip_resolver
 
 
 def zip_validator(zip_code: str):
-    if not ZipCode.objects.filter(Q(zip_code=zip_code)).exists():
+    if not zip_resolver.is_valid(zip_code):
         raise ValidationError("Invalid US zip code")
 
 
+class MultipleFileInput(forms.ClearableFileInput):
+    """File input that lets several files be chosen at once"""
+
+    allow_multiple_selected = True
+
+    def __init__(self, attrs=None):
+        super().__init__({**(attrs or {}), "multiple": True})
+
+    def value_from_datadict(self, data, files, name):
+        return files.getlist(name)
+
+
+class MultipleFileField(forms.FileField):
+    """FileField for a MultipleFileInput, cleaned to a list of files"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        if not data:
+            # Raises if the field is required
+            super().clean(None, initial)
+            return []
+        clean_file = super().clean
+        return [clean_file(file, initial) for file in data]
+
+
 class NewUserForm(UserCreationForm):
     email = forms.EmailField()
     first_name = forms.CharField(widget=forms.TextInput(attrs={"autofocus": ""}))
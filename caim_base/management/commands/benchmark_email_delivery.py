@@ -0,0 +1,62 @@
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Sink
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from caim_base.email_delivery import close_pooled_connection, send_messages
+
+
+class Command(BaseCommand):
+    help = (
+        "Time sending emails one connection per message versus over the pooled"
+        " connection, against a local SMTP server that discards everything"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if settings.PRODUCTION:
+            raise CommandError("Cannot run benchmarks in production")
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        controller = Controller(Sink(), hostname="127.0.0.1", port=port)
+        controller.start()
+        try:
+            with override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+                EMAIL_HOST="127.0.0.1",
+                EMAIL_PORT=port,
+                EMAIL_USE_TLS=False,
+            ):
+                self.run(options["messages"])
+        finally:
+            controller.stop()
+
+    def run(self, count):
+        messages = [
+            EmailMessage("Benchmark", "Body", to=[f"benchmark{i}@example.com"])
+            for i in range(count)
+        ]
+
+        start = time.perf_counter()
+        for message in messages:
+            message.send()
+        unpooled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        send_messages(messages)
+        close_pooled_connection()
+        pooled = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{count} messages, connection per message: {unpooled * 1000:.0f}ms"
+        )
+        self.stdout.write(f"{count} messages, pooled: {pooled * 1000:.0f}ms")
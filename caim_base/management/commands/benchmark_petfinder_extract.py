@@ -0,0 +1,58 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from caim_base.animal_petfinder_import import extract_animal_data
+
+FIXTURES = Path(__file__).resolve().parents[2] / "tests" / "fixtures" / "petfinder"
+
+
+def extract_by_lines(page):
+    """The previous extractor, decoding the page and splitting it into lines"""
+    for line in page.decode("UTF-8").split("\n"):
+        if "global.PF.pageConfig =" in line:
+            return json.loads(line.partition("=")[2].rstrip(" ;"))["animal"]
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Pages per second extracting the animal data from saved Petfinder"
+        " pages, by splitting lines versus extract_animal_data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages",
+            default=str(FIXTURES),
+            help="Directory of saved Petfinder animal pages (*.html)",
+        )
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        if settings.PRODUCTION:
+            raise CommandError("Cannot run benchmarks in production")
+
+        pages = [path.read_bytes() for path in Path(options["pages"]).glob("*.html")]
+        if not pages:
+            raise CommandError(f"No .html pages in {options['pages']}")
+        for page in pages:
+            if extract_by_lines(page) != extract_animal_data(page):
+                raise CommandError("Extractors disagree")
+
+        size_kb = sum(len(page) for page in pages) / len(pages) / 1024
+        self.stdout.write(f"{len(pages)} pages, {size_kb:.0f}KB on average")
+        for name, extract in (
+            ("split lines", extract_by_lines),
+            ("extract_animal_data", extract_animal_data),
+        ):
+            start = time.perf_counter()
+            for _ in range(options["iterations"]):
+                for page in pages:
+                    extract(page)
+            elapsed = time.perf_counter() - start
+            rate = options["iterations"] * len(pages) / elapsed
+            self.stdout.write(f"{name}: {rate:.0f} pages/s")
@@ -0,0 +1,151 @@
+import csv
+import os
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from caim_base import search_index
+from caim_base.animal_search import load_animals, search_animals
+from caim_base.models.animals import Animal, AnimalType, Breed
+from caim_base.models.awg import Awg
+from caim_base.models.geo import ZipCode
+from caim_base.zip_resolver import zip_resolver
+
+ZIPS_FILE = os.path.join(settings.BASE_DIR, "seed_data", "zips.txt")
+
+
+def read_zips():
+    with open(ZIPS_FILE) as csv_file:
+        return [
+            (row[0], float(row[1]), float(row[2]))
+            for row in csv.reader(csv_file, delimiter=",")
+        ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed N published animals across seed_data/zips.txt and time browse"
+        " queries at different radii. Seeded rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--animals", type=int, default=10000)
+        parser.add_argument("--animals-per-awg", type=int, default=20)
+        parser.add_argument("--radii", default="10,50,100,500")
+        parser.add_argument("--samples", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=21)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--keep", action="store_true", help="Commit the seeded rows"
+        )
+
+    def handle(self, *args, **options):
+        if settings.PRODUCTION:
+            raise CommandError("Cannot run benchmarks in production")
+
+        rng = random.Random(options["seed"])
+        radii = [int(r) for r in options["radii"].split(",")]
+
+        with transaction.atomic():
+            zips = self.seed(
+                rng, options["animals"], max(1, options["animals_per_awg"])
+            )
+            for radius in radii:
+                self.time_radius(rng, zips, radius, options)
+            if not options["keep"]:
+                transaction.set_rollback(True)
+        # The cached ZIP table may include ZIPs that were rolled back
+        zip_resolver.invalidate()
+
+    def seed(self, rng, num_animals, animals_per_awg):
+        all_zips = read_zips()
+        num_awgs = min(len(all_zips), max(1, num_animals // animals_per_awg))
+        zips = rng.sample(all_zips, num_awgs)
+
+        ZipCode.objects.bulk_create(
+            [
+                ZipCode(zip_code=zip_code, geo_location=Point(lng, lat))
+                for zip_code, lat, lng in zips
+            ],
+            ignore_conflicts=True,
+        )
+        # bulk_create doesn't send post_save, so drop any cached ZIP table
+        zip_resolver.invalidate()
+
+        breed, _ = Breed.objects.get_or_create(
+            slug="benchmark-dog",
+            defaults={"name": "Benchmark dog", "animal_type": AnimalType.DOG},
+        )
+
+        # bulk_create skips Awg.save(), so geo_location is set directly
+        awgs = Awg.objects.bulk_create(
+            [
+                Awg(
+                    name=f"Benchmark AWG {zip_code}",
+                    zip_code=zip_code,
+                    state="NY",
+                    geo_location=Point(lng, lat),
+                    status=Awg.AwgStatus.PUBLISHED,
+                )
+                for zip_code, lat, lng in zips
+            ]
+        )
+
+        start = time.perf_counter()
+        Animal.objects.bulk_create(
+            (
+                Animal(
+                    name=f"Benchmark {i}",
+                    awg=awgs[i % len(awgs)],
+                    primary_breed=breed,
+                    is_published=True,
+                    is_mixed_breed=False,
+                    is_unknown_breed=False,
+                    sex=rng.choice(Animal.AnimalSex.values),
+                    size=rng.choice(Animal.AnimalSize.values),
+                    age=rng.choice(Animal.AnimalAge.values),
+                    is_spayed_neutered=True,
+                    is_vaccinations_current=True,
+                    is_special_needs=False,
+                    is_euth_listed=False,
+                    primary_photo="benchmark.jpg",
+                )
+                for i in range(num_animals)
+            ),
+            batch_size=5000,
+        )
+        # bulk_create doesn't send post_save either, so index them directly
+        search_index.rebuild(batch_size=5000)
+        self.stdout.write(
+            f"Seeded {num_animals} animals across {len(awgs)} AWGs"
+            f" in {time.perf_counter() - start:.1f}s"
+        )
+        return zips
+
+    def time_radius(self, rng, zips, radius, options):
+        timings = []
+        counts = []
+        for _ in range(options["samples"]):
+            zip_code = rng.choice(zips)[0]
+            start = time.perf_counter()
+            query = search_animals(
+                AnonymousUser(), zip=zip_code, radius=radius, sort="distance"
+            )
+            load_animals(list(query[: options["page_size"]]))
+            counts.append(query.count())
+            timings.append((time.perf_counter() - start) * 1000)
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"radius={radius}mi"
+            f" median={statistics.median(timings):.1f}ms"
+            f" p95={p95:.1f}ms"
+            f" avg_matches={statistics.mean(counts):.0f}"
+        )
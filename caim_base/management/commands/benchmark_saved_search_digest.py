@@ -0,0 +1,154 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from caim_base.management.commands.benchmark_radius_search import read_zips
+from caim_base.models.animals import Animal, AnimalType, Breed, SavedSearch
+from caim_base.models.awg import Awg
+from caim_base.saved_search_digest import (
+    checked_since,
+    due_saved_searches,
+    fetch_new_animals,
+    match_saved_searches,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed saved searches and newly published animals, then time each phase"
+        " of the saved search digest matcher. No emails are sent and seeded rows"
+        " are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--saved-searches", type=int, default=100000)
+        parser.add_argument("--animals", type=int, default=500)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if settings.PRODUCTION:
+            raise CommandError("Cannot run benchmarks in production")
+
+        rng = random.Random(options["seed"])
+        with transaction.atomic():
+            self.seed(rng, options)
+            self.run()
+            transaction.set_rollback(True)
+
+    def seed(self, rng, options):
+        zips = read_zips()
+        start = timezone.now() - timedelta(days=2)
+        breeds = Breed.objects.bulk_create(
+            [
+                Breed(
+                    name=f"Benchmark {i}",
+                    slug=f"benchmark-{i}",
+                    animal_type=AnimalType.DOG,
+                )
+                for i in range(10)
+            ]
+        )
+        users = User.objects.bulk_create(
+            [
+                User(username=f"benchmark{i}", email=f"benchmark{i}@example.com")
+                for i in range(options["users"])
+            ]
+        )
+
+        # bulk_create skips SavedSearch.save(), so geo_location is set directly
+        def saved_search(i):
+            zip_code, lat, lng = rng.choice(zips)
+            return SavedSearch(
+                user=users[i % len(users)],
+                name=f"Benchmark {i}",
+                animal_type=AnimalType.DOG,
+                zip_code=zip_code,
+                geo_location=Point(lng, lat),
+                radius=rng.choice([None, 10, 50, 100, 500]),
+                age=rng.choice([None] + Animal.AnimalAge.values),
+                size=rng.choice([None] + Animal.AnimalSize.values),
+                sex=rng.choice([None] + Animal.AnimalSex.values),
+                breed=rng.choice([None] * 4 + breeds),
+                goodwith_cats=rng.random() < 0.2,
+                goodwith_dogs=rng.random() < 0.2,
+                goodwith_kids=rng.random() < 0.2,
+            )
+
+        SavedSearch.objects.bulk_create(
+            (saved_search(i) for i in range(options["saved_searches"])),
+            batch_size=5000,
+        )
+        # created_at is auto_now_add, so backdate it to before the animals
+        SavedSearch.objects.filter(user__in=users).update(created_at=start)
+
+        awgs = Awg.objects.bulk_create(
+            [
+                Awg(
+                    name=f"Benchmark AWG {zip_code}",
+                    zip_code=zip_code,
+                    state="NY",
+                    geo_location=Point(lng, lat),
+                    status=Awg.AwgStatus.PUBLISHED,
+                )
+                for zip_code, lat, lng in rng.sample(zips, 200)
+            ]
+        )
+        Animal.objects.bulk_create(
+            [
+                Animal(
+                    name=f"Benchmark {i}",
+                    awg=rng.choice(awgs),
+                    primary_breed=rng.choice(breeds),
+                    is_published=True,
+                    is_mixed_breed=False,
+                    is_unknown_breed=False,
+                    sex=rng.choice(Animal.AnimalSex.values),
+                    size=rng.choice(Animal.AnimalSize.values),
+                    age=rng.choice(Animal.AnimalAge.values),
+                    behaviour_cats=rng.choice(Animal.AnimalBehaviourGrade.values),
+                    behaviour_dogs=rng.choice(Animal.AnimalBehaviourGrade.values),
+                    behaviour_kids=rng.choice(Animal.AnimalBehaviourGrade.values),
+                    is_spayed_neutered=True,
+                    is_vaccinations_current=True,
+                    is_special_needs=False,
+                    is_euth_listed=False,
+                    primary_photo="benchmark.jpg",
+                    first_published_at=start + timedelta(hours=1),
+                )
+                for i in range(options["animals"])
+            ]
+        )
+
+    def run(self):
+        now = timezone.now()
+
+        start = time.perf_counter()
+        saved_searches = list(due_saved_searches(now))
+        due_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        since = min(checked_since(s) for s in saved_searches)
+        animals = fetch_new_animals(since)
+        fetch_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        matches = match_saved_searches(saved_searches, animals)
+        match_ms = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(f"Load {len(saved_searches)} due searches: {due_ms:.0f}ms")
+        self.stdout.write(f"Fetch {len(animals)} new animals: {fetch_ms:.0f}ms")
+        self.stdout.write(
+            f"Match: {match_ms:.0f}ms,"
+            f" {len(matches)} searches with matches,"
+            f" {sum(len(m) for m in matches.values())} animals in total"
+        )
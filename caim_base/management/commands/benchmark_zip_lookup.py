@@ -0,0 +1,48 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from caim_base.models.geo import ZipCode
+from caim_base.zip_resolver import zip_resolver
+
+
+class Command(BaseCommand):
+    help = "Compare ZIP lookups through the ORM with the in-memory zip_resolver"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lookups", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if settings.PRODUCTION:
+            raise CommandError("Cannot run benchmarks in production")
+
+        zip_codes = list(ZipCode.objects.values_list("zip_code", flat=True))
+        if not zip_codes:
+            raise CommandError("ZipCode table is empty, run load_zips first")
+        rng = random.Random(options["seed"])
+        sample = [rng.choice(zip_codes) for _ in range(options["lookups"])]
+
+        start = time.perf_counter()
+        for zip_code in sample:
+            ZipCode.objects.filter(zip_code=zip_code).first()
+        orm_us = (time.perf_counter() - start) * 1e6 / len(sample)
+
+        zip_resolver.invalidate()
+        start = time.perf_counter()
+        zip_resolver.lookup(sample[0])
+        load_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for zip_code in sample:
+            zip_resolver.get_point(zip_code)
+        resolver_us = (time.perf_counter() - start) * 1e6 / len(sample)
+
+        self.stdout.write(f"ORM: {orm_us:.1f}us per lookup")
+        self.stdout.write(
+            f"zip_resolver: {resolver_us:.1f}us per lookup,"
+            f" {load_ms:.0f}ms to load {len(zip_codes)} ZIPs,"
+            f" {zip_resolver.memory_usage() / 1024:.0f}KB"
+        )
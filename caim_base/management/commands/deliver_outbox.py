@@ -0,0 +1,45 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from caim_base.outbox import deliver_pending
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued notification emails from the outbox. Runs until stopped,"
+        " checking for new messages every --poll-interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--poll-interval", type=float, default=5)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send everything that is due and exit",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = deliver_pending(
+                    threads=options["threads"], batch_size=options["batch_size"]
+                )
+            except Exception:  # pylint: disable=broad-except
+                # Eg the database restarting. Keep polling rather than leaving
+                # notifications queued until the container restarts. Claimed
+                # messages are reclaimed after CLAIM_TIMEOUT
+                logger.exception("Delivering the outbox failed")
+            else:
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} notifications, {failed} failed")
+            if options["once"]:
+                return
+            close_old_connections()
+            time.sleep(options["poll_interval"])
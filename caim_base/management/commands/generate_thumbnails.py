@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from caim_base.models.animals import Animal, AnimalImage
+from caim_base.thumbnails import RENDITIONS, generate_renditions, needs_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized copies of animal photos that don't have them yet,"
+        " eg photos uploaded before they were generated on save"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate every rendition, eg after changing RENDITIONS",
+        )
+
+    def handle(self, *args, **options):
+        todo = []
+        for model in (Animal, AnimalImage):
+            for label, field_name in RENDITIONS:
+                if label != model._meta.label_lower:
+                    continue
+                for instance in model.objects.exclude(**{field_name: ""}).iterator():
+                    if options["force"] or needs_renditions(instance, field_name):
+                        todo.append((instance, field_name))
+
+        self.stdout.write(f"Generating renditions of {len(todo)} photos")
+        failed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = [
+                pool.submit(generate_renditions, instance, field_name)
+                for instance, field_name in todo
+            ]
+            for (instance, field_name), future in zip(todo, futures):
+                try:
+                    future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    failed += 1
+                    self.stderr.write(
+                        f"{instance._meta.label} #{instance.pk} {field_name}: {e}"
+                    )
+        self.stdout.write(
+            self.style.SUCCESS(f"Done, {len(todo) - failed} ok, {failed} failed")
+        )
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from caim_base.animal_petfinder_import import (
+    BULK_RATE,
+    BULK_WORKERS,
+    import_animals_from_petfinder,
+    run_petfinder_import,
+)
+from caim_base.models.animals import PetfinderImport
+from caim_base.models.awg import Awg
+
+
+class Command(BaseCommand):
+    help = (
+        "Import many animals from Petfinder for an AWG, from animal page URLs"
+        " and/or animal pages saved as HTML"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("awg_id", nargs="?", type=int)
+        parser.add_argument(
+            "--urls",
+            help="File of Petfinder animal page URLs, one per line",
+        )
+        parser.add_argument(
+            "--page",
+            action="append",
+            default=[],
+            help="A saved Petfinder animal page (can be given more than once)",
+        )
+        parser.add_argument("--workers", type=int, default=BULK_WORKERS)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=BULK_RATE,
+            help="Most Petfinder pages to fetch a second",
+        )
+        parser.add_argument(
+            "--import-id",
+            type=int,
+            help="Run an import queued from the website",
+        )
+
+    def handle(self, *args, **options):
+        if options["import_id"]:
+            petfinder_import = PetfinderImport.objects.select_related("awg").get(
+                pk=options["import_id"]
+            )
+            run_petfinder_import(petfinder_import)
+            return
+
+        if not options["awg_id"]:
+            raise CommandError("Give an AWG id, or --import-id")
+        awg = Awg.objects.filter(pk=options["awg_id"]).first()
+        if not awg:
+            raise CommandError(f"No AWG with id {options['awg_id']}")
+
+        urls = []
+        if options["urls"]:
+            lines = Path(options["urls"]).read_text(encoding="UTF-8").splitlines()
+            urls = [line.strip() for line in lines if line.strip()]
+        pages = [(path, Path(path).read_bytes()) for path in options["page"]]
+        if not urls and not pages:
+            raise CommandError("Nothing to import, give --urls and/or --page")
+
+        def progress(stage, done, total):
+            self.stdout.write(f"\r{stage}: {done}/{total}", ending="")
+            if done == total:
+                self.stdout.write("")
+
+        created, errors = import_animals_from_petfinder(
+            awg,
+            urls=urls,
+            pages=pages,
+            workers=options["workers"],
+            rate=options["rate"],
+            progress=progress,
+        )
+        for source, message in errors:
+            self.stdout.write(self.style.WARNING(f"{source}: {message}"))
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {len(created)} animals, {len(errors)} failed")
+        )
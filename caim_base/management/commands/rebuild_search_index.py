@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from caim_base import search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the animal search index from scratch, eg after animals or AWGs"
+        " were changed with queryset update() or bulk_create"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = search_index.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(f"Indexed {count} animals")
@@ -0,0 +1,41 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from caim_base.animal_petfinder_import import run_pending_imports
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run Petfinder bulk imports queued from the website, one at a time."
+        " Runs until stopped, checking for new imports every --poll-interval"
+        " seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=5)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every queued import and exit",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                count = run_pending_imports()
+            except Exception:  # pylint: disable=broad-except
+                # Eg the database restarting. Keep polling rather than
+                # leaving imports queued until the container restarts
+                logger.exception("Running Petfinder imports failed")
+            else:
+                if count:
+                    self.stdout.write(f"Ran {count} Petfinder imports")
+            if options["once"]:
+                return
+            close_old_connections()
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,52 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from caim_base.saved_search_digest import run_requested_digest
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the saved search digest when the hourly cron rule requests it."
+        " Runs until stopped, checking for requests every --poll-interval"
+        " seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--poll-interval", type=float, default=5)
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes to match and send chunks in",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the digest if it has been requested and exit",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                stats = run_requested_digest(
+                    chunk_size=options["chunk_size"], workers=options["workers"]
+                )
+            except Exception:  # pylint: disable=broad-except
+                # The run is checkpointed, so the next request resumes it
+                logger.exception("Saved search digest failed")
+            else:
+                if stats:
+                    self.stdout.write(
+                        f"Checked {stats['searches']} saved searches."
+                        f" Sent {stats['emails']} emails"
+                    )
+            if options["once"]:
+                return
+            close_old_connections()
+            time.sleep(options["poll_interval"])
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from caim_base.saved_search_digest import AlreadyRunningError, run_saved_search_digest
+
+
+class Command(BaseCommand):
+    help = (
+        "Email users about animals published since their saved searches were"
+        " last checked. Interrupted runs resume from their last checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes to match and send chunks in",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Match and render emails without sending or saving anything",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Discard the checkpoint of an interrupted run and start over",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            stats = run_saved_search_digest(
+                chunk_size=options["chunk_size"],
+                workers=options["workers"],
+                dry_run=options["dry_run"],
+                restart=options["restart"],
+            )
+        except AlreadyRunningError as e:
+            self.stdout.write(self.style.WARNING(str(e)))
+            return
+
+        verb = "Would send" if options["dry_run"] else "Sent"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {stats['searches']} saved searches."
+                f" {verb} {stats['emails']} emails"
+            )
+        )
+        for phase in ("query", "match", "render", "send"):
+            self.stdout.write(f"{phase}: {stats[phase] * 1000:.0f}ms")
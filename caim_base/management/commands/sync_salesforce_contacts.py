@@ -0,0 +1,59 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from caim_base.utils.salesforce import SalesforceRateLimited, push_pending
+
+logger = logging.getLogger(__name__)
+
+# Longest wait after being rate limited or failing, doubling from
+# --poll-interval
+MAX_BACKOFF = 15 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Create and update queued Salesforce contacts in batches. Runs until"
+        " stopped, checking for changes every --poll-interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--poll-interval", type=float, default=30)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Sync everything that is due and exit",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SALESFORCE_ENABLED:
+            self.stdout.write("Salesforce not enabled for this environment")
+            return
+
+        backoff = options["poll_interval"]
+        while True:
+            wait = options["poll_interval"]
+            try:
+                synced, failed = push_pending(batch_size=options["batch_size"])
+            except SalesforceRateLimited as e:
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                wait = e.retry_after or backoff
+                self.stderr.write(f"Rate limited by Salesforce, waiting {wait}s")
+            except Exception:  # pylint: disable=broad-except
+                # Eg Salesforce or the database being down. Keep going rather
+                # than leaving changes queued until the container restarts
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                wait = backoff
+                logger.exception("Salesforce contact sync failed, waiting %ss", wait)
+            else:
+                backoff = options["poll_interval"]
+                if synced or failed:
+                    self.stdout.write(f"Synced {synced} contacts, {failed} failed")
+            if options["once"]:
+                return
+            close_old_connections()
+            time.sleep(wait)
@@ -0,0 +1,35 @@
+# Generated by Django 4.1 on 2023-10-02 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0049_alter_fostererprofile_num_people_in_home"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SavedSearchDigestRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("checked_at", models.DateTimeField()),
+                ("last_saved_search_id", models.BigIntegerField(default=0)),
+                ("emails_sent", models.IntegerField(default=0)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "finished_at",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1 on 2023-10-04 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0051_outboxmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="animal",
+            name="primary_photo_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="animalimage",
+            name="photo_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
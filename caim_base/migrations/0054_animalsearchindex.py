@@ -0,0 +1,97 @@
+# Generated by Django 4.1 on 2023-10-11 09:37
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Index the animals that are already publicly visible
+POPULATE_SQL = """
+INSERT INTO caim_base_animalsearchindex (
+    animal_id, awg_id, animal_type, age, size, sex,
+    good_with_cats, good_with_dogs, good_with_kids, euth_date, breed_ids,
+    geo_location, created_at, first_published_at
+)
+SELECT
+    animal.id, animal.awg_id, animal.animal_type, animal.age, animal.size,
+    animal.sex, animal.behaviour_cats = 'GOOD', animal.behaviour_dogs = 'GOOD',
+    animal.behaviour_kids = 'GOOD', animal.euth_date,
+    array_remove(
+        ARRAY[animal.primary_breed_id, animal.secondary_breed_id]::bigint[], NULL
+    ),
+    awg.geo_location, animal.created_at, animal.first_published_at
+FROM caim_base_animal animal
+JOIN caim_base_awg awg ON awg.id = animal.awg_id
+WHERE animal.is_published AND awg.status = 'PUBLISHED'
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0053_petfinderimport"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnimalSearchIndex",
+            fields=[
+                (
+                    "animal",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="caim_base.animal",
+                    ),
+                ),
+                ("animal_type", models.CharField(max_length=3)),
+                ("age", models.CharField(max_length=8)),
+                ("size", models.CharField(max_length=2)),
+                ("sex", models.CharField(max_length=1)),
+                ("good_with_cats", models.BooleanField()),
+                ("good_with_dogs", models.BooleanField()),
+                ("good_with_kids", models.BooleanField()),
+                ("euth_date", models.DateField(null=True)),
+                (
+                    "breed_ids",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.BigIntegerField(), size=None
+                    ),
+                ),
+                (
+                    "geo_location",
+                    django.contrib.gis.db.models.fields.PointField(srid=4326),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("first_published_at", models.DateTimeField(null=True)),
+                (
+                    "awg",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="caim_base.awg",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["animal_type", "-created_at"],
+                        name="search_type_created_idx",
+                    ),
+                    models.Index(fields=["-created_at"], name="search_created_idx"),
+                    models.Index(fields=["euth_date"], name="search_euth_date_idx"),
+                    models.Index(
+                        fields=["first_published_at"], name="search_published_idx"
+                    ),
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["breed_ids"], name="search_breed_ids_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
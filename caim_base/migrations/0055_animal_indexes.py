@@ -0,0 +1,50 @@
+# Generated by Django 4.1 on 2023-10-12 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0054_animalsearchindex"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="animal",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["animal_type", "-created_at", "id"],
+                name="animal_pub_type_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="animal",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["-created_at", "id"],
+                name="animal_pub_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="animal",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["euth_date"],
+                name="animal_pub_euth_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="animal",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["first_published_at"],
+                name="animal_pub_first_pub_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="animal",
+            index=models.Index(
+                fields=["awg", "-created_at", "id"], name="animal_awg_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.1 on 2023-10-13 14:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_search_vectors(apps, schema_editor):
+    # A copy of caim_base.search_index.search_vector as it was when this was
+    # written, so later changes to it don't change this migration
+    Animal = apps.get_model("caim_base", "Animal")
+    Breed = apps.get_model("caim_base", "Breed")
+
+    def breed_name(field):
+        return Subquery(Breed.objects.filter(pk=OuterRef(field)).values("name")[:1])
+
+    Animal.objects.update(
+        search_vector=(
+            SearchVector("name", weight="A", config="english")
+            + SearchVector(
+                breed_name("primary_breed_id"),
+                breed_name("secondary_breed_id"),
+                weight="B",
+                config="english",
+            )
+            + SearchVector("description", "special_needs", weight="C", config="english")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0055_animal_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="animal",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="animal",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="animal_search_vector_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="animal",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"],
+                name="animal_name_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
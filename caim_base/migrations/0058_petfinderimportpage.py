@@ -0,0 +1,41 @@
+# Generated by Django 4.1 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0057_salesforcecontactsync"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PetfinderImportPage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("html", models.BinaryField()),
+                (
+                    "petfinder_import",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="saved_pages",
+                        to="caim_base.petfinderimport",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name="petfinderimport",
+            name="pages",
+        ),
+    ]
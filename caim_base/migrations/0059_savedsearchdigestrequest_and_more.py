@@ -0,0 +1,55 @@
+# Generated by Django 4.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_finished_runs(apps, schema_editor):
+    SavedSearchDigestRun = apps.get_model("caim_base", "SavedSearchDigestRun")
+    SavedSearchDigestRun.objects.filter(finished_at__isnull=False).update(
+        is_active=False
+    )
+    # Keep the latest unfinished run to resume, and abandon any others
+    latest = SavedSearchDigestRun.objects.filter(is_active=True).order_by("-id").first()
+    if latest:
+        SavedSearchDigestRun.objects.filter(is_active=True).exclude(
+            id=latest.id
+        ).update(is_active=False, finished_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0058_petfinderimportpage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SavedSearchDigestRequest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("requested_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="savedsearchdigestrun",
+            name="is_active",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(mark_finished_runs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="savedsearchdigestrun",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("is_active",),
+                name="one_active_saved_search_digest_run",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.1 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0059_savedsearchdigestrequest_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="petfinderimport",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
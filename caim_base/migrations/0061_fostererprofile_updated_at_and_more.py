@@ -0,0 +1,29 @@
+# Generated by Django 4.1 on 2026-10-18 14:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("caim_base", "0060_petfinderimport_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fostererprofile",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="fosterapplication",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
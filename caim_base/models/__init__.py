@@ -3,3 +3,6 @@ from .awg import *
 from .animals import *
 from .geo import *
 from .user import *
+from .outbox import *
+from .search_index import *
+from .salesforce import *
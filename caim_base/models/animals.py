@@ -5,12 +5,14 @@ import urllib
 from django.utils import timezone
 from django.db import models
 from django.contrib.gis.db.models import PointField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils.safestring import mark_safe
 from caim_base.templatetags.caim_helpers import image_resize
 from ..utils import full_url
 from .awg import Awg
 from .user import User
-from .geo import ZipCode
+from ..zip_resolver import zip_resolver
 
 logger = logging.getLogger(__name__)
 
@@ -157,9 +159,54 @@ class Animal(models.Model):
         verbose_name="Scheduled euthanasia date",
     )
     primary_photo = models.ImageField(blank=True)
+    # URLs of the resized copies of primary_photo, see thumbnails.py
+    primary_photo_renditions = models.JSONField(
+        default=dict, blank=True, editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     first_published_at = models.DateTimeField(blank=True, default=None, null=True)
+    # Name, breeds, description and special needs for text search, kept up
+    # to date by caim_base.search_index
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # For query_animals. Public searches only read published animals, so
+        # most of these are partial, and sorts end with id to match the
+        # paginator's tie-break. Age, size and sex have a handful of values
+        # each and aren't worth indexing on their own
+        indexes = [
+            models.Index(
+                fields=["animal_type", "-created_at", "id"],
+                condition=models.Q(is_published=True),
+                name="animal_pub_type_created_idx",
+            ),
+            models.Index(
+                fields=["-created_at", "id"],
+                condition=models.Q(is_published=True),
+                name="animal_pub_created_idx",
+            ),
+            models.Index(
+                fields=["euth_date"],
+                condition=models.Q(is_published=True),
+                name="animal_pub_euth_date_idx",
+            ),
+            # Saved search digests
+            models.Index(
+                fields=["first_published_at"],
+                condition=models.Q(is_published=True),
+                name="animal_pub_first_pub_idx",
+            ),
+            # An AWG's animals list
+            models.Index(
+                fields=["awg", "-created_at", "id"], name="animal_awg_created_idx"
+            ),
+            # Text search, and fuzzy matching of names
+            GinIndex(fields=["search_vector"], name="animal_search_vector_idx"),
+            GinIndex(
+                fields=["name"], opclasses=["gin_trgm_ops"], name="animal_name_trgm_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -194,7 +241,7 @@ class Animal(models.Model):
 
     def admin_image_tag(self):
         if self.primary_photo:
-            resized_url = image_resize(self.primary_photo.url, "45x45")
+            resized_url = image_resize(self.primary_photo, "45x45")
             return mark_safe(
                 '<img src="%s" style="max-width: 45px; max-height:45px;" />'
                 % resized_url
@@ -208,6 +255,7 @@ class Animal(models.Model):
 class AnimalImage(models.Model):
     animal = models.ForeignKey(Animal, on_delete=models.CASCADE)
     photo = models.ImageField(blank=False)
+    photo_renditions = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -243,7 +291,9 @@ class AnimalComment(models.Model):
         return self.user == user or user.is_staff
 
     def get_sub_comments(self):
-        return AnimalSubComment.objects.filter(comment=self.id)
+        # Uses the replies from prefetch_related("animalsubcomment_set") if
+        # they were prefetched, see views.animal
+        return self.animalsubcomment_set.all()
 
 
 class AnimalSubComment(models.Model):
@@ -322,10 +372,10 @@ class SavedSearch(models.Model):
         return f"{self.user} - {self.created_at}"
 
     def save(self, *args, **kwargs):
-        try:
-            zip_info = ZipCode.objects.get(zip_code=self.zip_code)
-            self.geo_location = zip_info.geo_location
-        except Exception:
+        location = zip_resolver.get_point(self.zip_code)
+        if location:
+            self.geo_location = location
+        else:
             logger.warn("ZIP code not valid")
         super(SavedSearch, self).save(*args, **kwargs)
 
@@ -352,3 +402,104 @@ class SavedSearch(models.Model):
         if not self.last_checked_at:
             return True
         return (self.last_checked_at + self.check_every) < timezone.now()
+
+
+class SavedSearchDigestRun(models.Model):
+    """
+    Checkpoint for a run of the saved search digest. Saved searches are
+    processed in id order, so an interrupted run resumes after
+    last_saved_search_id using the same checked_at time.
+    """
+
+    checked_at = models.DateTimeField()
+    last_saved_search_id = models.BigIntegerField(default=0)
+    emails_sent = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, default=None, blank=True)
+    # True until finished_at is set. Only one run can be active, so two
+    # workers starting at once can't both create a run
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["is_active"],
+                condition=models.Q(is_active=True),
+                name="one_active_saved_search_digest_run",
+            )
+        ]
+
+    def __str__(self):
+        return f"Saved search digest {self.checked_at}"
+
+
+class SavedSearchDigestRequest(models.Model):
+    """
+    A request, from the hourly cron rule, for the run_saved_search_digests
+    worker to run the saved search digest. Requests waiting when a run
+    starts are all handled by that run.
+    """
+
+    requested_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Saved search digest requested {self.requested_at}"
+
+
+class PetfinderImport(models.Model):
+    """
+    A bulk import of animals from Petfinder for an AWG, run in the background
+    by the run_petfinder_imports worker. Progress and the error for each
+    page that couldn't be imported are recorded as it runs. A failed import
+    keeps its saved pages, so it can be retried.
+    """
+
+    class Statuses(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    awg = models.ForeignKey(Awg, on_delete=models.CASCADE)
+    created_by = models.ForeignKey(
+        User, null=True, blank=True, default=None, on_delete=models.SET_NULL
+    )
+    status = models.CharField(
+        max_length=16, choices=Statuses.choices, default=Statuses.PENDING
+    )
+    # Petfinder animal page URLs. Uploaded saved pages are PetfinderImportPages
+    urls = models.JSONField(default=list, blank=True)
+    stage = models.CharField(max_length=32, blank=True, default="")
+    done = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+    animal_ids = models.JSONField(default=list, blank=True)
+    # [page, error message] pairs
+    errors = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Also set when progress is recorded, so a running import that stops
+    # being updated is known to have been abandoned
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, default=None, blank=True)
+
+    def __str__(self):
+        return f"Petfinder import for {self.awg} {self.created_at}"
+
+    def is_finished(self):
+        return self.status in (self.Statuses.DONE, self.Statuses.FAILED)
+
+
+class PetfinderImportPage(models.Model):
+    """
+    A saved Petfinder page uploaded for a PetfinderImport, kept here rather
+    than in (public) media storage until the import has run
+    """
+
+    petfinder_import = models.ForeignKey(
+        PetfinderImport, on_delete=models.CASCADE, related_name="saved_pages"
+    )
+    name = models.CharField(max_length=255)
+    html = models.BinaryField()
+
+    def __str__(self):
+        return self.name
@@ -7,7 +7,7 @@ from phonenumber_field.modelfields import PhoneNumberField
 
 from ..states import states
 from ..utils import full_url
-from .geo import ZipCode
+from ..zip_resolver import zip_resolver
 from .user import User
 
 logger = logging.getLogger(__name__)
@@ -96,55 +96,23 @@ class Awg(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
-        try:
-            zip_info = ZipCode.objects.get(zip_code=self.zip_code)
-            self.geo_location = zip_info.geo_location
-        except Exception:
+        location = zip_resolver.get_point(self.zip_code)
+        if location:
+            self.geo_location = location
+        else:
             logger.warn("ZIP code not valid")
         super(Awg, self).save(*args, **kwargs)
 
     def get_absolute_url(self):
         return full_url(f"/organization/{self.id}")
 
-    def user_is_member_of_awg(self, user):
-        if not user.id:
-            return False
-        member = self.awgmember_set.filter(user=user).first()
-        return bool(member)
-
-    def get_permissions_for_user(self, user):
-        ret = []
-        if not user.id:
-            return ret
-        # If CAIM staff, all permissions
-        if user.is_staff:
-            ret.append("EDIT_PROFILE")
-            ret.append("MANAGE_ANIMALS")
-            ret.append("MANAGE_MEMBERS")
-            ret.append("MANAGE_APPLICATIONS")
-        # Look for AWGMember for this user and AWG
-        member = self.awgmember_set.filter(user=user).first()
-        if member:
-            if member.canEditProfile:
-                ret.append("EDIT_PROFILE")
-            if member.canManageAnimals:
-                ret.append("MANAGE_ANIMALS")
-            if member.canManageMembers:
-                ret.append("MANAGE_MEMBERS")
-            if member.canManageApplications:
-                ret.append("MANAGE_APPLICATIONS")
-            if member.canViewApplications:
-                ret.append("VIEW_APPLICATIONS")
-        return ret
-
     def is_currently_published(self):
         return self.status == Awg.AwgStatus.PUBLISHED
 
     def clean(self):
         # Validate zip_code
         if self.zip_code:
-            zip_info = ZipCode.objects.filter(zip_code=self.zip_code).first()
-            if not zip_info:
+            if not zip_resolver.is_valid(self.zip_code):
                 raise ValidationError({"zip_code": "Invalid US zip code"})
 
 
@@ -5,7 +5,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from phonenumber_field.modelfields import PhoneNumberField
-from caim_base.notifications import notify_new_fosterer_application
+from caim_base.outbox import enqueue_notification
 from ..utils import full_url
 
 from caim_base.models.animals import Animal
@@ -477,6 +477,9 @@ class FostererProfile(models.Model):
         ),
     )
     is_complete = models.BooleanField(default=False)
+    # Also set when the profile's pets, references or people in the home
+    # change, see caim_base.pdf_rendering
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.firstname} {self.lastname}"
@@ -553,14 +556,16 @@ class FosterApplication(models.Model):
     reject_reason_detail = models.TextField(max_length=65516, null=True, blank=True)
     submitted_on = models.DateField(auto_now_add=True)
     updated_on = models.DateField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"Application for {self.animal} by {self.fosterer}"
 
     def save(self, *args, **kwargs):
-        if not self.id:  # the first save
-            notify_new_fosterer_application(self)
+        is_new = not self.id
         super().save()
+        if is_new:
+            enqueue_notification("notify_new_fosterer_application", self)
 
     def get_absolute_url(self):
         return full_url(f"/foster/application?animal_id={self.animal.id}")
@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxMessage(models.Model):
+    """
+    A notification waiting to be sent by the deliver_outbox command.
+
+    Rows are written in the same transaction as the change that triggers
+    them, so a notification is queued if and only if that change commits.
+    The notification function is called with the referenced object when
+    the message is delivered.
+    """
+
+    class Statuses(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENDING = "SENDING", "Sending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+
+    notification = models.CharField(max_length=128)
+    object_model = models.CharField(max_length=128)
+    object_id = models.BigIntegerField()
+    dedup_key = models.CharField(max_length=255, unique=True)
+    status = models.CharField(
+        max_length=16, choices=Statuses.choices, default=Statuses.PENDING
+    )
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, default=None, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.notification} for {self.object_model} #{self.object_id}"
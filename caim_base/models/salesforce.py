@@ -0,0 +1,42 @@
+from django.db import models
+from django.utils import timezone
+
+from .user import UserProfile
+
+
+class SalesforceContactSync(models.Model):
+    """
+    A user profile whose Salesforce contact needs creating or updating, sent
+    by the sync_salesforce_contacts command.
+
+    There is at most one row per profile: queuing a profile again while it
+    is waiting just bumps version, and the contact is built from the
+    profile when it is sent, so it always has the latest details. Rows are
+    deleted once their contact is synced.
+    """
+
+    class Statuses(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SYNCING = "SYNCING", "Syncing"
+        FAILED = "FAILED", "Failed"
+
+    user_profile = models.OneToOneField(
+        UserProfile, on_delete=models.CASCADE, related_name="salesforce_sync"
+    )
+    status = models.CharField(
+        max_length=16, choices=Statuses.choices, default=Statuses.PENDING
+    )
+    # Changes each time the profile is queued, so a sync only deletes the
+    # row if the profile didn't change again while it was being sent
+    version = models.BigIntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"Salesforce sync for {self.user_profile}"
@@ -0,0 +1,52 @@
+from django.contrib.gis.db.models import PointField
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.db import models
+
+from .animals import Animal
+from .awg import Awg
+
+
+class AnimalSearchIndex(models.Model):
+    """
+    One row per publicly visible animal (published, in a published AWG) with
+    the columns browse filters and sorts on, so a search reads this one
+    narrow table instead of joining Animal to Awg and Breed. Kept in sync by
+    caim_base.search_index.
+    """
+
+    animal = models.OneToOneField(
+        Animal,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_index",
+    )
+    awg = models.ForeignKey(Awg, on_delete=models.CASCADE, related_name="+")
+    animal_type = models.CharField(max_length=3)
+    age = models.CharField(max_length=8)
+    size = models.CharField(max_length=2)
+    sex = models.CharField(max_length=1)
+    good_with_cats = models.BooleanField()
+    good_with_dogs = models.BooleanField()
+    good_with_kids = models.BooleanField()
+    euth_date = models.DateField(null=True)
+    # Primary and secondary breed
+    breed_ids = ArrayField(models.BigIntegerField())
+    # The AWG's location
+    geo_location = PointField()
+    created_at = models.DateTimeField()
+    first_published_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["animal_type", "-created_at"], name="search_type_created_idx"
+            ),
+            models.Index(fields=["-created_at"], name="search_created_idx"),
+            models.Index(fields=["euth_date"], name="search_euth_date_idx"),
+            models.Index(fields=["first_published_at"], name="search_published_idx"),
+            GinIndex(fields=["breed_ids"], name="search_breed_ids_idx"),
+        ]
+
+    def __str__(self):
+        return f"Search index for animal #{self.animal_id}"
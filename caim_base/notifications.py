@@ -1,8 +1,8 @@
 from __future__ import annotations
-from templated_email import send_templated_mail
 
 from django.conf import settings
 import caim_base.models.fosterer as fosterer
+from .email_delivery import send_templated_mail
 
 NOTIFICATIONS_SOURCE_EMAIL = "notifications@caim.org"
 INTERNAL_NOTIFICATIONS_EMAIL = "hello@caim.org"
@@ -21,7 +21,7 @@ def notify_animal_comment(comment):
     # AWG staff
     animal = comment.animal
     awg = animal.awg
-    members = awg.awgmember_set.all()
+    members = awg.awgmember_set.select_related("user")
     emails = [str(member.user.email) for member in members]
     send_templated_mail(
         template_name="new_animal_comment",
@@ -34,7 +34,10 @@ def notify_animal_comment(comment):
 def notify_animal_comment_reply(subcomment):
     comment = subcomment.comment
     animal = comment.animal
-    subcomments = comment.get_sub_comments()
+    # Everyone else in the thread, the reply itself is already saved
+    subcomments = (
+        comment.get_sub_comments().select_related("user").exclude(id=subcomment.id)
+    )
     emails = [str(subcomment.user.email) for subcomment in subcomments]
     emails.append(str(comment.user.email))
     emails = list(set(emails))
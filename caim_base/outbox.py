@@ -0,0 +1,134 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models.outbox import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+# Give up on a message after this many attempts
+MAX_ATTEMPTS = 5
+
+# A message claimed for sending this long ago is assumed to belong to a worker
+# that died, and is sent again
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_notification(notification, obj, dedup_key=None):
+    """
+    Queue caim_base.notifications.<notification>(obj) to be called by the
+    deliver_outbox command.
+
+    The row is written in the current transaction, so it is only queued if
+    the caller's changes commit. Queuing the same dedup_key twice (by
+    default the notification and object) only sends once.
+    """
+    # notifications imports the models, which import this module
+    from . import notifications  # pylint: disable=import-outside-toplevel
+
+    if not callable(getattr(notifications, notification, None)):
+        raise ValueError(f"Unknown notification {notification}")
+    object_model = obj._meta.label_lower
+    dedup_key = dedup_key or f"{notification}:{object_model}:{obj.pk}"
+    message, _ = OutboxMessage.objects.get_or_create(
+        dedup_key=dedup_key,
+        defaults={
+            "notification": notification,
+            "object_model": object_model,
+            "object_id": obj.pk,
+        },
+    )
+    return message
+
+
+def claim_messages(limit):
+    """
+    Mark up to limit due messages as sending and return them. Rows locked by
+    another worker are skipped, so several workers can drain the outbox.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(
+                    status=OutboxMessage.Statuses.PENDING,
+                    next_attempt_at__lte=now,
+                )
+                | Q(
+                    status=OutboxMessage.Statuses.SENDING,
+                    next_attempt_at__lte=now - CLAIM_TIMEOUT,
+                )
+            )
+            .order_by("next_attempt_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        OutboxMessage.objects.filter(id__in=ids).update(
+            status=OutboxMessage.Statuses.SENDING,
+            next_attempt_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(OutboxMessage.objects.filter(id__in=ids).order_by("next_attempt_at"))
+
+
+def deliver(message):
+    """Send one claimed message, recording the outcome on its row"""
+    from . import notifications  # pylint: disable=import-outside-toplevel
+
+    model = apps.get_model(message.object_model)
+    obj = model.objects.filter(pk=message.object_id).first()
+    try:
+        if obj is None:
+            raise model.DoesNotExist(
+                f"{model._meta.verbose_name} #{message.object_id} no longer exists"
+            )
+        getattr(notifications, message.notification)(obj)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Failed to send outbox message #%d", message.id)
+        message.last_error = f"{type(e).__name__}: {e}"
+        if obj is None or message.attempts >= MAX_ATTEMPTS:
+            message.status = OutboxMessage.Statuses.FAILED
+        else:
+            message.status = OutboxMessage.Statuses.PENDING
+            # 2, 4, 8... minutes
+            message.next_attempt_at = timezone.now() + timedelta(
+                minutes=2**message.attempts
+            )
+    else:
+        message.status = OutboxMessage.Statuses.SENT
+        message.sent_at = timezone.now()
+    message.save(update_fields=["status", "next_attempt_at", "last_error", "sent_at"])
+    return message.status == OutboxMessage.Statuses.SENT
+
+
+def _deliver_in_thread(message):
+    try:
+        return deliver(message)
+    finally:
+        # Each thread has its own database connection
+        close_old_connections()
+
+
+def deliver_pending(threads=4, batch_size=100):
+    """
+    Claim and send due messages in a pool of threads until none are left.
+    Returns (sent, failed) counts.
+    """
+    sent = failed = 0
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        while True:
+            messages = claim_messages(batch_size)
+            if not messages:
+                break
+            if threads > 1:
+                results = list(pool.map(_deliver_in_thread, messages))
+            else:
+                results = [deliver(message) for message in messages]
+            sent += results.count(True)
+            failed += results.count(False)
+    return sent, failed
@@ -0,0 +1,175 @@
+from datetime import date, datetime
+
+from django.contrib.gis.measure import Distance
+from django.core import signing
+from django.core.exceptions import BadRequest, FieldDoesNotExist
+from django.db.models import Q
+
+CURSOR_SALT = "caim_base.pagination.cursor"
+
+# Totals are counted up to this many rows, and shown as eg "1000+" above it
+COUNT_LIMIT = 1000
+
+
+def capped_count(queryset):
+    """
+    Row count for a queryset, counting no further than COUNT_LIMIT rows so a
+    large result doesn't cost a full COUNT(*). Returns (count, is_capped);
+    when is_capped there are more than count rows.
+    """
+    count = queryset[: COUNT_LIMIT + 1].count()
+    if count > COUNT_LIMIT:
+        return COUNT_LIMIT, True
+    return count, False
+
+
+def _to_json(value):
+    if isinstance(value, Distance):
+        return value.m
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor, total_fn):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._total_fn = total_fn
+        self._total = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def _load_total(self):
+        if self._total is None:
+            self._total = self._total_fn()
+        return self._total
+
+    # Only computed if the template asks for it
+    @property
+    def total(self):
+        return self._load_total()[0]
+
+    @property
+    def total_is_capped(self):
+        return self._load_total()[1]
+
+
+class KeysetPaginator:
+    """
+    Cursor based pagination for a queryset ordered by (sort field, pk).
+
+    Instead of OFFSET, each page is fetched with a WHERE clause that continues
+    from the last row of the previous page, so deep pages cost the same as the
+    first one and no COUNT(*) is needed to render them.
+
+    Cursors are signed tokens holding the sort, direction and the sort value
+    and pk of the row to continue from.
+
+    If given, load(rows) is called with each page's rows and returns the
+    objects to display for them, eg to page through a search index and show
+    the objects it indexes.
+    """
+
+    def __init__(self, queryset, sort, per_page, load=None):
+        self.sort = sort
+        self.field = sort.lstrip("-")
+        self.descending = sort.startswith("-")
+        self.per_page = per_page
+        self.queryset = queryset
+        self.load = load
+        try:
+            field = queryset.model._meta.get_field(self.field)
+            self.nullable = field.null
+            self._to_python = field.to_python
+        except FieldDoesNotExist:
+            # Annotations such as distance
+            self.nullable = False
+            self._to_python = lambda value: value
+
+    def _ordering(self, backwards):
+        descending = self.descending != backwards
+        field = f"-{self.field}" if descending else self.field
+        return (field, "-pk" if backwards else "pk")
+
+    def _continue_from(self, value, pk, backwards):
+        # Whether we're reading the sort field in ascending order. Postgres
+        # sorts NULLs last when ascending, so they also come after the cursor
+        ascending = self.descending == backwards
+        pk_cmp = "pk__lt" if backwards else "pk__gt"
+        if value is None:
+            q = Q(**{f"{self.field}__isnull": True, pk_cmp: pk})
+            if not ascending:
+                q |= Q(**{f"{self.field}__isnull": False})
+            return q
+        value_cmp = f"{self.field}__gt" if ascending else f"{self.field}__lt"
+        q = Q(**{value_cmp: value}) | Q(**{self.field: value, pk_cmp: pk})
+        if self.nullable and ascending:
+            q |= Q(**{f"{self.field}__isnull": True})
+        return q
+
+    def _cursor(self, obj, backwards):
+        value = _to_json(getattr(obj, self.field))
+        return signing.dumps(
+            {"s": self.sort, "b": backwards, "v": value, "id": obj.pk},
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    def _decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature as e:
+            raise BadRequest("Invalid cursor") from e
+        # A cursor from a different sort order can't be continued, start over
+        if data.get("s") != self.sort:
+            return None
+        value = data["v"]
+        if value is not None:
+            value = self._to_python(value)
+        return value, data["id"], bool(data["b"])
+
+    def page(self, cursor=None):
+        position = self._decode(cursor) if cursor else None
+        backwards = position[2] if position else False
+
+        query = self.queryset.order_by(*self._ordering(backwards))
+        if position:
+            query = query.filter(self._continue_from(*position))
+        rows = list(query[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = None
+        previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self._cursor(rows[-1], False)
+            if (has_more and backwards) or (position and not backwards):
+                previous_cursor = self._cursor(rows[0], True)
+
+        def count():
+            if not position and not has_more:
+                # The whole result is on the first page, no need to count it
+                return len(rows), False
+            return capped_count(self.queryset.order_by())
+
+        return KeysetPage(
+            self.load(rows) if self.load else rows,
+            next_cursor,
+            previous_cursor,
+            count,
+        )
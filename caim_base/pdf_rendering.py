@@ -0,0 +1,326 @@
+import base64
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import cache
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .caching import cache_set, make_key
+from .models import TypeOfAnimals
+from .models.fosterer import (
+    FosterApplication,
+    FostererExistingPetDetail,
+    FostererPersonInHomeDetail,
+    FostererProfile,
+    FostererReferenceDetail,
+)
+from .pdf_writer import write_pdf
+
+logger = logging.getLogger(__name__)
+
+# A PDF is cached until what it shows changes, so this only bounds how long
+# PDFs nobody downloads are kept
+PDF_TIMEOUT = 60 * 60 * 24 * 7
+
+# Longest render_pdf waits for a PDF to be rendered
+RENDER_TIMEOUT = 60
+
+# PDFs are cached in their own cache, see settings.CACHES
+PDF_CACHE = "pdfs"
+
+# Part of every PDF's key. Bump it when fosterer_profile/pdf.html or what
+# application_html gives it changes, so PDFs are rendered again
+TEMPLATE_VERSION = 1
+
+# What application_html reads, to render many applications without a query
+# per application
+APPLICATION_PDF_SELECT = ("animal", "fosterer")
+APPLICATION_PDF_PREFETCH = (
+    "fosterer__existing_pets",
+    "fosterer__references",
+    "fosterer__people_in_home",
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# {pdf key: Future} of the PDFs this process is rendering for get_application_pdf
+_rendering = {}
+_rendering_lock = threading.Lock()
+
+
+def stylesheet_paths():
+    return (
+        os.path.join(settings.STATIC_ROOT, "vendor/normalize.css"),
+        os.path.join(settings.STATIC_ROOT, "css/pdf.css"),
+    )
+
+
+def _get_pool():
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_RENDER_WORKERS,
+                # Not forked from a process with threads and open connections
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _submit(html):
+    """
+    Start rendering html in the process pool, returning a Future. If
+    PDF_RENDER_WORKERS is 0 it is rendered in this process before returning.
+    """
+    global _pool  # pylint: disable=global-statement
+    if not settings.PDF_RENDER_WORKERS:
+        future = Future()
+        try:
+            future.set_result(write_pdf(html, stylesheet_paths()))
+        except Exception as e:  # pylint: disable=broad-except
+            future.set_exception(e)
+        return future
+
+    pool = _get_pool()
+    try:
+        return pool.submit(write_pdf, html, stylesheet_paths())
+    except BrokenProcessPool:
+        # A renderer died (eg killed for using too much memory), start over
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return _get_pool().submit(write_pdf, html, stylesheet_paths())
+
+
+def render_pdf(html):
+    """
+    PDF of an HTML page, rendered by WeasyPrint in the process pool so a
+    request doesn't hold the GIL for seconds
+    """
+    return _submit(html).result(timeout=RENDER_TIMEOUT)
+
+
+def _labels(choices, values):
+    return [choices(value).label for value in values or []]
+
+
+def application_html(application: FosterApplication):
+    fosterer = application.fosterer
+    context = {
+        "application": application,
+        # .all() so they can be prefetched, see APPLICATION_PDF_PREFETCH
+        "existing_animals": fosterer.existing_pets.all(),
+        "references": fosterer.references.all(),
+        "people_in_home": fosterer.people_in_home.all(),
+        "animal_type_labels": _labels(TypeOfAnimals, fosterer.type_of_animals),
+        "dog_size_labels": _labels(fosterer.DogSize, fosterer.dog_size),
+        "category_of_animals_labels": _labels(
+            fosterer.CategoryOfAnimals, fosterer.category_of_animals
+        ),
+        "behaviour_labels": _labels(
+            fosterer.BehaviouralAttributes, fosterer.behavioural_attributes
+        ),
+        "experience_categories_labels": _labels(
+            fosterer.ExperienceCategories, fosterer.experience_categories
+        ),
+    }
+    return render_to_string("fosterer_profile/pdf.html", context)
+
+
+def pdf_key(application):
+    """
+    Cache key for the PDF of an application. It includes when the
+    application, profile and animal were last changed, so editing any of
+    them (or bumping TEMPLATE_VERSION) gives a new key, without rendering
+    the page to find out
+    """
+    return make_key(
+        "application_pdf",
+        application.pk,
+        application.updated_at.timestamp(),
+        application.fosterer.updated_at.timestamp(),
+        application.animal.updated_at.timestamp(),
+        TEMPLATE_VERSION,
+    )
+
+
+@cache
+def _fernet(secret_key):
+    key = salted_hmac("caim_base.pdf_rendering", "pdf", secret_key, algorithm="sha256")
+    return Fernet(base64.urlsafe_b64encode(key.digest()))
+
+
+def _store_pdf(key, pdf):
+    # Applications hold personal details, so whichever backend the cache
+    # is, it only ever sees them encrypted
+    encrypted = _fernet(settings.SECRET_KEY).encrypt(pdf)
+    cache_set(key, encrypted, PDF_TIMEOUT, using=PDF_CACHE)
+
+
+def cached_pdfs(keys):
+    """{key: PDF} for the keys whose PDFs are cached"""
+    try:
+        found = caches[PDF_CACHE].get_many(keys)
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Cache get failed for application PDFs", exc_info=True)
+        return {}
+    pdfs = {}
+    for key, encrypted in found.items():
+        try:
+            pdfs[key] = _fernet(settings.SECRET_KEY).decrypt(encrypted)
+        except InvalidToken:
+            # Encrypted with a previous SECRET_KEY, render it again
+            pass
+    return pdfs
+
+
+def _start_render(key, application):
+    """
+    Future of the application's PDF, cached when it is ready. A PDF this
+    process is already rendering isn't rendered (or its page built) twice.
+    """
+    with _rendering_lock:
+        future = _rendering.get(key)
+    if future is not None:
+        return future
+    html = application_html(application)
+    with _rendering_lock:
+        future = _rendering.get(key)
+        if future is not None:
+            return future
+        future = _submit(html)
+        _rendering[key] = future
+
+    def store(future):
+        with _rendering_lock:
+            _rendering.pop(key, None)
+        try:
+            _store_pdf(key, future.result())
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to render PDF %s", key)
+
+    future.add_done_callback(store)
+    return future
+
+
+def get_application_pdf(application: FosterApplication):
+    """
+    The application's PDF if it's cached and nothing it shows has changed
+    since it was rendered. Otherwise it's rendered in the process pool and
+    None is returned, rather than holding up the request, so ask again
+    shortly. If PDF_RENDER_WORKERS is 0 it is rendered before returning.
+    """
+    key = pdf_key(application)
+    pdf = cached_pdfs([key]).get(key)
+    if pdf is not None:
+        return pdf
+    future = _start_render(key, application)
+    if not future.done():
+        return None
+    # Raises if it failed, so the next request doesn't get None forever
+    return future.result()
+
+
+def iter_application_pdfs(applications):
+    """
+    Yields (application, pdf) for each application as its PDF is ready:
+    cached PDFs straight away, then the rest as the pool renders them in
+    parallel. pdf is None if rendering failed or didn't finish within
+    RENDER_TIMEOUT per PDF. The renders start when this is called, not when
+    the results are first read.
+    """
+    keyed = [(application, pdf_key(application)) for application in applications]
+    cached = cached_pdfs([key for _, key in keyed])
+
+    # Only the pages of PDFs that aren't cached are built
+    futures = {
+        _submit(application_html(application)): (application, key)
+        for application, key in keyed
+        if key not in cached
+    }
+
+    def results():
+        pending = dict(futures)
+        try:
+            for application, key in keyed:
+                if key in cached:
+                    yield application, cached[key]
+            try:
+                for future in as_completed(
+                    futures, timeout=RENDER_TIMEOUT * max(len(futures), 1)
+                ):
+                    application, key = pending.pop(future)
+                    try:
+                        pdf = future.result()
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception(
+                            "Failed to render PDF of application #%s", application.pk
+                        )
+                        yield application, None
+                    else:
+                        _store_pdf(key, pdf)
+                        yield application, pdf
+            except FuturesTimeoutError:
+                # Reported like any other failure, so a download still gets
+                # a complete ZIP
+                for application, _ in pending.values():
+                    logger.error(
+                        "Timed out rendering PDF of application #%s", application.pk
+                    )
+                    yield application, None
+        finally:
+            # Eg the download was cancelled
+            for future in futures:
+                future.cancel()
+
+    return results()
+
+
+def prerender_application_pdf(application: FosterApplication):
+    """
+    Render the application's PDF in the background, so it's cached by the
+    time the AWG downloads it
+    """
+    if not settings.PDF_RENDER_WORKERS:
+        return
+    try:
+        _start_render(pdf_key(application), application)
+    except Exception:  # pylint: disable=broad-except
+        # It's rendered when downloaded instead
+        logger.exception("Failed to schedule PDF of application #%s", application.pk)
+
+
+@receiver(post_save, sender=FosterApplication)
+def schedule_prerender(sender, instance, created, **kwargs):
+    if created:
+        # Wait for the commit, it isn't worth rendering an application that
+        # is rolled back
+        transaction.on_commit(lambda: prerender_application_pdf(instance))
+
+
+@receiver(post_save, sender=FostererExistingPetDetail)
+@receiver(post_delete, sender=FostererExistingPetDetail)
+@receiver(post_save, sender=FostererReferenceDetail)
+@receiver(post_delete, sender=FostererReferenceDetail)
+@receiver(post_save, sender=FostererPersonInHomeDetail)
+@receiver(post_delete, sender=FostererPersonInHomeDetail)
+def touch_fosterer_profile(sender, instance, **kwargs):
+    # They're shown in the PDF, which is keyed on the profile's updated_at
+    FostererProfile.objects.filter(pk=instance.fosterer_profile_id).update(
+        updated_at=timezone.now()
+    )
@@ -0,0 +1,19 @@
+"""
+The part of PDF rendering that runs in the pdf_rendering process pool. It
+doesn't import Django, so starting a renderer doesn't load the project.
+"""
+from functools import cache
+
+from weasyprint import CSS, HTML
+
+PAGE_CSS = "@page { size: letter portrait; margin: 1cm }"
+
+
+@cache
+def _stylesheets(paths):
+    """Parsed once per process rather than for every PDF"""
+    return [CSS(string=PAGE_CSS), *(CSS(filename=path) for path in paths)]
+
+
+def write_pdf(html, stylesheet_paths):
+    return HTML(string=html).write_pdf(stylesheets=_stylesheets(stylesheet_paths))
@@ -0,0 +1,145 @@
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.core.files import File
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Photos downloaded at once
+MAX_WORKERS = 8
+# Seconds to connect, and between bytes
+REQUEST_TIMEOUT = (5, 15)
+# Seconds for a whole photo
+DOWNLOAD_DEADLINE = 30
+CHUNK_SIZE = 64 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class PhotoFetchError(Exception):
+    pass
+
+
+def get_session():
+    """A requests session shared by all threads, so connections are reused"""
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def _max_bytes():
+    return int(settings.MAX_UPLOAD_SIZE)
+
+
+class LimitedStream(io.RawIOBase):
+    """
+    Read-only stream over a streaming response that fails once more than
+    max_bytes have been read or the deadline has passed
+    """
+
+    def __init__(self, response, max_bytes, deadline):
+        super().__init__()
+        self._chunks = response.iter_content(CHUNK_SIZE)
+        self._buffer = b""
+        self._read = 0
+        self._max_bytes = max_bytes
+        self._deadline = deadline
+        self._url = response.url
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self._buffer:
+            if time.monotonic() > self._deadline:
+                raise PhotoFetchError(f"Timed out downloading {self._url}")
+            self._buffer = next(self._chunks, b"")
+            self._read += len(self._buffer)
+            if self._read > self._max_bytes:
+                raise PhotoFetchError(
+                    f"{self._url} is larger than {self._max_bytes // 1024 // 1024}MB"
+                )
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def fetch_photo(url, field, max_bytes=None, deadline=DOWNLOAD_DEADLINE):
+    """
+    Download an image straight into the storage of an ImageField / FileField,
+    without a temp file. Returns the stored name, to assign to the field.
+    """
+    max_bytes = max_bytes or _max_bytes()
+    try:
+        response = get_session().get(url, stream=True, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        raise PhotoFetchError(f"Could not download {url}") from e
+    with response:
+        if response.status_code != 200:
+            raise PhotoFetchError(f"{url} returned {response.status_code}")
+        content_type = response.headers.get("Content-Type", "")
+        if not content_type.startswith("image/"):
+            raise PhotoFetchError(f"{url} is not an image ({content_type})")
+        length = response.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_bytes:
+            raise PhotoFetchError(f"{url} is larger than {max_bytes // 1024 // 1024}MB")
+
+        filename = os.path.basename(urlparse(url).path) or "photo.jpg"
+        storage = field.storage
+        name = storage.get_available_name(field.generate_filename(None, filename))
+        stream = LimitedStream(response, max_bytes, time.monotonic() + deadline)
+        try:
+            return storage.save(name, File(stream, name))
+        except (PhotoFetchError, requests.RequestException) as e:
+            # Don't leave a partly written file behind
+            if storage.exists(name):
+                storage.delete(name)
+            if isinstance(e, PhotoFetchError):
+                raise
+            raise PhotoFetchError(f"Could not download {url}") from e
+
+
+def fetch_photos(urls, field, max_workers=MAX_WORKERS, progress=None):
+    """
+    Download several photos concurrently with fetch_photo. Returns a list in
+    the same order as urls of stored names, or the PhotoFetchError for any
+    that failed. progress(done, total) is called as each one finishes.
+    """
+    if not urls:
+        return []
+
+    def fetch(url):
+        try:
+            return fetch_photo(url, field)
+        except PhotoFetchError as e:
+            logger.warning("%s", e)
+            return e
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as pool:
+        futures = [pool.submit(fetch, url) for url in urls]
+        if progress:
+            for done, _ in enumerate(as_completed(futures), 1):
+                progress(done, len(futures))
+        return [future.result() for future in futures]
+
+
+def delete_photos(names, field):
+    for name in names:
+        if isinstance(name, str):
+            field.storage.delete(name)
@@ -0,0 +1,132 @@
+import contextvars
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+# Metrics of the request being handled by this thread, if any
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.duplicate_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+        self._seen = set()
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            # The same statement with the same parameters is usually an N+1
+            try:
+                key = (sql, repr(params))
+            except Exception:  # pylint: disable=broad-except
+                key = None
+            if key in self._seen:
+                self.duplicate_queries += 1
+            elif key is not None:
+                self._seen.add(key)
+
+
+_template_render = Template.render
+
+
+def _timed_template_render(self, *args, **kwargs):
+    metrics = _current.get()
+    if metrics is None:
+        return _template_render(self, *args, **kwargs)
+    # Templates rendered while rendering a template (eg render_to_string in
+    # a tag) are already being timed
+    metrics._template_depth += 1  # pylint: disable=protected-access
+    start = time.perf_counter()
+    try:
+        return _template_render(self, *args, **kwargs)
+    finally:
+        metrics._template_depth -= 1  # pylint: disable=protected-access
+        if not metrics._template_depth:  # pylint: disable=protected-access
+            metrics.template_time += time.perf_counter() - start
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times each request and counts its SQL queries, then adds a Server-Timing
+    header (shown in the browser dev tools) and logs a line such as
+
+        view=browse method=GET status=200 total_ms=41.2 db_ms=12.0 queries=7
+        duplicate_queries=0 template_ms=18.3
+
+    for each request, to find slow or chatty views in production. Only used
+    if REQUEST_METRICS_ENABLED is set. Streamed responses are timed until
+    their first byte.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        Template.render = _timed_template_render
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_time = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else "-"
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={_ms(metrics.db_time)};desc="{metrics.queries} queries'
+                f' ({metrics.duplicate_queries} duplicate)"',
+                f"tpl;dur={_ms(metrics.template_time)}",
+                f"total;dur={_ms(total_time)}",
+            ]
+        )
+        logger.info(
+            "view=%s method=%s status=%d total_ms=%s db_ms=%s queries=%d"
+            " duplicate_queries=%d template_ms=%s",
+            view,
+            request.method,
+            response.status_code,
+            _ms(total_time),
+            _ms(metrics.db_time),
+            metrics.queries,
+            metrics.duplicate_queries,
+            _ms(metrics.template_time),
+            extra={
+                "view": view,
+                "status": response.status_code,
+                "total_ms": _ms(total_time),
+                "db_ms": _ms(metrics.db_time),
+                "queries": metrics.queries,
+                "duplicate_queries": metrics.duplicate_queries,
+                "template_ms": _ms(metrics.template_time),
+            },
+        )
+        return response
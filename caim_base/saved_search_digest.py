@@ -0,0 +1,431 @@
+import logging
+import math
+import multiprocessing
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, FloatField, Func, Min, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from templated_email import get_templated_mail
+
+from .animal_search import (
+    EARTH_RADIUS_METERS,
+    MILES_TO_METERS,
+    query_animals,
+    radius_degrees,
+)
+from .email_delivery import close_pooled_connection, send_messages
+from .models.animals import (
+    Animal,
+    SavedSearch,
+    SavedSearchDigestRequest,
+    SavedSearchDigestRun,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def render_email(saved_search, animals):
+    return get_templated_mail(
+        template_name="saved_search_daily_digest",
+        to=[saved_search.user.email],
+        context={
+            "animals": animals,
+            "user": saved_search.user,
+            "saved_search": saved_search,
+        },
+        from_email="notifications@caim.org",
+    )
+
+
+def due_saved_searches(now):
+    """Saved searches that are due to be checked"""
+    return (
+        SavedSearch.objects.annotate(
+            next_check_at=F("last_checked_at") + F("check_every")
+        )
+        .filter(Q(last_checked_at__isnull=True) | Q(next_check_at__lt=now))
+        .select_related("user")
+        .order_by("id")
+    )
+
+
+def checked_since(saved_search):
+    # For a new saved search, last_checked_at is None, so use created_at instead
+    # Otherwise we will send ALL the animals on the site
+    return saved_search.last_checked_at or saved_search.created_at
+
+
+def fetch_new_animals(since):
+    """
+    All publicly visible animals first published after since, in browse order,
+    with the AWG location as awg_lat / awg_lng
+    """
+    return list(
+        query_animals(AnonymousUser(), published_since=since).annotate(
+            awg_lat=Func(
+                F("awg__geo_location"), function="ST_Y", output_field=FloatField()
+            ),
+            awg_lng=Func(
+                F("awg__geo_location"), function="ST_X", output_field=FloatField()
+            ),
+        )
+    )
+
+
+def filter_signature(saved_search):
+    """The non-location filters of a saved search"""
+    return (
+        str(saved_search.animal_type).upper() if saved_search.animal_type else None,
+        saved_search.age,
+        saved_search.size,
+        saved_search.sex,
+        saved_search.breed_id,
+        saved_search.euth_date_within_days,
+        bool(saved_search.goodwith_cats),
+        bool(saved_search.goodwith_dogs),
+        bool(saved_search.goodwith_kids),
+    )
+
+
+def _matches_signature(animal, signature, now):
+    (
+        animal_type,
+        age,
+        size,
+        sex,
+        breed_id,
+        euth_date_within_days,
+        goodwith_cats,
+        goodwith_dogs,
+        goodwith_kids,
+    ) = signature
+    good = Animal.AnimalBehaviourGrade.GOOD
+    if animal_type and animal.animal_type != animal_type:
+        return False
+    if age and animal.age != age.upper():
+        return False
+    if size and animal.size != size.upper():
+        return False
+    if sex and animal.sex != sex.upper():
+        return False
+    if breed_id and breed_id not in (
+        animal.primary_breed_id,
+        animal.secondary_breed_id,
+    ):
+        return False
+    if euth_date_within_days:
+        # Same cut off as query_animals
+        cutoff = (now + timedelta(days=euth_date_within_days)).date()
+        if not animal.euth_date or animal.euth_date > cutoff:
+            return False
+    if goodwith_cats and animal.behaviour_cats != good:
+        return False
+    if goodwith_dogs and animal.behaviour_dogs != good:
+        return False
+    if goodwith_kids and animal.behaviour_kids != good:
+        return False
+    return True
+
+
+def _distances(lat, lng, candidates):
+    """Great circle distances in meters from (lat, lng) to each candidate"""
+    lat1 = math.radians(lat)
+    lng1 = math.radians(lng)
+    cos_lat1 = math.cos(lat1)
+    ret = []
+    for animal in candidates:
+        lat2 = math.radians(animal.awg_lat)
+        dlat = lat2 - lat1
+        dlng = math.radians(animal.awg_lng) - lng1
+        a = (
+            math.sin(dlat / 2) ** 2
+            + cos_lat1 * math.cos(lat2) * math.sin(dlng / 2) ** 2
+        )
+        ret.append(2 * EARTH_RADIUS_METERS * math.asin(min(1, math.sqrt(a))))
+    return ret
+
+
+def _match_group(saved_searches, candidates):
+    """
+    Match saved searches sharing one filter signature against the animals
+    that pass those filters. Candidates are sorted by latitude so a radius
+    search only computes distances for animals in its latitude band.
+    """
+    by_lat = sorted(candidates, key=lambda a: a.awg_lat)
+    lats = [a.awg_lat for a in by_lat]
+    matches = {}
+    for saved_search in saved_searches:
+        since = checked_since(saved_search)
+        pool = candidates
+        if saved_search.radius and saved_search.zip_code:
+            radius_meters = saved_search.radius * MILES_TO_METERS
+            lat = saved_search.geo_location.y
+            band, _ = radius_degrees(lat, radius_meters)
+            start = bisect_left(lats, lat - band)
+            end = bisect_right(lats, lat + band)
+            pool = by_lat[start:end]
+            distances = _distances(lat, saved_search.geo_location.x, pool)
+            pool = [a for a, d in zip(pool, distances) if d <= radius_meters]
+        found = [a for a in pool if a.first_published_at > since]
+        if found:
+            matches[saved_search.id] = found
+    return matches
+
+
+def match_saved_searches(saved_searches, animals, now=None):
+    """
+    Returns {saved search id: [animals]} for the new animals each saved search
+    should be notified about, keeping the order of animals.
+
+    Saved searches are grouped by filter signature, so the attribute filters
+    are evaluated once per group and new animal rather than once per search.
+    """
+    now = now or datetime.now()
+    order = {animal.id: i for i, animal in enumerate(animals)}
+
+    groups = defaultdict(list)
+    for saved_search in saved_searches:
+        groups[filter_signature(saved_search)].append(saved_search)
+
+    matches = {}
+    for signature, group in groups.items():
+        candidates = [a for a in animals if _matches_signature(a, signature, now)]
+        if candidates:
+            matches.update(_match_group(group, candidates))
+
+    for found in matches.values():
+        found.sort(key=lambda a: order[a.id])
+    return matches
+
+
+class AlreadyRunningError(Exception):
+    pass
+
+
+# An unfinished run that hasn't checkpointed for this long is assumed dead
+STALE_RUN_AFTER = timedelta(minutes=30)
+
+# Set in each worker process by _init_worker
+_worker_state = {}
+
+
+def _empty_stats():
+    return {
+        "searches": 0,
+        "emails": 0,
+        "query": 0.0,
+        "match": 0.0,
+        "render": 0.0,
+        "send": 0.0,
+    }
+
+
+def process_saved_searches(saved_search_ids, animals, now, dry_run=False):
+    """
+    Match, mark as checked and email one chunk of saved searches.
+    Returns counts and the seconds spent in each phase.
+    """
+    stats = _empty_stats()
+
+    start = time.perf_counter()
+    saved_searches = list(
+        SavedSearch.objects.filter(id__in=saved_search_ids)
+        .select_related("user")
+        .order_by("id")
+    )
+    if not dry_run:
+        # Update the last_checked_at date before sending, so that bugs or errors
+        # thrown whilst processing dont result in many emails being sent
+        # (eg at most once)
+        SavedSearch.objects.filter(id__in=saved_search_ids).update(last_checked_at=now)
+    stats["query"] = time.perf_counter() - start
+    stats["searches"] = len(saved_searches)
+
+    start = time.perf_counter()
+    matches = match_saved_searches(saved_searches, animals, now)
+    stats["match"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    messages = [
+        render_email(saved_search, matches[saved_search.id])
+        for saved_search in saved_searches
+        if saved_search.id in matches
+    ]
+    stats["render"] = time.perf_counter() - start
+    stats["emails"] = len(messages)
+
+    start = time.perf_counter()
+    if not dry_run:
+        stats["emails"] = send_messages(messages)
+    stats["send"] = time.perf_counter() - start
+    return stats
+
+
+def _init_worker(animals, now, dry_run):
+    _worker_state.update(animals=animals, now=now, dry_run=dry_run)
+
+
+def _process_chunk_in_worker(saved_search_ids):
+    return process_saved_searches(saved_search_ids, **_worker_state)
+
+
+def _start_run(now, restart):
+    # The active run is locked while deciding whether to resume it, and the
+    # unique constraint on is_active stops two new runs being created, so
+    # only one of several workers starting at once gets a run
+    with transaction.atomic():
+        run = (
+            SavedSearchDigestRun.objects.select_for_update()
+            .filter(is_active=True)
+            .first()
+        )
+        if run and timezone.now() - run.updated_at < STALE_RUN_AFTER:
+            raise AlreadyRunningError(f"Saved search digest #{run.id} is running")
+        if run and not restart:
+            logger.info(
+                "Resuming saved search digest #%d after saved search #%d",
+                run.id,
+                run.last_saved_search_id,
+            )
+            run.save(update_fields=["updated_at"])
+            return run
+        if run:
+            # Abandon the old checkpoint so it isn't resumed by a later run
+            _finish_run(run)
+        try:
+            with transaction.atomic():
+                return SavedSearchDigestRun.objects.create(checked_at=now)
+        except IntegrityError as e:
+            raise AlreadyRunningError("A saved search digest has just started") from e
+
+
+def _finish_run(run):
+    run.finished_at = timezone.now()
+    run.is_active = False
+    run.save(update_fields=["finished_at", "is_active", "updated_at"])
+
+
+def run_saved_search_digest(
+    now=None, chunk_size=1000, workers=1, dry_run=False, restart=False
+):
+    """
+    Check every due saved search for newly published animals and email the
+    owners.
+
+    Due saved searches are processed in chunks in id order. After each chunk
+    the run is checkpointed, so an interrupted run resumes where it stopped
+    (pass restart=True to start over). With workers > 1 chunks are processed
+    in a pool of forked processes. A dry run sends nothing and writes nothing.
+
+    Returns counts and the seconds spent in each phase.
+    """
+    now = now or timezone.now()
+    run = None
+    if not dry_run:
+        run = _start_run(now, restart)
+        now = run.checked_at
+
+    totals = _empty_stats()
+    start = time.perf_counter()
+    due = due_saved_searches(now)
+    if run:
+        due = due.filter(id__gt=run.last_saved_search_id)
+    saved_search_ids = list(due.values_list("id", flat=True))
+    since = due.aggregate(since=Min(Coalesce("last_checked_at", "created_at")))["since"]
+    animals = fetch_new_animals(since) if saved_search_ids else []
+    totals["query"] = time.perf_counter() - start
+    logger.info(
+        "%d saved searches due checking, %d animals published since %s",
+        len(saved_search_ids),
+        len(animals),
+        since,
+    )
+
+    chunks = [
+        saved_search_ids[i : i + chunk_size]
+        for i in range(0, len(saved_search_ids), chunk_size)
+    ]
+    if workers > 1 and len(chunks) > 1:
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(animals, now, dry_run),
+        )
+        results = pool.map(_process_chunk_in_worker, chunks)
+    else:
+        pool = None
+        results = (
+            process_saved_searches(chunk, animals, now, dry_run) for chunk in chunks
+        )
+
+    try:
+        # Results come back in chunk order, so the checkpoint only moves past
+        # saved searches that have all been processed
+        for chunk, stats in zip(chunks, results):
+            for key, value in stats.items():
+                totals[key] += value
+            if run:
+                run.last_saved_search_id = chunk[-1]
+                run.emails_sent += stats["emails"]
+                run.save(
+                    update_fields=["last_saved_search_id", "emails_sent", "updated_at"]
+                )
+            logger.info(
+                "Checked saved searches up to #%d, %d emails",
+                chunk[-1],
+                stats["emails"],
+            )
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        close_pooled_connection()
+
+    if run:
+        _finish_run(run)
+    return totals
+
+
+def request_saved_search_digest():
+    """Queue a run of the digest for the run_saved_search_digests worker"""
+    return SavedSearchDigestRequest.objects.create()
+
+
+def claim_digest_requests():
+    """
+    Remove the waiting requests for a digest, returning how many there were.
+    Requests another worker is claiming are skipped.
+    """
+    with transaction.atomic():
+        ids = list(
+            SavedSearchDigestRequest.objects.select_for_update(
+                skip_locked=True
+            ).values_list("id", flat=True)
+        )
+        SavedSearchDigestRequest.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def run_requested_digest(**kwargs):
+    """
+    Run the digest if it has been requested, returning its stats, or None if
+    it wasn't requested or is already running elsewhere. kwargs are passed
+    to run_saved_search_digest.
+    """
+    if not claim_digest_requests():
+        return None
+    try:
+        return run_saved_search_digest(**kwargs)
+    except AlreadyRunningError as e:
+        # The running digest sends these emails, or the next one does
+        logger.info("%s", e)
+        return None
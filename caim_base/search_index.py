@@ -0,0 +1,162 @@
+import logging
+
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models.animals import Animal, Breed
+from .models.awg import Awg
+from .models.search_index import AnimalSearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration for Animal.search_vector and the queries on it
+SEARCH_CONFIG = "english"
+
+# Columns rewritten when an animal is reindexed
+_UPDATE_FIELDS = [
+    field.name
+    for field in AnimalSearchIndex._meta.concrete_fields
+    if not field.primary_key
+]
+
+
+def index_row(animal):
+    """An (unsaved) AnimalSearchIndex row for an animal and its AWG"""
+    good = Animal.AnimalBehaviourGrade.GOOD
+    return AnimalSearchIndex(
+        animal_id=animal.id,
+        awg_id=animal.awg_id,
+        animal_type=animal.animal_type,
+        age=animal.age,
+        size=animal.size,
+        sex=animal.sex,
+        good_with_cats=animal.behaviour_cats == good,
+        good_with_dogs=animal.behaviour_dogs == good,
+        good_with_kids=animal.behaviour_kids == good,
+        euth_date=animal.euth_date,
+        breed_ids=[
+            breed_id
+            for breed_id in (animal.primary_breed_id, animal.secondary_breed_id)
+            if breed_id
+        ],
+        geo_location=animal.awg.geo_location,
+        created_at=animal.created_at,
+        first_published_at=animal.first_published_at,
+    )
+
+
+def search_vector():
+    """
+    Expression for an animal's Animal.search_vector: its name, then its breed
+    names, then its description and special needs, in falling weight
+    """
+
+    def breed_name(field):
+        return Subquery(Breed.objects.filter(pk=OuterRef(field)).values("name")[:1])
+
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(
+            breed_name("primary_breed_id"),
+            breed_name("secondary_breed_id"),
+            weight="B",
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector("description", "special_needs", weight="C", config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(animals):
+    """Recompute search_vector for a queryset of animals, in one UPDATE"""
+    return animals.update(search_vector=search_vector())
+
+
+def _upsert(rows, batch_size=1000):
+    AnimalSearchIndex.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["animal"],
+        update_fields=_UPDATE_FIELDS,
+    )
+
+
+def sync_animal(animal):
+    """Add, update or remove an animal's row"""
+    if animal.is_currently_published():
+        _upsert([index_row(animal)])
+    else:
+        AnimalSearchIndex.objects.filter(animal_id=animal.id).delete()
+
+
+def sync_awg(awg):
+    """Reindex every animal of an AWG, eg after its status or location changed"""
+    if not awg.is_currently_published():
+        AnimalSearchIndex.objects.filter(awg_id=awg.id).delete()
+        return
+    animals = Animal.objects.filter(awg=awg, is_published=True)
+    rows = []
+    for animal in animals:
+        # Use the saved AWG rather than loading it again for each animal
+        animal.awg = awg
+        rows.append(index_row(animal))
+    _upsert(rows)
+    AnimalSearchIndex.objects.filter(awg_id=awg.id).exclude(
+        animal_id__in=[row.animal_id for row in rows]
+    ).delete()
+
+
+def rebuild(batch_size=1000):
+    """
+    Rebuild the whole index and every animal's search_vector. Returns the
+    number of rows indexed
+    """
+    update_search_vectors(Animal.objects.all())
+    animals = Animal.objects.filter(
+        is_published=True, awg__status=Awg.AwgStatus.PUBLISHED
+    ).select_related("awg")
+    count = 0
+    rows = []
+    for animal in animals.iterator(chunk_size=batch_size):
+        rows.append(index_row(animal))
+        if len(rows) >= batch_size:
+            _upsert(rows, batch_size)
+            count += len(rows)
+            rows = []
+    _upsert(rows, batch_size)
+    count += len(rows)
+    AnimalSearchIndex.objects.exclude(animal__in=animals.values("id")).delete()
+    logger.info("Indexed %d animals", count)
+    return count
+
+
+# Deleting an animal or AWG deletes its rows by cascade. Breeds can't be
+# deleted while animals use them and their ids never change, so the index
+# only depends on breed names, through search_vector. Queryset update() and
+# bulk_create skip these, so call sync_animal / sync_awg and
+# update_search_vectors (or rebuild) after using them.
+
+
+@receiver(post_save, sender=Animal)
+def index_animal(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_search_vectors(Animal.objects.filter(pk=instance.pk))
+        sync_animal(instance)
+
+
+@receiver(post_save, sender=Breed)
+def index_breed(sender, instance, raw=False, created=False, **kwargs):
+    # A new breed has no animals yet
+    if not raw and not created:
+        update_search_vectors(
+            Animal.objects.filter(primary_breed=instance)
+            | Animal.objects.filter(secondary_breed=instance)
+        )
+
+
+@receiver(post_save, sender=Awg)
+def index_awg(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_awg(instance)
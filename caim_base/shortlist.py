@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import cache_aside, cache_set, invalidate_keys, make_key
+from .models.animals import AnimalShortList
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _load(user_id):
+    return frozenset(
+        AnimalShortList.objects.filter(user=user_id).values_list("animal_id", flat=True)
+    )
+
+
+def get_shortlist_ids(user):
+    """
+    Frozenset of the ids of the animals the user has shortlisted, from the
+    cache if possible, so templates can check membership in O(1)
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    return cache_aside(
+        make_key("shortlist", user.id), lambda: _load(user.id), CACHE_TIMEOUT
+    )
+
+
+def refresh_shortlist(user_id):
+    ids = _load(user_id)
+    cache_set(make_key("shortlist", user_id), ids, CACHE_TIMEOUT)
+    return ids
+
+
+def set_shortlisted(user, animal, is_set):
+    if is_set:
+        AnimalShortList.objects.get_or_create(user=user, animal=animal)
+    else:
+        AnimalShortList.objects.filter(user=user, animal=animal).delete()
+    return refresh_shortlist(user.id)
+
+
+@receiver(post_save, sender=AnimalShortList)
+@receiver(post_delete, sender=AnimalShortList)
+def invalidate_shortlist(sender, instance, **kwargs):
+    # Eg shortlists deleted along with their animal, or edited in the admin
+    invalidate_keys(make_key("shortlist", instance.user_id))
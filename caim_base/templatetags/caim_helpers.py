@@ -1,8 +1,13 @@
 import json
+import logging
+
 from django import template
 from django.conf import settings
-from sorl.thumbnail import get_thumbnail
+from django.db.models.fields.files import FieldFile
+
+from .. import thumbnails
 
+logger = logging.getLogger(__name__)
 
 register = template.Library()
 
@@ -21,32 +26,44 @@ def modify_qs(context, key1=None, value1=None, key2=None, value2=None):
     return "?" + ret
 
 
-# url | image_resize:"WxH crop|max"
+# image field | image_resize:"WxH crop|max"
 @register.filter
 def image_resize(value, resize):
-    parts = resize.split(" ")
-    if len(parts) == 1:
-        parts.append("crop")
+    spec, geometry, _ = thumbnails.parse_spec(resize)
     if settings.IMAGE_RESIZE_USE_IMAGKIT:
         # Replace the S3 bucket with the imagekit CDN URL and add the resize params
-        wh = parts[0].split("x")
+        url = value.url if isinstance(value, FieldFile) else value
+        wh = geometry.split("x")
         filter = "c-maintain_ratio,fo-auto,pr-true"
-        if parts[1] == "max":
+        if spec.endswith("max"):
             filter = "c-at_max,pr-true"
 
         return (
-            value.replace(settings.IMAGE_RESIZE_ORIGIN, settings.IMAGE_RESIZE_CDN)
+            url.replace(settings.IMAGE_RESIZE_ORIGIN, settings.IMAGE_RESIZE_CDN)
             + f"?tr=w-{wh[0]},h-{wh[1]},{filter}"
         )
+
+    # Renditions are generated when the photo is saved (see thumbnails.py)
+    if isinstance(value, FieldFile):
+        url = thumbnails.lookup(value, spec)
+        if url:
+            return url
+        name = value.name
     else:
-        # Use sorl-thumbnail to resize and return url
-        value = value.replace("/media/", "")
-        args = {
-            "quality": 99,
-        }
-        if parts[1] == "crop":
-            args["crop"] = "center"
-        return get_thumbnail(value, parts[0], **args).url
+        name = value.replace("/media/", "")
+    # Resizing here decodes the full image inside the request
+    logger.error(
+        "Image %s resized to %s while rendering, it has no precomputed rendition",
+        name,
+        spec,
+    )
+    return thumbnails.resize(name, spec)
+
+
+# facets.age|facet_count:"BABY" - the count from get_facets, or 0
+@register.filter
+def facet_count(counts, value):
+    return counts.get(value, 0)
 
 
 @register.filter
@@ -0,0 +1,50 @@
+import math
+
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase
+
+from caim_base.animal_search import (
+    EARTH_RADIUS_METERS,
+    MILES_TO_METERS,
+    radius_bounding_box,
+)
+
+
+def destination(point, bearing, distance):
+    """The point distance meters from point along bearing (in degrees)"""
+    angle = distance / EARTH_RADIUS_METERS
+    lat1 = math.radians(point.y)
+    bearing = math.radians(bearing)
+    lat2 = math.asin(
+        math.sin(lat1) * math.cos(angle)
+        + math.cos(lat1) * math.sin(angle) * math.cos(bearing)
+    )
+    lng2 = math.radians(point.x) + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat1),
+        math.cos(angle) - math.sin(lat1) * math.sin(lat2),
+    )
+    return Point(math.degrees(lng2), math.degrees(lat2))
+
+
+class RadiusBoundingBoxTesting(SimpleTestCase):
+    def test_contains_the_whole_circle(self):
+        for lat in (0, 25, 45, 61, 70):
+            for miles in (10, 100, 500):
+                center = Point(-100, lat, srid=4326)
+                radius = miles * MILES_TO_METERS
+                box = radius_bounding_box(center, radius)
+                min_x, min_y, max_x, max_y = box.extent
+                for bearing in range(0, 360, 5):
+                    edge = destination(center, bearing, radius)
+                    self.assertTrue(
+                        min_x <= edge.x <= max_x and min_y <= edge.y <= max_y,
+                        f"{miles} miles at {lat}, bearing {bearing}",
+                    )
+
+    def test_circle_around_a_pole(self):
+        center = Point(-150, 89, srid=4326)
+        self.assertIsNone(radius_bounding_box(center, 200 * MILES_TO_METERS))
+
+    def test_across_the_antimeridian(self):
+        center = Point(179.5, 52, srid=4326)
+        self.assertIsNone(radius_bounding_box(center, 100 * MILES_TO_METERS))
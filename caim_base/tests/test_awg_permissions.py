@@ -0,0 +1,76 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
+
+from caim_base.awg_permissions import (
+    STAFF_PERMISSIONS,
+    AwgPermission,
+    get_awg_permissions,
+    is_awg_member,
+)
+from caim_base.models.awg import AwgMember
+from caim_base.tests.factories import AwgFactory, UserFactory
+
+
+class AwgPermissionsTesting(TestCase):
+    def setUp(self):
+        self.awgs = [AwgFactory(), AwgFactory(), AwgFactory()]
+        self.user = UserFactory(username="member")
+        AwgMember.objects.create(
+            user=self.user, awg=self.awgs[0], canManageAnimals=True
+        )
+        AwgMember.objects.create(
+            user=self.user,
+            awg=self.awgs[1],
+            canEditProfile=True,
+            canViewApplications=True,
+        )
+
+    def make_request(self, user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return request
+
+    def test_one_query_per_request(self):
+        request = self.make_request(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_awg_permissions(request, self.awgs[0]),
+                AwgPermission.MANAGE_ANIMALS,
+            )
+            self.assertEqual(
+                get_awg_permissions(request, self.awgs[1]),
+                AwgPermission.EDIT_PROFILE | AwgPermission.VIEW_APPLICATIONS,
+            )
+            self.assertEqual(get_awg_permissions(request, self.awgs[2]), 0)
+            self.assertTrue(is_awg_member(request, self.awgs[1]))
+            self.assertFalse(is_awg_member(request, self.awgs[2]))
+
+    def test_membership_changes_invalidate(self):
+        request = self.make_request(self.user)
+        self.assertFalse(is_awg_member(request, self.awgs[2]))
+        member = AwgMember.objects.create(
+            user=self.user, awg=self.awgs[2], canManageMembers=True
+        )
+        self.assertEqual(
+            get_awg_permissions(request, self.awgs[2]), AwgPermission.MANAGE_MEMBERS
+        )
+        member.delete()
+        self.assertFalse(is_awg_member(request, self.awgs[2]))
+
+    def test_staff(self):
+        staff = UserFactory(username="staff", is_staff=True)
+        request = self.make_request(staff)
+        self.assertEqual(get_awg_permissions(request, self.awgs[0]), STAFF_PERMISSIONS)
+        self.assertFalse(is_awg_member(request, self.awgs[0]))
+
+    def test_anonymous(self):
+        request = self.make_request(AnonymousUser())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_awg_permissions(request, self.awgs[0]), 0)
+            self.assertFalse(is_awg_member(request, self.awgs[0]))
+
+    def test_names_in_templates(self):
+        permissions = AwgPermission.MANAGE_ANIMALS | AwgPermission.EDIT_PROFILE
+        self.assertIn("MANAGE_ANIMALS", permissions)
+        self.assertNotIn("MANAGE_MEMBERS", permissions)
+        self.assertNotIn("NOT_A_PERMISSION", permissions)
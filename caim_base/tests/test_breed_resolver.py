@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from caim_base.breed_resolver import breed_resolver
+from caim_base.models.animals import AnimalType
+from caim_base.tests.factories import BreedFactory
+
+
+class BreedResolverTesting(TestCase):
+    def setUp(self):
+        cache.clear()
+        breed_resolver.invalidate()
+        self.unknown_dog = BreedFactory(
+            name="Unknown", slug="unknown-dog", animal_type=AnimalType.DOG
+        )
+        self.beagle = BreedFactory(
+            name="Beagle", slug="beagle", animal_type=AnimalType.DOG
+        )
+        self.siamese = BreedFactory(
+            name="Siamese", slug="siamese", animal_type=AnimalType.CAT
+        )
+
+    def test_resolve(self):
+        self.assertEqual(breed_resolver.resolve("beagle"), self.beagle.id)
+        self.assertEqual(
+            breed_resolver.resolve("beagle", AnimalType.DOG), self.beagle.id
+        )
+        # Not a cat breed
+        self.assertIsNone(breed_resolver.resolve("beagle", AnimalType.CAT))
+        self.assertIsNone(breed_resolver.resolve("poodle", AnimalType.DOG))
+
+    def test_fallback(self):
+        self.assertEqual(
+            breed_resolver.resolve("poodle", AnimalType.DOG, fallback=True),
+            self.unknown_dog.id,
+        )
+        # There is no unknown cat breed
+        self.assertIsNone(
+            breed_resolver.resolve("poodle", AnimalType.CAT, fallback=True)
+        )
+
+    def test_resolve_many_loads_once(self):
+        with self.assertNumQueries(1):
+            resolved = breed_resolver.resolve_many(
+                ["beagle", "poodle", "siamese"], AnimalType.DOG, fallback=True
+            )
+            breed_resolver.resolve_many(["beagle"])
+        self.assertEqual(
+            resolved,
+            {
+                "beagle": self.beagle.id,
+                "poodle": self.unknown_dog.id,
+                "siamese": self.unknown_dog.id,
+            },
+        )
+
+    def test_choices(self):
+        self.assertEqual(
+            [breed.slug for breed in breed_resolver.choices(AnimalType.DOG)],
+            ["beagle", "unknown-dog"],
+        )
+        self.assertEqual(len(breed_resolver.choices()), 3)
+
+    def test_invalidated_on_save(self):
+        breed_resolver.choices()
+        with self.assertNumQueries(0):
+            breed_resolver.choices()
+        BreedFactory(name="Poodle", slug="poodle", animal_type=AnimalType.DOG)
+        self.assertIsNotNone(breed_resolver.resolve("poodle"))
+        self.assertEqual(len(breed_resolver.choices(AnimalType.DOG)), 3)
@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from caim_base.cached_models import get_animal, get_awg
+from caim_base.caching import bump_namespace, cache_aside, versioned_key
+from caim_base.tests.factories import AnimalFactory
+
+
+class CachingTesting(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.animal = AnimalFactory(name="Rex")
+
+    def test_cache_aside(self):
+        loader = mock.Mock(return_value=None)
+        self.assertIsNone(cache_aside("test", loader))
+        self.assertIsNone(cache_aside("test", loader))
+        # None is cached too
+        loader.assert_called_once()
+
+    def test_cache_unavailable(self):
+        with mock.patch.object(cache, "get", side_effect=ConnectionError):
+            self.assertEqual(cache_aside("test", lambda: 1), 1)
+
+    @override_settings(CACHE_MAX_TIMEOUT=60)
+    def test_timeout_capped_for_per_process_cache(self):
+        with mock.patch.object(cache, "set") as cache_set:
+            cache_aside("test", lambda: 1, 24 * 60 * 60)
+        cache_set.assert_called_once_with("test", 1, 60)
+
+    def test_versioned_key(self):
+        key = versioned_key("test", 1)
+        self.assertEqual(versioned_key("test", 1), key)
+        bump_namespace("test")
+        self.assertNotEqual(versioned_key("test", 1), key)
+
+    def test_animal_cached_with_related(self):
+        get_animal(self.animal.id)
+        with self.assertNumQueries(0):
+            animal = get_animal(self.animal.id)
+            self.assertEqual(animal.awg.name, self.animal.awg.name)
+        self.assertIsNone(get_animal(0))
+
+    def test_animal_invalidated_on_save(self):
+        get_animal(self.animal.id)
+        self.animal.name = "Max"
+        self.animal.save()
+        self.assertEqual(get_animal(self.animal.id).name, "Max")
+
+    def test_awg_invalidates_its_animals(self):
+        get_animal(self.animal.id)
+        get_awg(self.animal.awg.id)
+        self.animal.awg.name = "Renamed"
+        self.animal.awg.save()
+        self.assertEqual(get_awg(self.animal.awg.id).name, "Renamed")
+        self.assertEqual(get_animal(self.animal.id).awg.name, "Renamed")
@@ -0,0 +1,89 @@
+import socket
+
+from aiosmtpd.controller import Controller
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, override_settings
+
+from caim_base.email_delivery import (
+    DeliveryError,
+    close_pooled_connection,
+    send_messages,
+)
+
+
+class Handler:
+    """Records delivered messages and fails them on request"""
+
+    def __init__(self):
+        self.received = []
+        self.sessions = set()
+        # Replies to give instead of accepting the next few DATA commands
+        self.replies = []
+        # Recipients to permanently reject
+        self.rejected = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.rejected:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        if self.replies:
+            return self.replies.pop(0)
+        self.received.extend(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def message(i):
+    return EmailMessage("Hello", "Body", "notifications@caim.org", [f"{i}@test.com"])
+
+
+class SendMessagesTesting(SimpleTestCase):
+    def setUp(self):
+        self.handler = Handler()
+        port = free_port()
+        self.controller = Controller(self.handler, hostname="127.0.0.1", port=port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+        overrides = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=port,
+            EMAIL_USE_TLS=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.addCleanup(close_pooled_connection)
+
+    def send(self, messages, **kwargs):
+        return send_messages(messages, backoff=0, **kwargs)
+
+    def test_reuses_one_connection(self):
+        self.assertEqual(self.send([message(i) for i in range(5)], batch_size=2), 5)
+        self.assertEqual(self.send([message(5)]), 1)
+        self.assertEqual(self.handler.received, [f"{i}@test.com" for i in range(6)])
+        self.assertEqual(len(self.handler.sessions), 1)
+
+    def test_retries_transient_failures_without_duplicates(self):
+        self.handler.replies = ["451 Try again later", "421 Closing"]
+        self.assertEqual(self.send([message(i) for i in range(3)]), 3)
+        self.assertEqual(self.handler.received, [f"{i}@test.com" for i in range(3)])
+
+    def test_gives_up_after_max_attempts(self):
+        self.handler.replies = ["451 Try again later"] * 2
+        with self.assertRaises(DeliveryError):
+            self.send([message(0)], attempts=2)
+        self.assertEqual(self.handler.received, [])
+
+    def test_skips_rejected_messages(self):
+        self.handler.rejected = {"1@test.com"}
+        self.assertEqual(self.send([message(i) for i in range(3)]), 2)
+        self.assertEqual(self.handler.received, ["0@test.com", "2@test.com"])
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+
+from caim_base.breed_resolver import breed_resolver
+from caim_base.facets import count_facets, get_facets
+from caim_base.models import Animal, Awg
+from caim_base.tests.factories import AnimalFactory, AwgFactory, BreedFactory
+
+
+class FacetsTesting(TestCase):
+    def setUp(self):
+        cache.clear()
+        breed_resolver.invalidate()
+        awg = AwgFactory(status=Awg.AwgStatus.PUBLISHED)
+        self.beagle = BreedFactory(name="Beagle", slug="beagle")
+        self.poodle = BreedFactory(name="Poodle", slug="poodle")
+        good = Animal.AnimalBehaviourGrade.GOOD
+        for i in range(6):
+            AnimalFactory(
+                awg=awg,
+                primary_breed=self.beagle,
+                # Twice the same breed still counts once
+                secondary_breed=self.poodle if i % 2 else self.beagle,
+                primary_photo="animal.jpg",
+                is_published=True,
+                age=Animal.AnimalAge.ADULT if i < 4 else Animal.AnimalAge.BABY,
+                size=Animal.AnimalSize.M,
+                sex=Animal.AnimalSex.F if i % 3 else Animal.AnimalSex.M,
+                behaviour_cats=good if i < 2 else Animal.AnimalBehaviourGrade.POOR,
+            )
+        # Not published, so not counted
+        AnimalFactory(awg=awg, primary_breed=self.poodle, is_published=False)
+
+    def test_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = count_facets(AnonymousUser(), {})
+        self.assertEqual(counts["total"], 6)
+        self.assertEqual(counts["age"], {"ADULT": 4, "BABY": 2})
+        self.assertEqual(counts["size"], {"M": 6})
+        self.assertEqual(counts["sex"], {"F": 4, "M": 2})
+        self.assertEqual(counts["breed"], {self.beagle.id: 6, self.poodle.id: 3})
+        self.assertEqual(counts["good_with_cats"], 2)
+        self.assertEqual(counts["good_with_dogs"], 0)
+
+    def test_counts_filtered_set(self):
+        counts = count_facets(AnonymousUser(), {"age": "baby"})
+        self.assertEqual(counts["total"], 2)
+        # Not narrowed down by the age filter itself
+        self.assertEqual(counts["age"], {"ADULT": 4, "BABY": 2})
+        self.assertEqual(counts["sex"], {"F": 2})
+        self.assertEqual(counts["good_with_cats"], 0)
+
+    def test_each_facet_ignores_its_own_filter(self):
+        counts = count_facets(
+            AnonymousUser(), {"age": "baby", "sex": "m", "breed": "poodle"}
+        )
+        self.assertEqual(counts["total"], 0)
+        # Male poodles, baby poodles, then male babies
+        self.assertEqual(counts["age"], {"ADULT": 1})
+        self.assertEqual(counts["sex"], {"F": 1})
+        self.assertEqual(counts["breed"], {})
+
+    def test_unknown_breed(self):
+        counts = count_facets(AnonymousUser(), {"breed": "no-such-breed"})
+        self.assertEqual(counts["total"], 0)
+        self.assertEqual(counts["age"], {})
+        self.assertEqual(counts["breed"], {self.beagle.id: 6, self.poodle.id: 3})
+
+    def test_cached_per_filters(self):
+        search = {"age": "adult", "sort": "-created_at"}
+        counts = get_facets(AnonymousUser(), search)
+        with self.assertNumQueries(0):
+            # The sort doesn't change the counts
+            self.assertEqual(
+                get_facets(AnonymousUser(), {**search, "sort": "euth_date"}), counts
+            )
+        self.assertNotEqual(get_facets(AnonymousUser(), {"age": "baby"}), counts)
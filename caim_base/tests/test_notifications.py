@@ -1,4 +1,5 @@
 from django.test import TestCase
+from caim_base.outbox import deliver_pending
 from caim_base.tests.factories import FosterApplicationFactory
 from django.core import mail
 
@@ -13,6 +14,9 @@ class EmailTesting(TestCase):
         foster_application = FosterApplicationFactory()
         foster_application.save()
 
+        # Queued, not sent during the request
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(deliver_pending(threads=1), (1, 0))
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, "New Fosterer Application")
         self.assertIn(
@@ -0,0 +1,104 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from caim_base.models.outbox import OutboxMessage
+from caim_base.outbox import (
+    MAX_ATTEMPTS,
+    claim_messages,
+    deliver_pending,
+    enqueue_notification,
+)
+from caim_base.tests.factories import FosterApplicationFactory
+
+
+class OutboxTesting(TestCase):
+    def setUp(self):
+        self.application = FosterApplicationFactory()
+        OutboxMessage.objects.all().delete()
+
+    def test_dedup_key(self):
+        enqueue_notification("notify_new_fosterer_application", self.application)
+        enqueue_notification("notify_new_fosterer_application", self.application)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+        self.assertEqual(deliver_pending(threads=1), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.Statuses.SENT)
+        self.assertEqual(message.attempts, 1)
+
+    def test_unknown_notification(self):
+        with self.assertRaises(ValueError):
+            enqueue_notification("notify_nobody", self.application)
+
+    def test_failure_is_retried_later(self):
+        enqueue_notification("notify_new_fosterer_application", self.application)
+        with mock.patch(
+            "caim_base.notifications.notify_new_fosterer_application",
+            side_effect=OSError("Connection refused"),
+        ):
+            self.assertEqual(deliver_pending(threads=1), (0, 1))
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.status, OutboxMessage.Statuses.PENDING)
+        self.assertEqual(message.last_error, "OSError: Connection refused")
+        self.assertGreater(message.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(claim_messages(10), [])
+
+    def test_gives_up_after_max_attempts(self):
+        message = enqueue_notification(
+            "notify_new_fosterer_application", self.application
+        )
+        OutboxMessage.objects.filter(id=message.id).update(attempts=MAX_ATTEMPTS - 1)
+        with mock.patch(
+            "caim_base.notifications.notify_new_fosterer_application",
+            side_effect=OSError("Connection refused"),
+        ):
+            deliver_pending(threads=1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.Statuses.FAILED)
+
+    def test_deleted_object_fails(self):
+        message = enqueue_notification(
+            "notify_new_fosterer_application", self.application
+        )
+        self.application.delete()
+        self.assertEqual(deliver_pending(threads=1), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.Statuses.FAILED)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_reclaims_abandoned_messages(self):
+        message = enqueue_notification(
+            "notify_new_fosterer_application", self.application
+        )
+        self.assertEqual(claim_messages(10), [message])
+        self.assertEqual(claim_messages(10), [])
+        OutboxMessage.objects.filter(id=message.id).update(
+            next_attempt_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(claim_messages(10), [message])
+
+
+COMMAND = "caim_base.management.commands.deliver_outbox"
+
+
+class DeliverOutboxCommandTesting(TestCase):
+    @mock.patch(
+        f"{COMMAND}.deliver_pending",
+        side_effect=[RuntimeError("Database restarting"), (1, 0)],
+    )
+    @mock.patch(f"{COMMAND}.close_old_connections")
+    @mock.patch(f"{COMMAND}.time.sleep", side_effect=[None, KeyboardInterrupt])
+    def test_keeps_running_after_errors(self, sleep, close, deliver):
+        out = StringIO()
+        with self.assertLogs(COMMAND, "ERROR"), self.assertRaises(KeyboardInterrupt):
+            call_command("deliver_outbox", stdout=out)
+        self.assertEqual(deliver.call_count, 2)
+        self.assertEqual(close.call_count, 2)
+        self.assertIn("Sent 1 notifications", out.getvalue())
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.exceptions import BadRequest
+from django.test import TestCase
+
+from caim_base.models import Animal
+from caim_base.pagination import KeysetPaginator
+from caim_base.tests.factories import AnimalFactory
+
+
+class KeysetPaginatorTesting(TestCase):
+    def setUp(self):
+        first = AnimalFactory(euth_date=None)
+        today = date.today()
+        for i in range(9):
+            # Some duplicate and some missing euth dates to exercise the id
+            # tie-break and NULL ordering
+            euth_date = None if i % 3 == 0 else today + timedelta(days=i // 2)
+            AnimalFactory(
+                awg=first.awg, primary_breed=first.primary_breed, euth_date=euth_date
+            )
+
+    def walk(self, sort, per_page):
+        paginator = KeysetPaginator(Animal.objects.all(), sort, per_page)
+        pages = []
+        page = paginator.page()
+        pages.append([a.id for a in page])
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append([a.id for a in page])
+        return paginator, pages
+
+    def test_matches_offset_ordering(self):
+        for sort in ("euth_date", "-euth_date", "-created_at", "created_at"):
+            expected = list(
+                Animal.objects.order_by(sort, "id").values_list("id", flat=True)
+            )
+            _, pages = self.walk(sort, 3)
+            self.assertEqual([i for p in pages for i in p], expected, sort)
+            self.assertEqual(len(pages), 4)
+
+    def test_previous_page(self):
+        paginator = KeysetPaginator(Animal.objects.all(), "euth_date", 3)
+        first = paginator.page()
+        self.assertFalse(first.has_previous())
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        back = paginator.page(third.previous_cursor)
+        self.assertEqual([a.id for a in back], [a.id for a in second])
+        self.assertTrue(back.has_next())
+        back = paginator.page(back.previous_cursor)
+        self.assertEqual([a.id for a in back], [a.id for a in first])
+        self.assertFalse(back.has_previous())
+
+    def test_page_query_count(self):
+        paginator = KeysetPaginator(Animal.objects.all(), "-created_at", 3)
+        cursor = paginator.page().next_cursor
+        with self.assertNumQueries(1):
+            list(paginator.page(cursor))
+
+    def test_total(self):
+        page = KeysetPaginator(Animal.objects.all(), "-created_at", 3).page()
+        self.assertEqual(page.total, 10)
+        self.assertFalse(page.total_is_capped)
+
+        with mock.patch("caim_base.pagination.COUNT_LIMIT", 4):
+            page = KeysetPaginator(Animal.objects.all(), "-created_at", 3).page()
+            self.assertEqual((page.total, page.total_is_capped), (4, True))
+
+    def test_total_only_counted_when_needed(self):
+        paginator = KeysetPaginator(Animal.objects.all(), "-created_at", 3)
+        with self.assertNumQueries(1):
+            paginator.page()
+        # Everything is on the one page
+        page = KeysetPaginator(Animal.objects.all(), "-created_at", 20).page()
+        with self.assertNumQueries(0):
+            self.assertEqual(page.total, 10)
+
+    def test_cursor_from_other_sort_restarts(self):
+        cursor = KeysetPaginator(Animal.objects.all(), "euth_date", 3).page()
+        paginator = KeysetPaginator(Animal.objects.all(), "-created_at", 3)
+        self.assertEqual(
+            [a.id for a in paginator.page(cursor.next_cursor)],
+            [a.id for a in paginator.page()],
+        )
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Animal.objects.all(), "-created_at", 3)
+        with self.assertRaises(BadRequest):
+            paginator.page("not-a-cursor")
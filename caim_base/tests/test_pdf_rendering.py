@@ -0,0 +1,236 @@
+import io
+import zipfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from caim_base import pdf_rendering
+from caim_base.models.awg import AwgMember
+from caim_base.models.fosterer import FosterApplication
+from caim_base.tests.factories import (
+    AnimalFactory,
+    AwgFactory,
+    FosterApplicationFactory,
+    FostererProfileFactory,
+    UserFactory,
+)
+from caim_base.views.awg.applications import application_pdf_filename
+
+
+@override_settings(PDF_RENDER_WORKERS=0)
+class PdfRenderingTesting(TestCase):
+    def setUp(self):
+        caches[pdf_rendering.PDF_CACHE].clear()
+        self.application = FosterApplicationFactory()
+
+    def test_renders_pdf(self):
+        pdf = pdf_rendering.get_application_pdf(self.application)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+    def test_cached_until_changed(self):
+        with mock.patch.object(
+            pdf_rendering, "write_pdf", return_value=b"%PDF-1"
+        ) as write_pdf:
+            pdf_rendering.get_application_pdf(self.application)
+            pdf_rendering.get_application_pdf(self.application)
+            self.assertEqual(write_pdf.call_count, 1)
+
+            self.application.fosterer.city = "Somewhere else"
+            self.application.fosterer.save()
+            write_pdf.return_value = b"%PDF-2"
+            self.assertEqual(
+                pdf_rendering.get_application_pdf(self.application), b"%PDF-2"
+            )
+            self.assertEqual(write_pdf.call_count, 2)
+
+            # A cached PDF doesn't need its page built
+            with mock.patch.object(pdf_rendering, "application_html") as html:
+                pdf_rendering.get_application_pdf(self.application)
+            html.assert_not_called()
+
+    def test_new_after_related_change(self):
+        key = pdf_rendering.pdf_key(self.application)
+        self.application.fosterer.references.create(
+            first_name="Ann",
+            last_name="Other",
+            email="ann@example.com",
+            relation="Friend",
+        )
+        self.application.fosterer.refresh_from_db()
+        self.assertNotEqual(pdf_rendering.pdf_key(self.application), key)
+
+    def test_cached_encrypted(self):
+        with mock.patch.object(pdf_rendering, "write_pdf", return_value=b"%PDF-1"):
+            pdf_rendering.get_application_pdf(self.application)
+        key = pdf_rendering.pdf_key(self.application)
+        stored = caches[pdf_rendering.PDF_CACHE].get(key)
+        self.assertNotIn(b"%PDF", stored)
+        self.assertEqual(pdf_rendering.cached_pdfs([key]), {key: b"%PDF-1"})
+
+        with override_settings(SECRET_KEY="another key"):
+            # Rendered again rather than failing
+            self.assertEqual(pdf_rendering.cached_pdfs([key]), {})
+
+    def test_stylesheets_parsed_once(self):
+        pdf_rendering.get_application_pdf(self.application)
+        with mock.patch("caim_base.pdf_writer.CSS") as css:
+            pdf_rendering.render_pdf("<p>Another</p>")
+        css.assert_not_called()
+
+    def test_prerendered_when_created(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            application = FosterApplication.objects.create(
+                animal=self.application.animal,
+                fosterer=FostererProfileFactory(user=UserFactory(username="second")),
+                status=FosterApplication.Statuses.PENDING,
+            )
+        self.assertEqual(len(callbacks), 1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            application.status = FosterApplication.Statuses.ACCEPTED
+            application.save()
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(PDF_RENDER_WORKERS=1)
+class PdfDownloadTesting(TestCase):
+    def setUp(self):
+        caches[pdf_rendering.PDF_CACHE].clear()
+        self.application = FosterApplicationFactory()
+        self.reviewer = UserFactory(username="reviewer")
+        AwgMember.objects.create(
+            user=self.reviewer,
+            awg=self.application.animal.awg,
+            canViewApplications=True,
+        )
+        self.application.animal.awg.status = "PUBLISHED"
+        self.application.animal.awg.save()
+
+    def download(self):
+        self.client.force_login(self.reviewer)
+        return self.client.get(
+            reverse("application_pdf"),
+            {
+                "fosterer_id": self.application.fosterer.id,
+                "animal_id": self.application.animal.id,
+            },
+        )
+
+    def test_doesnt_wait_for_render(self):
+        future = Future()
+        with mock.patch.object(pdf_rendering, "_submit", return_value=future) as submit:
+            response = self.download()
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response["Refresh"], "2")
+            # Still rendering, so not started again
+            self.assertEqual(self.download().status_code, 202)
+            self.assertEqual(submit.call_count, 1)
+
+            future.set_result(b"%PDF-1")
+            response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"%PDF-1")
+
+
+@override_settings(PDF_RENDER_WORKERS=1)
+class PdfRenderingPoolTesting(TestCase):
+    def test_prerender_caches_pdf(self):
+        application = FosterApplicationFactory()
+        caches[pdf_rendering.PDF_CACHE].clear()
+        pdf_rendering.prerender_application_pdf(application)
+        # There is one renderer, so this finishes after the prerender
+        pool = pdf_rendering._get_pool()  # pylint: disable=protected-access
+        pool.submit(int).result(timeout=pdf_rendering.RENDER_TIMEOUT)
+        key = pdf_rendering.pdf_key(application)
+        pdf = pdf_rendering.cached_pdfs([key])[key]
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+
+@override_settings(PDF_RENDER_WORKERS=0)
+class ApplicationsZipTesting(TestCase):
+    def setUp(self):
+        caches[pdf_rendering.PDF_CACHE].clear()
+        self.awg = AwgFactory(name="Happy Paws")
+        animal = AnimalFactory(awg=self.awg, name="Rex")
+        self.applications = [
+            FosterApplicationFactory(
+                animal=animal,
+                fosterer=FostererProfileFactory(
+                    user=UserFactory(username=f"fosterer{i}"),
+                    firstname="Sam",
+                    lastname=f"Smith{i}",
+                ),
+                status=FosterApplication.Statuses.PENDING,
+            )
+            for i in range(3)
+        ]
+        self.reviewer = UserFactory(username="reviewer")
+        AwgMember.objects.create(
+            user=self.reviewer, awg=self.awg, canViewApplications=True
+        )
+        self.url = reverse("awg_download_applications", args=[self.awg.id])
+
+    def download(self, **params):
+        self.client.force_login(self.reviewer)
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_zip_of_pdfs(self):
+        with mock.patch.object(pdf_rendering, "write_pdf", return_value=b"%PDF-1"):
+            archive = self.download()
+        self.assertEqual(
+            sorted(archive.namelist()),
+            [
+                f"smith{i}-sam-rex-{application.id}.pdf"
+                for i, application in enumerate(self.applications)
+            ],
+        )
+        self.assertEqual(archive.read(archive.namelist()[0]), b"%PDF-1")
+
+    def test_filtered_by_status(self):
+        self.applications[0].status = FosterApplication.Statuses.ACCEPTED
+        self.applications[0].save()
+        with mock.patch.object(pdf_rendering, "write_pdf", return_value=b"%PDF-1"):
+            archive = self.download(status=FosterApplication.Statuses.ACCEPTED)
+        self.assertEqual(len(archive.namelist()), 1)
+
+    def test_uses_cached_pdfs(self):
+        with mock.patch.object(
+            pdf_rendering, "write_pdf", return_value=b"%PDF-1"
+        ) as write_pdf:
+            pdf_rendering.get_application_pdf(self.applications[0])
+            self.download()
+        self.assertEqual(write_pdf.call_count, 3)
+
+    def test_failed_pdfs_are_listed(self):
+        with mock.patch.object(
+            pdf_rendering, "write_pdf", side_effect=[b"%PDF-1", OSError, b"%PDF-1"]
+        ):
+            archive = self.download()
+        self.assertEqual(len(archive.namelist()), 3)
+        self.assertIn(b"smith", archive.read("errors.txt"))
+
+    def test_timed_out_pdfs_are_listed(self):
+        def submit(html):
+            future = Future()
+            if "Smith1" not in html:
+                future.set_result(b"%PDF-1")
+            # Smith1's is never finished
+            return future
+
+        with mock.patch.object(pdf_rendering, "_submit", side_effect=submit):
+            with mock.patch.object(pdf_rendering, "RENDER_TIMEOUT", 0.1):
+                archive = self.download()
+        self.assertEqual(archive.testzip(), None)
+        self.assertEqual(len(archive.namelist()), 3)
+        errors = archive.read("errors.txt").decode()
+        self.assertIn(application_pdf_filename(self.applications[1]), errors)
+        self.assertNotIn(application_pdf_filename(self.applications[0]), errors)
+
+    def test_requires_permission(self):
+        self.client.force_login(UserFactory(username="someone"))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,266 @@
+import json
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+
+from caim_base.animal_petfinder_import import (
+    PageDataInvalid,
+    PageDataNotFound,
+    RateLimiter,
+    claim_petfinder_import,
+    create_animal_from_petfinder_data,
+    extract_animal_data,
+    import_animals_from_petfinder,
+    queue_petfinder_import,
+    retry_petfinder_import,
+    run_pending_imports,
+)
+from caim_base.models.animals import Animal, AnimalImage, PetfinderImport
+from caim_base.views.awg.animals import BulkImportForm
+
+from .factories import AnimalFactory, AwgFactory, BreedFactory
+
+PHOTO = b"\xff\xd8\xff" + b"x" * 100
+
+FIXTURES = Path(__file__).parent / "fixtures" / "petfinder"
+
+
+class PhotoHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # pylint: disable=invalid-name
+        if "missing" in self.path:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(PHOTO)))
+        self.end_headers()
+        self.wfile.write(PHOTO)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class ExtractAnimalDataTesting(SimpleTestCase):
+    def test_saved_pages(self):
+        dog = extract_animal_data((FIXTURES / "dog.html").read_bytes())
+        self.assertEqual(dog["id"], 61234567)
+        self.assertEqual(dog["secondary_breed"]["slug"], "beagle")
+        cat = extract_animal_data((FIXTURES / "cat.html").read_text(encoding="UTF-8"))
+        self.assertEqual(cat["name"], "Mochi \u00e9clair \U0001f408")
+
+    def test_errors(self):
+        with self.assertRaises(PageDataNotFound):
+            extract_animal_data(b"<html></html>")
+        with self.assertRaises(PageDataInvalid):
+            extract_animal_data(
+                b'<script>global.PF.pageConfig = {"animal": {"id": 1</script>'
+            )
+        with self.assertRaises(PageDataInvalid):
+            extract_animal_data(b'<script>global.PF.pageConfig = {"user": 1};</script>')
+
+
+class BulkImportFormTesting(SimpleTestCase):
+    def test_every_page_is_kept(self):
+        pages = [
+            SimpleUploadedFile("1.html", b"<html>1</html>"),
+            SimpleUploadedFile("2.html", b"<html>2</html>"),
+        ]
+        form = BulkImportForm({"urls": ""}, MultiValueDict({"pages": pages}))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["pages"], pages)
+        self.assertIn("multiple", str(form["pages"]))
+
+    def test_needs_urls_or_pages(self):
+        form = BulkImportForm({"urls": ""}, MultiValueDict())
+        self.assertFalse(form.is_valid())
+
+
+class RateLimiterTesting(SimpleTestCase):
+    def test_spaces_out_calls(self):
+        limiter = RateLimiter(50)
+        start = time.monotonic()
+        threads = [threading.Thread(target=limiter.wait) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # The first call doesn't wait
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 50)
+
+
+class BulkImportTesting(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PhotoHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.awg = AwgFactory()
+        BreedFactory(slug="unknown-dog", name="Unknown", animal_type="DOG")
+        self.labrador = BreedFactory(
+            slug="labrador", name="Labrador", animal_type="DOG"
+        )
+        self.beagle = BreedFactory(slug="beagle", name="Beagle", animal_type="DOG")
+
+    def page(self, petfinder_id, **overrides):
+        photo = f"http://127.0.0.1:{self.server.server_port}/{petfinder_id}"
+        data = {
+            "id": petfinder_id,
+            "name": f"Dog {petfinder_id}",
+            "type": {"name": "Dog"},
+            "size": "Medium",
+            "age": "Adult",
+            "sex": "Female",
+            "is_mixed_breed": True,
+            "attributes": ["Spay/Neuter"],
+            "home_environment_attributes": {"good_with_dogs": True},
+            "primary_breed": {"slug": "labrador"},
+            "secondary_breed": {"slug": "beagle"},
+            "primary_photo_url": f"{photo}-1.jpg",
+            "photo_urls": [f"{photo}-1.jpg", f"{photo}-2.jpg", f"{photo}-3.jpg"],
+            **overrides,
+        }
+        config = json.dumps({"animal": data})
+        return (
+            f"{petfinder_id}.html",
+            f"<script>\nglobal.PF.pageConfig = {config};\n</script>",
+        )
+
+    def test_imports_pages(self):
+        AnimalFactory(awg=self.awg, petfinder_id="1", primary_breed=self.labrador)
+        pages = [
+            self.page("1"),
+            self.page("2"),
+            self.page("2"),
+            self.page("3", primary_breed={"slug": "poodle"}, secondary_breed=None),
+            self.page("4", primary_photo_url="http://127.0.0.1:1/missing.jpg"),
+            ("junk.html", "<html></html>"),
+        ]
+        progress = []
+        created, errors = import_animals_from_petfinder(
+            self.awg, pages=pages, progress=lambda *args: progress.append(args)
+        )
+
+        self.assertEqual([animal.petfinder_id for animal in created], ["2", "3"])
+        self.assertEqual(
+            [source for source, _ in errors],
+            ["junk.html", "1.html", "2.html", "4.html"],
+        )
+        two = Animal.objects.get(petfinder_id="2")
+        self.assertEqual(two.primary_breed, self.labrador)
+        self.assertEqual(two.secondary_breed, self.beagle)
+        self.assertTrue(two.is_spayed_neutered)
+        with default_storage.open(two.primary_photo.name) as f:
+            self.assertEqual(f.read(), PHOTO)
+        self.assertEqual(AnimalImage.objects.filter(animal=two).count(), 2)
+        three = Animal.objects.get(petfinder_id="3")
+        self.assertEqual(three.primary_breed.slug, "unknown-dog")
+        self.assertIsNone(three.secondary_breed)
+        self.assertEqual(progress[-1], ("photos", 10, 10))
+
+    def test_unsupported_values_fail_one_animal(self):
+        created, errors = import_animals_from_petfinder(
+            self.awg,
+            pages=[
+                self.page("6", sex="Unknown"),
+                self.page("7", size="Extra Large"),
+            ],
+        )
+        self.assertEqual([animal.petfinder_id for animal in created], ["7"])
+        self.assertEqual(created[0].size, Animal.AnimalSize.XL)
+        self.assertEqual(
+            errors, [("6.html", "The animal's sex on Petfinder isn't one we support.")]
+        )
+
+    def test_failed_save_leaves_nothing_behind(self):
+        _, page_html = self.page("8")
+        data = extract_animal_data(page_html)
+        with mock.patch.object(
+            AnimalImage.objects, "create", side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            create_animal_from_petfinder_data(self.awg, data)
+        self.assertFalse(Animal.objects.filter(petfinder_id="8").exists())
+        self.assertEqual(default_storage.listdir("")[1], [])
+
+    def test_run_queued_import(self):
+        page_name, page_html = self.page("5")
+        petfinder_import = queue_petfinder_import(
+            self.awg,
+            None,
+            ["https://example.com/dog/6"],
+            [ContentFile(page_html.encode(), name=page_name)],
+        )
+        self.assertEqual(petfinder_import.total, 2)
+        self.assertEqual(run_pending_imports(), 1)
+
+        petfinder_import.refresh_from_db()
+        self.assertEqual(petfinder_import.status, PetfinderImport.Statuses.DONE)
+        self.assertEqual(
+            petfinder_import.animal_ids,
+            [Animal.objects.get(petfinder_id="5").id],
+        )
+        self.assertEqual(
+            petfinder_import.errors,
+            [["https://example.com/dog/6", "Not a www.petfinder.com URL."]],
+        )
+        self.assertIsNotNone(petfinder_import.finished_at)
+        self.assertFalse(petfinder_import.saved_pages.exists())
+        # Nothing left to run
+        self.assertIsNone(claim_petfinder_import())
+
+    def test_failed_import_can_be_retried(self):
+        page_name, page_html = self.page("9")
+        petfinder_import = queue_petfinder_import(
+            self.awg, None, [], [ContentFile(page_html.encode(), name=page_name)]
+        )
+        self.assertFalse(retry_petfinder_import(petfinder_import))
+        with mock.patch(
+            "caim_base.animal_petfinder_import.import_animals_from_petfinder",
+            side_effect=RuntimeError,
+        ), self.assertLogs("caim_base.animal_petfinder_import", "ERROR"):
+            self.assertEqual(run_pending_imports(), 1)
+
+        petfinder_import.refresh_from_db()
+        self.assertEqual(petfinder_import.status, PetfinderImport.Statuses.FAILED)
+        # The page is kept to run again
+        self.assertEqual(petfinder_import.saved_pages.count(), 1)
+        self.assertIsNone(claim_petfinder_import())
+
+        self.assertTrue(retry_petfinder_import(petfinder_import))
+        self.assertEqual(run_pending_imports(), 1)
+        petfinder_import.refresh_from_db()
+        self.assertEqual(petfinder_import.status, PetfinderImport.Statuses.DONE)
+        self.assertEqual(
+            petfinder_import.animal_ids,
+            [Animal.objects.get(petfinder_id="9").id],
+        )
+        self.assertFalse(petfinder_import.saved_pages.exists())
+
+    def test_abandoned_import_is_run_again(self):
+        petfinder_import = queue_petfinder_import(
+            self.awg, None, ["https://example.com/dog/10"], []
+        )
+        self.assertEqual(claim_petfinder_import(), petfinder_import)
+        # Still running
+        self.assertIsNone(claim_petfinder_import())
+
+        PetfinderImport.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim_petfinder_import(), petfinder_import)
@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+
+from caim_base.models.animals import Animal
+from caim_base.photo_fetcher import PhotoFetchError, fetch_photo, fetch_photos
+
+PHOTO = b"\xff\xd8\xff" + b"x" * 1000
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):  # pylint: disable=invalid-name
+        path = self.path.strip("/")
+        if path == "missing.jpg":
+            self.send_error(404)
+            return
+        if path == "page.html":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(b"<html></html>")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        if path == "chunked.jpg":
+            # No Content-Length, so the size is only known while streaming
+            self.end_headers()
+            self.wfile.write(PHOTO * 4)
+            return
+        self.send_header("Content-Length", str(len(PHOTO)))
+        self.end_headers()
+        if path == "slow.jpg":
+            for i in range(0, len(PHOTO), 100):
+                time.sleep(0.05)
+                self.wfile.write(PHOTO[i : i + 100])
+                self.wfile.flush()
+            return
+        self.wfile.write(PHOTO)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class FetchPhotoTesting(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root, MAX_UPLOAD_SIZE=2000)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.field = Animal._meta.get_field("primary_photo")
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}/{path}"
+
+    def test_fetches_concurrently_in_order(self):
+        urls = [self.url(f"{i}.jpg") for i in range(5)] + [self.url("missing.jpg")]
+        results = fetch_photos(urls, self.field)
+        self.assertEqual(results[:5], [f"{i}.jpg" for i in range(5)])
+        self.assertIsInstance(results[5], PhotoFetchError)
+        for name in results[:5]:
+            with default_storage.open(name) as f:
+                self.assertEqual(f.read(), PHOTO)
+
+    def test_rejects_non_images(self):
+        with self.assertRaisesMessage(PhotoFetchError, "not an image"):
+            fetch_photo(self.url("page.html"), self.field)
+
+    def test_rejects_large_photos(self):
+        with self.assertRaisesMessage(PhotoFetchError, "larger than"):
+            fetch_photo(self.url("big.jpg"), self.field, max_bytes=500)
+        with self.assertRaisesMessage(PhotoFetchError, "larger than"):
+            fetch_photo(self.url("chunked.jpg"), self.field)
+        # The partly written file is removed
+        self.assertFalse(default_storage.exists("chunked.jpg"))
+
+    def test_gives_up_on_slow_downloads(self):
+        with self.assertRaisesMessage(PhotoFetchError, "Timed out"):
+            fetch_photo(self.url("slow.jpg"), self.field, deadline=0.1)
+        self.assertFalse(default_storage.exists("slow.jpg"))
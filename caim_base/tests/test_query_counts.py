@@ -0,0 +1,74 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from caim_base.animal_search import load_animals, query_animals, search_animals
+from caim_base.models import AnimalComment, AnimalSubComment, Awg
+from caim_base.tests.factories import (
+    AnimalFactory,
+    AwgFactory,
+    BreedFactory,
+    UserFactory,
+)
+
+
+class QueryCountTesting(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.awg = AwgFactory(status=Awg.AwgStatus.PUBLISHED)
+        breeds = [BreedFactory(name=f"Breed {i}", slug=f"breed-{i}") for i in range(3)]
+        self.animals = [
+            AnimalFactory(
+                awg=self.awg,
+                primary_breed=breeds[i % 3],
+                secondary_breed=breeds[(i + 1) % 3],
+                primary_photo="animal.jpg",
+                is_published=True,
+            )
+            for i in range(5)
+        ]
+        self.users = [UserFactory(username=f"user{i}") for i in range(2)]
+
+    def render_cards(self, animals):
+        # What a browse card shows
+        return [(a.name, a.breedsText(), a.awg.name) for a in animals]
+
+    def test_query_animals(self):
+        with self.assertNumQueries(1):
+            self.render_cards(query_animals(AnonymousUser(), awg_id=self.awg.id))
+
+    def test_search_animals(self):
+        rows = list(search_animals(AnonymousUser()))
+        with self.assertNumQueries(1):
+            self.render_cards(load_animals(rows))
+
+    def add_thread(self, animal, replies):
+        comment = AnimalComment.objects.create(
+            animal=animal, user=self.users[0], body="Is she good with cats?"
+        )
+        for i in range(replies):
+            AnimalSubComment.objects.create(
+                comment=comment, user=self.users[i % 2], body="Yes"
+            )
+
+    def count_animal_page_queries(self, animal):
+        self.client.force_login(self.users[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/animal/{animal.id}")
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_animal_comments(self):
+        few, many = self.animals[0], self.animals[1]
+        self.add_thread(few, replies=1)
+        for _ in range(5):
+            self.add_thread(many, replies=4)
+        # Warm the caches (animal, avatars) the same way for both pages
+        self.count_animal_page_queries(few)
+        self.count_animal_page_queries(many)
+        self.assertEqual(
+            self.count_animal_page_queries(many),
+            self.count_animal_page_queries(few),
+        )
@@ -0,0 +1,186 @@
+import json
+import random
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+
+from caim_base import search_index
+from caim_base.animal_search import query_animals, search_animals
+from caim_base.breed_resolver import breed_resolver
+from caim_base.models import Animal, AnimalType, Awg, Breed, ZipCode
+from caim_base.zip_resolver import zip_resolver
+
+NUM_AWGS = 400
+NUM_ANIMALS = 40000
+NUM_BREEDS = 100
+PAGE_SIZE = 21
+
+# Tables that must never be read in full. Awg and Breed are small enough
+# that a sequential scan is the right plan
+LARGE_TABLES = {"caim_base_animal", "caim_base_animalsearchindex"}
+
+
+def seq_scans(queryset):
+    """Names of the large tables a queryset's plan reads with a Seq Scan"""
+    plan = json.loads(queryset.explain(format="json"))[0]["Plan"]
+    found = []
+    nodes = [plan]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan" and node["Relation Name"] in LARGE_TABLES:
+            found.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return found
+
+
+class QueryPlanTesting(TestCase):
+    """
+    Checks that the searches browse, AWG pages and digests make are answered
+    from indexes, on enough rows that Postgres would rather scan the table
+    than use a badly matched index
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(1)
+        breeds = Breed.objects.bulk_create(
+            [
+                Breed(
+                    name=f"Breed {i}",
+                    slug=f"breed-{i}",
+                    animal_type=AnimalType.DOG if i % 2 else AnimalType.CAT,
+                )
+                for i in range(NUM_BREEDS)
+            ]
+        )
+        zips = [
+            (f"{90000 + i:05d}", rng.uniform(25, 49), rng.uniform(-124, -67))
+            for i in range(NUM_AWGS)
+        ]
+        ZipCode.objects.bulk_create(
+            [
+                ZipCode(zip_code=zip_code, geo_location=Point(lng, lat))
+                for zip_code, lat, lng in zips
+            ]
+        )
+        cls.zip_code = zips[0][0]
+        awgs = Awg.objects.bulk_create(
+            [
+                Awg(
+                    name=f"AWG {zip_code}",
+                    zip_code=zip_code,
+                    state="NY",
+                    geo_location=Point(lng, lat),
+                    status=Awg.AwgStatus.PUBLISHED,
+                )
+                for zip_code, lat, lng in zips
+            ]
+        )
+        cls.awg = awgs[0]
+
+        now = datetime.now()
+        today = date.today()
+        animals = []
+        for i in range(NUM_ANIMALS):
+            # Most animals aren't published, as in production
+            published = i % 4 == 0
+            animals.append(
+                Animal(
+                    name=f"Animal {i}",
+                    awg=awgs[i % NUM_AWGS],
+                    animal_type=rng.choice(AnimalType.values),
+                    primary_breed=rng.choice(breeds),
+                    secondary_breed=rng.choice(breeds) if i % 3 == 0 else None,
+                    is_published=published,
+                    first_published_at=(
+                        now - timedelta(minutes=rng.randrange(525600))
+                        if published
+                        else None
+                    ),
+                    is_mixed_breed=False,
+                    is_unknown_breed=False,
+                    sex=rng.choice(Animal.AnimalSex.values),
+                    size=rng.choice(Animal.AnimalSize.values),
+                    age=rng.choice(Animal.AnimalAge.values),
+                    behaviour_cats=rng.choice(Animal.AnimalBehaviourGrade.values),
+                    is_spayed_neutered=True,
+                    is_vaccinations_current=True,
+                    is_special_needs=False,
+                    is_euth_listed=i % 20 == 0,
+                    euth_date=(
+                        today + timedelta(days=rng.randrange(60))
+                        if i % 20 == 0
+                        else None
+                    ),
+                    primary_photo="animal.jpg",
+                )
+            )
+        Animal.objects.bulk_create(animals, batch_size=5000)
+
+        with connection.cursor() as cursor:
+            # created_at is auto_now_add, so spread it out by hand
+            cursor.execute(
+                "UPDATE caim_base_animal"
+                " SET created_at = now() - id * interval '1 minute'"
+            )
+        # bulk_create and update() don't send signals
+        search_index.rebuild(batch_size=5000)
+        with connection.cursor() as cursor:
+            for table in ("caim_base_animal", "caim_base_animalsearchindex"):
+                cursor.execute(f"ANALYZE {table}")
+
+    def setUp(self):
+        cache.clear()
+        zip_resolver.invalidate()
+        breed_resolver.invalidate()
+
+    def assertIndexed(self, queryset, label):
+        self.assertEqual(seq_scans(queryset), [], label)
+
+    def test_browse(self):
+        # Not covered: sorting by distance with no radius, which has to
+        # compute the distance to every animal
+        searches = {
+            "default": {},
+            "animal type": {"animal_type": AnimalType.DOG},
+            "breed": {"breed": "breed-7"},
+            "age, size and sex": {"age": "adult", "size": "m", "sex": "f"},
+            "good with cats": {"goodwith_cats": True},
+            "euthanasia soon": {"euth_date_within_days": 7, "sort": "euth_date"},
+            "radius": {"zip": self.zip_code, "radius": 50, "sort": "distance"},
+            "type and radius": {
+                "animal_type": AnimalType.CAT,
+                "zip": self.zip_code,
+                "radius": 100,
+                "sort": "-created_at",
+            },
+        }
+        for label, search in searches.items():
+            query = search_animals(AnonymousUser(), **search)
+            self.assertIndexed(query[: PAGE_SIZE + 1], label)
+
+    def test_query_animals(self):
+        searches = {
+            "default": {},
+            "animal type": {"animal_type": AnimalType.DOG},
+            "euthanasia soon": {"euth_date_within_days": 7, "sort": "euth_date"},
+            "awg": {"awg_id": self.awg.id},
+            "manage awg": {
+                "awg_id": self.awg.id,
+                "hide_unpublished_animals": False,
+                "hide_unpublished_awgs": False,
+            },
+        }
+        for label, search in searches.items():
+            query = query_animals(AnonymousUser(), **search)
+            self.assertIndexed(query[: PAGE_SIZE + 1], label)
+
+    def test_digest(self):
+        since = datetime.now() - timedelta(hours=1)
+        self.assertIndexed(
+            query_animals(AnonymousUser(), published_since=since), "digest"
+        )
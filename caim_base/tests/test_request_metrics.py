@@ -0,0 +1,43 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from caim_base.models import Awg
+from caim_base.request_metrics import RequestMetricsMiddleware
+from caim_base.tests.factories import AwgFactory
+
+
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTesting(TestCase):
+    def test_server_timing_and_log(self):
+        awg = AwgFactory(status=Awg.AwgStatus.PUBLISHED)
+        with self.assertLogs("caim_base.request_metrics", "INFO") as logs:
+            response = self.client.get(f"/organization/{awg.id}")
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries \(\d+ duplicate\)"')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+")
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.view, "awg")
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.queries, 0)
+        self.assertGreater(record.template_ms, 0)
+
+    def test_duplicate_queries(self):
+        def view(request):
+            for _ in range(3):
+                Awg.objects.filter(pk=1).first()
+            Awg.objects.filter(pk=2).first()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(view)
+        with self.assertLogs("caim_base.request_metrics", "INFO") as logs:
+            response = middleware(RequestFactory().get("/"))
+        self.assertIn('desc="4 queries (2 duplicate)"', response["Server-Timing"])
+        self.assertEqual(logs.records[0].view, "-")
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get("/browse")
+        self.assertNotIn("Server-Timing", response)
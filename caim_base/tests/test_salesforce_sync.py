@@ -0,0 +1,328 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+import requests
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from caim_base.models.salesforce import SalesforceContactSync
+from caim_base.models.user import UserProfile
+from caim_base.tests.factories import UserFactory
+from caim_base.utils.salesforce import (
+    COLLECTION_SIZE,
+    MAX_ATTEMPTS,
+    ContactClient,
+    SalesforceRateLimited,
+    claim_syncs,
+    enqueue_contact_sync,
+    push_pending,
+)
+
+API_PATH = "/services/data/v52.0/"
+
+
+class FakeSalesforce:
+    """
+    The sObject Collections endpoint, recording the requests it is sent.
+    Scripted responses, (status, headers, body), are returned first.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        self.fail_emails = ()
+        self.rate_limit_after = None
+        self.session_id = "SESSION1"
+        self.created = 0
+
+    def handle(self, method, path, headers, body):
+        if self.responses:
+            return self.responses.pop(0)
+        if path != f"{API_PATH}composite/sobjects":
+            return 404, {}, [{"errorCode": "NOT_FOUND", "message": path}]
+        if headers.get("Authorization") != f"Bearer {self.session_id}":
+            return (
+                401,
+                {},
+                [
+                    {
+                        "errorCode": "INVALID_SESSION_ID",
+                        "message": "Session expired or invalid",
+                    }
+                ],
+            )
+        if self.rate_limit_after is not None:
+            if len(self.requests) >= self.rate_limit_after:
+                return (
+                    403,
+                    {},
+                    [
+                        {
+                            "errorCode": "REQUEST_LIMIT_EXCEEDED",
+                            "message": "TotalRequests Limit exceeded.",
+                        }
+                    ],
+                )
+        self.requests.append((method, body))
+        results = []
+        for record in body["records"]:
+            if record["Email"] in self.fail_emails:
+                results.append(
+                    {
+                        "success": False,
+                        "errors": [
+                            {"statusCode": "INVALID_EMAIL_ADDRESS", "message": "bad"}
+                        ],
+                    }
+                )
+            elif method == "POST":
+                self.created += 1
+                results.append({"id": f"003FAKE{self.created}", "success": True})
+            else:
+                results.append({"id": record["Id"], "success": True})
+        return 200, {}, results
+
+
+class SalesforceHandler(BaseHTTPRequestHandler):
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status, headers, payload = self.server.salesforce.handle(
+            self.command, self.path, self.headers, body
+        )
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_PATCH = do_POST
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def make_profiles(count, **kwargs):
+    return [
+        UserProfile.objects.create(
+            user=UserFactory(username=f"user{i}", email=f"user{i}@example.com"),
+            **kwargs,
+        )
+        for i in range(count)
+    ]
+
+
+@override_settings(SALESFORCE_ENABLED=True)
+class SalesforceSyncTesting(TestCase):
+    def setUp(self):
+        self.salesforce = FakeSalesforce()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SalesforceHandler)
+        server.salesforce = self.salesforce
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.base_url = f"http://127.0.0.1:{server.server_port}{API_PATH}"
+        self.client = ContactClient(self.base_url, {"Authorization": "Bearer SESSION1"})
+
+    def sent(self):
+        return [(method, body["records"]) for method, body in self.salesforce.requests]
+
+    def test_changes_are_coalesced(self):
+        [profile] = make_profiles(1)
+        enqueue_contact_sync(profile)
+        enqueue_contact_sync(profile)
+        self.assertEqual(SalesforceContactSync.objects.count(), 1)
+
+        self.assertEqual(push_pending(self.client), (1, 0))
+        self.assertEqual(len(self.salesforce.requests), 1)
+        profile.refresh_from_db()
+        self.assertEqual(profile.salesforce_id, "003FAKE1")
+        self.assertFalse(SalesforceContactSync.objects.exists())
+
+    def test_payload(self):
+        [profile] = make_profiles(1, city="Springfield", state="IL")
+        enqueue_contact_sync(profile)
+        push_pending(self.client)
+        [(method, body)] = self.salesforce.requests
+        self.assertEqual(method, "POST")
+        self.assertEqual(
+            body,
+            {
+                "allOrNone": False,
+                "records": [
+                    {
+                        "attributes": {"type": "Contact"},
+                        "FirstName": profile.user.first_name,
+                        "LastName": profile.user.last_name,
+                        "Email": "user0@example.com",
+                        "MailingCity": "Springfield",
+                        "MailingState": "IL",
+                        "MailingPostalCode": profile.zip_code,
+                        "FosterProfile": "Incomplete",
+                    }
+                ],
+            },
+        )
+
+    @override_settings(SALESFORCE_ENABLED=False)
+    def test_disabled(self):
+        [profile] = make_profiles(1)
+        enqueue_contact_sync(profile)
+        self.assertFalse(SalesforceContactSync.objects.exists())
+
+    def test_batches_creates_and_updates(self):
+        creates = make_profiles(COLLECTION_SIZE + 1)
+        update = UserProfile.objects.create(
+            user=UserFactory(username="existing", email="existing@example.com"),
+            salesforce_id="003EXISTING",
+        )
+        for profile in [*creates, update]:
+            enqueue_contact_sync(profile)
+
+        self.assertEqual(push_pending(self.client), (COLLECTION_SIZE + 2, 0))
+        sent = self.sent()
+        self.assertEqual(
+            [(method, len(records)) for method, records in sent],
+            [("POST", COLLECTION_SIZE), ("POST", 1), ("PATCH", 1)],
+        )
+        self.assertEqual(sent[2][1][0]["Id"], "003EXISTING")
+        self.assertFalse(
+            UserProfile.objects.filter(salesforce_id__isnull=True).exists()
+        )
+
+    def test_failed_contacts_are_retried(self):
+        good, bad = make_profiles(2)
+        enqueue_contact_sync(good)
+        enqueue_contact_sync(bad)
+
+        self.salesforce.fail_emails = [bad.user.email]
+        self.assertEqual(push_pending(self.client), (1, 1))
+        sync = SalesforceContactSync.objects.get()
+        self.assertEqual(sync.user_profile, bad)
+        self.assertEqual(sync.status, SalesforceContactSync.Statuses.PENDING)
+        self.assertEqual(sync.last_error, "INVALID_EMAIL_ADDRESS: bad")
+        self.assertGreater(sync.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(claim_syncs(10), [])
+
+        SalesforceContactSync.objects.update(
+            attempts=MAX_ATTEMPTS - 1, next_attempt_at=timezone.now()
+        )
+        push_pending(self.client)
+        sync.refresh_from_db()
+        self.assertEqual(sync.status, SalesforceContactSync.Statuses.FAILED)
+
+    def test_server_errors_are_retried(self):
+        [profile] = make_profiles(1)
+        enqueue_contact_sync(profile)
+        self.salesforce.responses = [(500, {}, [{"errorCode": "UNKNOWN"}])]
+        self.assertEqual(push_pending(self.client), (0, 1))
+        sync = SalesforceContactSync.objects.get()
+        self.assertEqual(sync.status, SalesforceContactSync.Statuses.PENDING)
+        self.assertEqual(sync.attempts, 1)
+        self.assertTrue(sync.last_error.startswith("HTTPError: 500"))
+
+    def test_rate_limit_defers_the_rest(self):
+        profiles = make_profiles(COLLECTION_SIZE + 1)
+        for profile in profiles:
+            enqueue_contact_sync(profile)
+
+        self.salesforce.rate_limit_after = 1
+        with self.assertRaises(SalesforceRateLimited) as raised:
+            push_pending(self.client)
+        # A 403 with no Retry-After
+        self.assertIsNone(raised.exception.retry_after)
+        # The contacts created before the limit keep their ids
+        self.assertEqual(
+            UserProfile.objects.filter(salesforce_id__isnull=False).count(),
+            COLLECTION_SIZE,
+        )
+        sync = SalesforceContactSync.objects.get()
+        self.assertEqual(sync.status, SalesforceContactSync.Statuses.PENDING)
+        self.assertEqual(sync.attempts, 0)
+        self.assertGreater(sync.next_attempt_at, timezone.now())
+
+    def test_retry_after(self):
+        contact = {"Email": "user0@example.com"}
+        self.salesforce.responses = [
+            (429, {"Retry-After": "120"}, []),
+            (503, {"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}, []),
+            (403, {}, [{"errorCode": "INSUFFICIENT_ACCESS"}]),
+        ]
+        with self.assertRaises(SalesforceRateLimited) as raised:
+            self.client.create([contact])
+        self.assertEqual(raised.exception.retry_after, 120)
+        with self.assertRaises(SalesforceRateLimited) as raised:
+            self.client.create([contact])
+        self.assertIsNone(raised.exception.retry_after)
+        # Not a rate limit
+        with self.assertRaises(requests.HTTPError):
+            self.client.create([contact])
+
+    def test_expired_session(self):
+        [profile] = make_profiles(1)
+        enqueue_contact_sync(profile)
+        self.salesforce.session_id = "SESSION2"
+        logins = []
+
+        def login():
+            logins.append(True)
+            return (
+                self.base_url,
+                {"Authorization": "Bearer SESSION2"},
+                requests.Session(),
+            )
+
+        self.client.login = login
+        self.assertEqual(push_pending(self.client), (1, 0))
+        self.assertEqual(len(logins), 1)
+        # Logged in again before any attempt was used up
+        self.assertFalse(SalesforceContactSync.objects.exists())
+
+    def test_expired_session_without_login(self):
+        [profile] = make_profiles(1)
+        enqueue_contact_sync(profile)
+        self.salesforce.session_id = "SESSION2"
+        self.assertEqual(push_pending(self.client), (0, 1))
+        self.assertTrue(
+            SalesforceContactSync.objects.get().last_error.startswith("HTTPError: 401")
+        )
+
+    def test_requeued_while_syncing_is_kept(self):
+        [profile] = make_profiles(1)
+        enqueue_contact_sync(profile)
+        original_create = self.client.create
+
+        def create(contacts):
+            # The profile is edited again while its first change is in flight
+            enqueue_contact_sync(profile)
+            return original_create(contacts)
+
+        self.client.create = create
+        # Sent again, as an update of the contact just created
+        self.assertEqual(push_pending(self.client), (2, 0))
+        self.assertEqual([method for method, _ in self.sent()], ["POST", "PATCH"])
+        self.assertFalse(SalesforceContactSync.objects.exists())
+
+
+COMMAND = "caim_base.management.commands.sync_salesforce_contacts"
+
+
+@override_settings(SALESFORCE_ENABLED=True)
+class SyncSalesforceContactsCommandTesting(TestCase):
+    @mock.patch(
+        f"{COMMAND}.push_pending",
+        side_effect=[RuntimeError("Salesforce is down"), (1, 0)],
+    )
+    @mock.patch(f"{COMMAND}.time.sleep", side_effect=[None, KeyboardInterrupt])
+    def test_keeps_running_after_errors(self, sleep, _push_pending):
+        with self.assertLogs(COMMAND, "ERROR"), self.assertRaises(KeyboardInterrupt):
+            call_command("sync_salesforce_contacts", stdout=StringIO())
+        # Backed off after the error, then back to polling
+        self.assertEqual([c.args for c in sleep.call_args_list], [(60,), (30,)])
@@ -0,0 +1,238 @@
+import math
+from datetime import date, datetime, timedelta, timezone
+
+from django.contrib.gis.geos import Point
+from django.core import mail
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from caim_base.animal_search import EARTH_RADIUS_METERS, MILES_TO_METERS
+from caim_base.models.animals import (
+    Animal,
+    SavedSearch,
+    SavedSearchDigestRequest,
+    SavedSearchDigestRun,
+)
+from caim_base.models.awg import Awg
+from caim_base.saved_search_digest import (
+    STALE_RUN_AFTER,
+    AlreadyRunningError,
+    match_saved_searches,
+    run_requested_digest,
+    run_saved_search_digest,
+)
+from caim_base.tests.factories import AnimalFactory, AwgFactory, UserFactory
+
+NOW = datetime(2023, 10, 1, 12, tzinfo=timezone.utc)
+NYC = (40.75, -73.99)
+PHILADELPHIA = (39.95, -75.16)  # ~80 miles from NYC
+LA = (34.09, -118.41)
+
+
+def animal(id, location, published_hours_ago=1, **kwargs):
+    fields = {
+        "animal_type": "DOG",
+        "age": Animal.AnimalAge.ADULT,
+        "size": Animal.AnimalSize.M,
+        "sex": Animal.AnimalSex.F,
+        "primary_breed_id": 1,
+        **kwargs,
+    }
+    a = Animal(id=id, first_published_at=NOW - timedelta(hours=published_hours_ago))
+    for key, value in fields.items():
+        setattr(a, key, value)
+    a.awg_lat, a.awg_lng = location
+    return a
+
+
+def saved_search(id, location=NYC, radius=None, checked_hours_ago=24, **kwargs):
+    s = SavedSearch(
+        id=id,
+        animal_type="DOG",
+        zip_code="10001" if radius else None,
+        radius=radius,
+        geo_location=Point(location[1], location[0]),
+        last_checked_at=NOW - timedelta(hours=checked_hours_ago),
+        **kwargs,
+    )
+    return s
+
+
+class MatchSavedSearchesTesting(SimpleTestCase):
+    def match(self, saved_searches, animals):
+        return match_saved_searches(saved_searches, animals, now=NOW)
+
+    def test_radius(self):
+        animals = [animal(1, NYC), animal(2, PHILADELPHIA), animal(3, LA)]
+        matches = self.match(
+            [
+                saved_search(1, radius=50),
+                saved_search(2, radius=100),
+                saved_search(3),
+            ],
+            animals,
+        )
+        self.assertEqual([a.id for a in matches[1]], [1])
+        self.assertEqual([a.id for a in matches[2]], [1, 2])
+        self.assertEqual([a.id for a in matches[3]], [1, 2, 3])
+
+    def test_radius_edge(self):
+        # Just inside the radius, due north and south
+        offset = math.degrees(0.9995 * 500 * MILES_TO_METERS / EARTH_RADIUS_METERS)
+        animals = [
+            animal(1, (NYC[0] + offset, NYC[1])),
+            animal(2, (NYC[0] - offset, NYC[1])),
+        ]
+        matches = self.match([saved_search(1, radius=500)], animals)
+        self.assertEqual([a.id for a in matches[1]], [1, 2])
+
+    def test_only_animals_published_since_last_check(self):
+        animals = [animal(1, NYC, published_hours_ago=2), animal(2, NYC, 10)]
+        matches = self.match(
+            [
+                saved_search(1, checked_hours_ago=5),
+                saved_search(2, checked_hours_ago=1),
+            ],
+            animals,
+        )
+        self.assertEqual([a.id for a in matches[1]], [1])
+        self.assertNotIn(2, matches)
+
+    def test_filters(self):
+        animals = [
+            animal(1, NYC, sex=Animal.AnimalSex.M),
+            animal(2, NYC, secondary_breed_id=7),
+            animal(3, NYC, behaviour_cats=Animal.AnimalBehaviourGrade.GOOD),
+            animal(4, NYC, animal_type="CAT"),
+            animal(5, NYC, euth_date=date(2023, 10, 3)),
+        ]
+        matches = self.match(
+            [
+                saved_search(1, sex="M"),
+                saved_search(2, breed_id=7),
+                saved_search(3, goodwith_cats=True),
+                saved_search(4, euth_date_within_days=7),
+            ],
+            animals,
+        )
+        self.assertEqual([a.id for a in matches[1]], [1])
+        self.assertEqual([a.id for a in matches[2]], [2])
+        self.assertEqual([a.id for a in matches[3]], [3])
+        self.assertEqual([a.id for a in matches[4]], [5])
+
+    def test_keeps_animal_order(self):
+        animals = [animal(3, LA), animal(1, NYC), animal(2, PHILADELPHIA)]
+        matches = self.match([saved_search(1, radius=5000)], animals)
+        self.assertEqual([a.id for a in matches[1]], [3, 1, 2])
+
+
+class RunSavedSearchDigestTesting(TestCase):
+    def interrupted_run(self):
+        run = SavedSearchDigestRun.objects.create(
+            checked_at=NOW, last_saved_search_id=5
+        )
+        # Last checkpointed long enough ago to be considered dead
+        SavedSearchDigestRun.objects.filter(id=run.id).update(
+            updated_at=datetime.now(timezone.utc) - STALE_RUN_AFTER * 2
+        )
+        return run
+
+    def test_refuses_while_another_run_is_active(self):
+        run = SavedSearchDigestRun.objects.create(checked_at=NOW)
+        with self.assertRaises(AlreadyRunningError):
+            run_saved_search_digest()
+        run.refresh_from_db()
+        self.assertIsNone(run.finished_at)
+
+    def test_resumes_stale_run(self):
+        run = self.interrupted_run()
+        run_saved_search_digest()
+        run.refresh_from_db()
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(SavedSearchDigestRun.objects.count(), 1)
+
+    def test_restart_abandons_stale_run(self):
+        run = self.interrupted_run()
+        run_saved_search_digest(restart=True)
+        self.assertEqual(SavedSearchDigestRun.objects.count(), 2)
+        self.assertFalse(
+            SavedSearchDigestRun.objects.filter(finished_at__isnull=True).exists()
+        )
+        run.refresh_from_db()
+        self.assertEqual(run.last_saved_search_id, 5)
+
+    def test_dry_run_records_nothing(self):
+        run_saved_search_digest(dry_run=True)
+        self.assertFalse(SavedSearchDigestRun.objects.exists())
+
+    def test_one_active_run(self):
+        SavedSearchDigestRun.objects.create(checked_at=NOW)
+        with self.assertRaises(IntegrityError):
+            SavedSearchDigestRun.objects.create(checked_at=NOW)
+
+
+@override_settings(
+    SAVED_SEARCH_DIGEST_TOKEN="digest-token",
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class RequestSavedSearchDigestTesting(TestCase):
+    def setUp(self):
+        now = datetime.now(timezone.utc)
+        awg = AwgFactory(
+            status=Awg.AwgStatus.PUBLISHED, geo_location=Point(NYC[1], NYC[0])
+        )
+        AnimalFactory(
+            awg=awg,
+            name="Rex",
+            animal_type="DOG",
+            is_published=True,
+            first_published_at=now - timedelta(hours=1),
+        )
+        self.saved_search = SavedSearch.objects.create(
+            user=UserFactory(username="searcher", email="searcher@example.com"),
+            name="Dogs near NYC",
+            animal_type="DOG",
+            zip_code="10001",
+            radius=100,
+            geo_location=Point(PHILADELPHIA[1], PHILADELPHIA[0]),
+            is_notifications_enabled=True,
+        )
+        SavedSearch.objects.filter(id=self.saved_search.id).update(
+            last_checked_at=now - timedelta(days=2)
+        )
+        self.url = reverse("saved_search_send_emails")
+
+    def request_digest(self, **headers):
+        return self.client.post(self.url, **headers).status_code
+
+    def test_requested_digest_sends_emails(self):
+        self.assertEqual(
+            self.request_digest(HTTP_AUTHORIZATION="Bearer digest-token"), 202
+        )
+        self.assertEqual(mail.outbox, [])
+
+        stats = run_requested_digest()
+        self.assertEqual(stats["emails"], 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["searcher@example.com"])
+        self.assertIn("Rex", mail.outbox[0].body)
+        self.saved_search.refresh_from_db()
+        self.assertIsNotNone(self.saved_search.last_checked_at)
+        self.assertFalse(SavedSearchDigestRequest.objects.exists())
+        # Nothing requested since
+        self.assertIsNone(run_requested_digest())
+
+    def test_requires_token(self):
+        self.assertEqual(self.request_digest(), 401)
+        self.assertEqual(self.request_digest(HTTP_AUTHORIZATION="Bearer wrong"), 401)
+        with override_settings(SAVED_SEARCH_DIGEST_TOKEN=None):
+            self.assertEqual(self.request_digest(HTTP_AUTHORIZATION="Bearer "), 401)
+        self.assertFalse(SavedSearchDigestRequest.objects.exists())
+
+    def test_requests_are_coalesced(self):
+        for _ in range(3):
+            self.request_digest(HTTP_AUTHORIZATION="Bearer digest-token")
+        run_requested_digest()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIsNone(run_requested_digest())
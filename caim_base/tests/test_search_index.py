@@ -0,0 +1,199 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase
+
+from caim_base import search_index
+from caim_base.animal_search import load_animals, query_animals, search_animals
+from caim_base.breed_resolver import breed_resolver
+from caim_base.models import Animal, AnimalSearchIndex, Awg
+from caim_base.pagination import KeysetPaginator
+from caim_base.tests.factories import AnimalFactory, AwgFactory, BreedFactory
+
+
+class SearchIndexTesting(TestCase):
+    def setUp(self):
+        cache.clear()
+        breed_resolver.invalidate()
+        self.awg = AwgFactory(status=Awg.AwgStatus.PUBLISHED)
+        self.beagle = BreedFactory(name="Beagle", slug="beagle")
+        self.poodle = BreedFactory(name="Poodle", slug="poodle")
+
+    def make_animal(self, **kwargs):
+        defaults = {
+            "awg": self.awg,
+            "primary_breed": self.beagle,
+            "primary_photo": "animal.jpg",
+            "is_published": True,
+        }
+        defaults.update(kwargs)
+        return AnimalFactory(**defaults)
+
+    def indexed_ids(self):
+        return set(AnimalSearchIndex.objects.values_list("animal_id", flat=True))
+
+    def test_animal_publish_and_unpublish(self):
+        animal = self.make_animal()
+        hidden = self.make_animal(is_published=False)
+        self.assertEqual(self.indexed_ids(), {animal.id})
+
+        hidden.is_published = True
+        hidden.save()
+        animal.is_published = False
+        animal.save()
+        self.assertEqual(self.indexed_ids(), {hidden.id})
+
+        hidden.delete()
+        self.assertEqual(self.indexed_ids(), set())
+
+    def test_row_follows_animal(self):
+        animal = self.make_animal(
+            behaviour_cats=Animal.AnimalBehaviourGrade.GOOD,
+            secondary_breed=self.poodle,
+        )
+        row = AnimalSearchIndex.objects.get(animal=animal)
+        self.assertTrue(row.good_with_cats)
+        self.assertEqual(set(row.breed_ids), {self.beagle.id, self.poodle.id})
+        self.assertEqual(row.geo_location, self.awg.geo_location)
+
+        animal.secondary_breed = None
+        animal.save()
+        row.refresh_from_db()
+        self.assertEqual(row.breed_ids, [self.beagle.id])
+
+    def test_awg_unpublish(self):
+        animal = self.make_animal()
+        self.awg.status = Awg.AwgStatus.UNPUBLISHED
+        self.awg.save()
+        self.assertEqual(self.indexed_ids(), set())
+
+        self.awg.status = Awg.AwgStatus.PUBLISHED
+        self.awg.save()
+        self.assertEqual(self.indexed_ids(), {animal.id})
+
+    def test_rebuild(self):
+        animal = self.make_animal()
+        AnimalSearchIndex.objects.all().delete()
+        # update() doesn't send post_save
+        Animal.objects.filter(id=animal.id).update(size=Animal.AnimalSize.L)
+        self.assertEqual(search_index.rebuild(), 1)
+        self.assertEqual(AnimalSearchIndex.objects.get().size, Animal.AnimalSize.L)
+
+    def test_search_by_breed(self):
+        beagle = self.make_animal()
+        poodle_mix = self.make_animal(secondary_breed=self.poodle)
+        self.make_animal(primary_breed=self.poodle, is_published=False)
+
+        def search(**kwargs):
+            return {row.animal_id for row in search_animals(AnonymousUser(), **kwargs)}
+
+        self.assertEqual(search(), {beagle.id, poodle_mix.id})
+        self.assertEqual(search(breed="poodle"), {poodle_mix.id})
+        self.assertEqual(search(breed="no-such-breed"), set())
+
+    def test_same_results_as_query_animals(self):
+        good = Animal.AnimalBehaviourGrade.GOOD
+        self.make_animal(sex="F", size="S", age="BABY", behaviour_cats=good)
+        self.make_animal(sex="M", size="L", age="ADULT", behaviour_kids=good)
+        self.make_animal(secondary_breed=self.poodle, behaviour_dogs=good)
+        self.make_animal(primary_breed=self.poodle, sex="M")
+        self.make_animal(is_published=False)
+
+        for filters in (
+            {},
+            {"sex": "m"},
+            {"size": "s", "age": "baby"},
+            {"breed": "poodle"},
+            {"breed": "no-such-breed"},
+            {"goodwith_cats": True},
+            {"goodwith_dogs": True},
+            {"goodwith_kids": True},
+            {"awg_id": self.awg.id, "sort": "created_at"},
+        ):
+            animals = query_animals(AnonymousUser(), **filters)
+            rows = search_animals(AnonymousUser(), **filters)
+            self.assertEqual(
+                [row.animal_id for row in rows],
+                [animal.id for animal in animals],
+                filters,
+            )
+
+    def test_paginate_and_load(self):
+        for _ in range(5):
+            self.make_animal()
+        paginator = KeysetPaginator(
+            search_animals(AnonymousUser()), "-created_at", 3, load=load_animals
+        )
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertFalse(second.has_next())
+        loaded = list(first) + list(second)
+        self.assertTrue(all(isinstance(animal, Animal) for animal in loaded))
+        self.assertEqual(
+            [animal.id for animal in loaded],
+            list(
+                Animal.objects.order_by("-created_at", "id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+
+class TextSearchTesting(TestCase):
+    def setUp(self):
+        cache.clear()
+        breed_resolver.invalidate()
+        self.awg = AwgFactory(status=Awg.AwgStatus.PUBLISHED)
+        self.beagle = BreedFactory(name="Beagle", slug="beagle")
+        self.poodle = BreedFactory(name="Poodle", slug="poodle")
+        self.biscuit = self.make_animal(name="Biscuit", description="Loves walks")
+        self.pepper = self.make_animal(
+            name="Pepper",
+            secondary_breed=self.poodle,
+            description="Calm with other dogs, a biscuit addict",
+        )
+        self.shadow = self.make_animal(
+            name="Shadow", primary_breed=self.poodle, special_needs="Deaf"
+        )
+
+    def make_animal(self, **kwargs):
+        defaults = {
+            "awg": self.awg,
+            "primary_breed": self.beagle,
+            "primary_photo": "animal.jpg",
+            "is_published": True,
+        }
+        defaults.update(kwargs)
+        return AnimalFactory(**defaults)
+
+    def search(self, q):
+        query = search_animals(AnonymousUser(), q=q, sort="-rank")
+        return [row.animal_id for row in query]
+
+    def test_matches_fields(self):
+        self.assertEqual(self.search("walk"), [self.biscuit.id])
+        self.assertEqual(self.search("deaf"), [self.shadow.id])
+        self.assertCountEqual(self.search("poodle"), [self.pepper.id, self.shadow.id])
+
+    def test_name_ranks_first(self):
+        self.assertEqual(self.search("biscuit"), [self.biscuit.id, self.pepper.id])
+
+    def test_fuzzy_names(self):
+        self.assertEqual(self.search("Shadoww"), [self.shadow.id])
+
+    def test_breed_rename(self):
+        self.poodle.name = "Standard Poodle"
+        self.poodle.save()
+        self.assertCountEqual(self.search("standard"), [self.pepper.id, self.shadow.id])
+
+    def test_query_animals(self):
+        unpublished = self.make_animal(name="Biscuits", is_published=False)
+        query = query_animals(
+            AnonymousUser(),
+            q="biscuit",
+            awg_id=self.awg.id,
+            hide_unpublished_animals=False,
+        )
+        self.assertCountEqual(
+            [animal.id for animal in query],
+            [self.biscuit.id, self.pepper.id, unpublished.id],
+        )
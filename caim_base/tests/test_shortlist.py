@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from caim_base.shortlist import get_shortlist_ids
+from caim_base.tests.factories import AnimalFactory, UserFactory
+
+
+class ShortlistTesting(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory(username="shortlister")
+        self.animal = AnimalFactory()
+        self.client.force_login(self.user)
+
+    def toggle(self, animal, is_set):
+        response = self.client.post(
+            "/api/shortlist",
+            {"animalId": animal.id, "isSet": "true" if is_set else "false"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_between_requests(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_shortlist_ids(self.user), frozenset())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_shortlist_ids(self.user), frozenset())
+
+    def test_toggle_updates_cache(self):
+        get_shortlist_ids(self.user)
+        self.toggle(self.animal, True)
+        # Setting twice is harmless
+        self.toggle(self.animal, True)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_shortlist_ids(self.user), {self.animal.id})
+        self.toggle(self.animal, False)
+        self.assertEqual(get_shortlist_ids(self.user), frozenset())
+
+    def test_deleting_animal_invalidates(self):
+        self.toggle(self.animal, True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.animal.delete()
+        self.assertEqual(get_shortlist_ids(self.user), frozenset())
@@ -0,0 +1,58 @@
+import io
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from caim_base import thumbnails
+from caim_base.templatetags.caim_helpers import image_resize
+from caim_base.tests.factories import AnimalFactory
+
+
+def photo(name="photo.jpg"):
+    data = io.BytesIO()
+    Image.new("RGB", (1200, 900), "orange").save(data, "JPEG")
+    return SimpleUploadedFile(name, data.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_RESIZE_USE_IMAGKIT=False)
+class ThumbnailsTesting(TestCase):
+    def setUp(self):
+        self.animal = AnimalFactory(primary_photo=photo())
+
+    def test_scheduled_on_save(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.animal.name = "Renamed"
+            self.animal.save()
+        self.assertEqual(len(callbacks), 1)
+
+        thumbnails.generate_renditions(self.animal, "primary_photo")
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.animal.save()
+        # Renditions are up to date
+        self.assertEqual(callbacks, [])
+
+    def test_image_resize_is_a_lookup(self):
+        renditions = thumbnails.generate_renditions(self.animal, "primary_photo")
+        self.animal.refresh_from_db()
+        self.assertEqual(self.animal.primary_photo_renditions, renditions)
+        with mock.patch.object(thumbnails, "resize") as resize:
+            url = image_resize(self.animal.primary_photo, "300x300 crop")
+            self.assertEqual(url, renditions["300x300 crop"])
+            # "45x45" is short for "45x45 crop"
+            image_resize(self.animal.primary_photo, "45x45")
+            resize.assert_not_called()
+
+    def test_resize_while_rendering_alerts(self):
+        with self.assertLogs("caim_base.templatetags.caim_helpers", "ERROR"):
+            url = image_resize(self.animal.primary_photo, "300x300 crop")
+        self.assertTrue(url)
+
+    def test_replaced_photo_isnt_looked_up(self):
+        thumbnails.generate_renditions(self.animal, "primary_photo")
+        self.animal.refresh_from_db()
+        self.animal.primary_photo = photo("other.jpg")
+        self.animal.save()
+        self.assertIsNone(thumbnails.lookup(self.animal.primary_photo, "300x300"))
@@ -0,0 +1,54 @@
+import csv
+import io
+
+from django.test import TestCase
+
+from caim_base.models import AwgMember, UserProfile
+from caim_base.tests.factories import AwgFactory, FostererProfileFactory, UserFactory
+
+
+class UserCsvDownloadTesting(TestCase):
+    def setUp(self):
+        self.admin = UserFactory(username="admin", is_superuser=True)
+        self.users = [UserFactory(username=f"user{i}") for i in range(6)]
+        for user in self.users[:3]:
+            UserProfile.objects.create(user=user)
+        FostererProfileFactory(user=self.users[0])
+        awgs = [AwgFactory(name=f"AWG {i}", company_ein=f"EIN{i}") for i in range(2)]
+        for awg in awgs:
+            AwgMember.objects.create(user=self.users[1], awg=awg)
+        AwgMember.objects.create(user=self.users[2], awg=awgs[0])
+
+    def download(self):
+        self.client.force_login(self.admin)
+        response = self.client.get("/utils/users-csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(
+            csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode()))
+        )
+
+    def test_rows(self):
+        rows = self.download()
+        # A row per membership, or one for users without any
+        self.assertEqual(len(rows), 1 + 2 + 1 + 4)
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row["UserName"], []).append(row)
+        self.assertEqual(by_user["user0"][0]["HasFostererProfile"], "TRUE")
+        self.assertEqual(by_user["user0"][0]["HasUserProfile"], "TRUE")
+        self.assertEqual(by_user["user0"][0]["HasAWGMembership"], "FALSE")
+        self.assertEqual(
+            [row["AWG_Name"] for row in by_user["user1"]], ["AWG 0", "AWG 1"]
+        )
+        self.assertEqual(by_user["user1"][0]["AWG_Ein"], "EIN0")
+        self.assertEqual(by_user["user5"][0]["HasUserProfile"], "FALSE")
+
+    def test_one_query(self):
+        for i in range(20):
+            UserProfile.objects.create(user=UserFactory(username=f"more{i}"))
+        self.client.force_login(self.admin)
+        response = self.client.get("/utils/users-csv")
+        # However many users there are
+        with self.assertNumQueries(1):
+            b"".join(response.streaming_content)
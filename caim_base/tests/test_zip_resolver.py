@@ -0,0 +1,46 @@
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+
+from caim_base.models.geo import ZipCode
+from caim_base.zip_resolver import zip_resolver
+
+
+class ZipResolverTesting(TestCase):
+    def setUp(self):
+        zip_resolver.invalidate()
+        ZipCode.objects.create(zip_code="00601", geo_location=Point(-66.75, 18.18))
+        ZipCode.objects.create(zip_code="10001", geo_location=Point(-73.99, 40.75))
+
+    def test_lookup(self):
+        lat, lng = zip_resolver.lookup("10001")
+        self.assertAlmostEqual(lat, 40.75, places=4)
+        self.assertAlmostEqual(lng, -73.99, places=4)
+
+    def test_leading_zeros(self):
+        self.assertTrue(zip_resolver.is_valid("00601"))
+        self.assertFalse(zip_resolver.is_valid("601"))
+
+    def test_unknown_zip(self):
+        self.assertIsNone(zip_resolver.lookup("99999"))
+        self.assertIsNone(zip_resolver.get_point(""))
+        self.assertIsNone(zip_resolver.get_point(None))
+
+    def test_get_point(self):
+        point = zip_resolver.get_point("10001")
+        self.assertEqual(point.srid, 4326)
+        self.assertAlmostEqual(point.x, -73.99, places=4)
+
+    def test_lookups_dont_query(self):
+        zip_resolver.lookup("10001")
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                zip_resolver.lookup("10001")
+
+    def test_invalidated_on_save_and_delete(self):
+        self.assertFalse(zip_resolver.is_valid("90210"))
+        zip_code = ZipCode.objects.create(
+            zip_code="90210", geo_location=Point(-118.41, 34.09)
+        )
+        self.assertTrue(zip_resolver.is_valid("90210"))
+        zip_code.delete()
+        self.assertFalse(zip_resolver.is_valid("90210"))
@@ -0,0 +1,147 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from sorl.thumbnail import get_thumbnail
+
+from .caching import invalidate_keys, make_key
+
+logger = logging.getLogger(__name__)
+
+# Sizes used by the templates for each image field, as "WxH crop|max". Each
+# is generated when the photo is saved so image_resize never has to.
+RENDITIONS = {
+    ("caim_base.animal", "primary_photo"): [
+        "300x300 crop",
+        "800x500 max",
+        "600x500 max",
+        "45x45 crop",
+        "40x40 crop",
+        "34x34 crop",
+        "75x75 crop",
+        "80x80 crop",
+        "200x200 crop",
+        "400x400 crop",
+    ],
+    ("caim_base.animalimage", "photo"): [
+        "800x500 max",
+        "600x500 max",
+        "80x80 crop",
+        "116x116 crop",
+        "400x400 crop",
+    ],
+}
+
+_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, "THUMBNAIL_WORKERS", 2),
+    thread_name_prefix="thumbnails",
+)
+
+
+def parse_spec(spec):
+    """Normalises "WxH" / "WxH crop|max" to (spec, geometry, sorl options)"""
+    parts = spec.split(" ")
+    if len(parts) == 1:
+        parts.append("crop")
+    options = {"quality": 99}
+    if parts[1] == "crop":
+        options["crop"] = "center"
+    return f"{parts[0]} {parts[1]}", parts[0], options
+
+
+def renditions_field(field_name):
+    return f"{field_name}_renditions"
+
+
+def resize(name, spec):
+    """Generate (or fetch from sorl's store) one rendition, returning its URL"""
+    _, geometry, options = parse_spec(spec)
+    return get_thumbnail(name, geometry, **options).url
+
+
+def generate_renditions(instance, field_name):
+    """
+    Generate every rendition of an image field and record the URLs on the
+    instance's <field>_renditions field
+    """
+    name = getattr(instance, field_name).name
+    specs = RENDITIONS[(instance._meta.label_lower, field_name)]
+    renditions = {"source": name}
+    for spec in specs:
+        renditions[spec] = resize(name, spec)
+
+    model = type(instance)
+    # Only record them if the photo hasn't been replaced in the meantime.
+    # update() skips post_save, so this doesn't trigger another run
+    updated = model.objects.filter(pk=instance.pk, **{field_name: name}).update(
+        **{renditions_field(field_name): renditions}
+    )
+    if updated:
+        setattr(instance, renditions_field(field_name), renditions)
+        invalidate_keys(make_key(model._meta.model_name, instance.pk))
+    return renditions
+
+
+def _generate_in_thread(instance, field_name):
+    try:
+        generate_renditions(instance, field_name)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception(
+            "Failed to generate thumbnails for %s #%s",
+            instance._meta.label,
+            instance.pk,
+        )
+    finally:
+        close_old_connections()
+
+
+def needs_renditions(instance, field_name):
+    image = getattr(instance, field_name)
+    renditions = getattr(instance, renditions_field(field_name)) or {}
+    return bool(image) and renditions.get("source") != image.name
+
+
+def schedule_renditions(instance):
+    """
+    Generate an instance's missing renditions in the background once the
+    transaction commits. Called on post_save, so only needed after
+    bulk_create.
+    """
+    if settings.IMAGE_RESIZE_USE_IMAGKIT:
+        return
+    for label, field_name in RENDITIONS:
+        if label == instance._meta.label_lower and needs_renditions(
+            instance, field_name
+        ):
+            # Wait for the commit so the worker can see the new row
+            transaction.on_commit(
+                lambda field_name=field_name: _pool.submit(
+                    _generate_in_thread, instance, field_name
+                )
+            )
+
+
+def _schedule_renditions(sender, instance, **kwargs):
+    schedule_renditions(instance)
+
+
+for _label, _field_name in RENDITIONS:
+    post_save.connect(
+        _schedule_renditions,
+        sender=_label,
+        dispatch_uid=f"thumbnails:{_label}:{_field_name}",
+    )
+
+
+def lookup(image, spec):
+    """
+    URL of a precomputed rendition of an image field file, or None if it
+    hasn't been generated
+    """
+    spec, _, _ = parse_spec(spec)
+    renditions = getattr(image.instance, renditions_field(image.field.name), None)
+    if not renditions or renditions.get("source") != image.name:
+        return None
+    return renditions.get(spec)
@@ -1,13 +1,40 @@
 from __future__ import annotations
+import time
+from datetime import timedelta
+from functools import cache, reduce
 from logging import getLogger
-from functools import cache
+from operator import or_
+
+import requests
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from simple_salesforce import Salesforce
-from simple_salesforce import SalesforceMalformedRequest
 from .. import models
 
 logger = getLogger(__name__)
 
+# Most records the sObject Collections API takes in one request
+COLLECTION_SIZE = 200
+
+# Give up on a contact after this many attempts
+MAX_ATTEMPTS = 5
+
+# A sync claimed this long ago is assumed to belong to a worker that died
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+# Salesforce error codes for being over the org's API limits
+RATE_LIMIT_ERRORS = ("REQUEST_LIMIT_EXCEEDED", "TOO_MANY_REQUESTS")
+
+REQUEST_TIMEOUT = 30
+
+
+class SalesforceRateLimited(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("Salesforce API limit exceeded")
+        self.retry_after = retry_after
+
 
 @cache
 def _salesforce_connection():
@@ -19,37 +46,84 @@ def _salesforce_connection():
     )
 
 
-def _create_contact(salesforce_contact, connection):
-    logger.info("Enter create contact")
+def _login_again():
+    """
+    (base_url, headers, session) of a new connection, after the cached
+    connection's session expired
+    """
+    _salesforce_connection.cache_clear()
+    connection = _salesforce_connection()
+    return connection.base_url, connection.headers, connection.session
 
-    salesforce_contact["FosterProfile"] = "Incomplete"
 
-    try:
-        result = connection.Contact.create(salesforce_contact)
+class ContactClient:
+    """
+    Creates and updates Contacts up to COLLECTION_SIZE at a time with the
+    sObject Collections API, over one pooled session
+    """
+
+    def __init__(self, base_url, headers, session=None, login=None):
+        self._connect(base_url, headers, session or requests.Session())
+        # Called for a new (base_url, headers, session) when Salesforce
+        # says the session is invalid, eg it timed out
+        self.login = login
+
+    def _connect(self, base_url, headers, session):
+        # eg https://<instance>/services/data/v52.0/
+        self.url = f"{base_url}composite/sobjects"
+        self.headers = headers
+        self.session = session
+
+    @classmethod
+    def connect(cls):
+        connection = _salesforce_connection()
+        return cls(
+            connection.base_url,
+            connection.headers,
+            connection.session,
+            login=_login_again,
+        )
 
-        errors = result.get(
-            "errors",
-            [
-                "key_not_found",
-            ],
+    def _send(self, method, records):
+        return self.session.request(
+            method,
+            self.url,
+            headers=self.headers,
+            json={
+                "allOrNone": False,
+                "records": [
+                    {"attributes": {"type": "Contact"}, **record} for record in records
+                ],
+            },
+            timeout=REQUEST_TIMEOUT,
         )
-        if len(errors) > 0:
-            logger.error("Create contact errors: %s", ", ".join(errors))
-            return
 
-        salesforce_id = result.get("id")
-        return salesforce_id
-    except SalesforceMalformedRequest:
-        logger.exception("Unable to create contact")
+    def _save(self, method, records):
+        response = self._send(method, records)
+        if response.status_code == 401 and self.login:
+            # INVALID_SESSION_ID. Log in and send it again, the contacts
+            # weren't at fault so no attempt is used up
+            logger.info("Salesforce session expired, logging in again")
+            self._connect(*self.login())
+            response = self._send(method, records)
+        if response.status_code in (429, 503) or (
+            response.status_code == 403
+            and any(code in response.text for code in RATE_LIMIT_ERRORS)
+        ):
+            retry_after = response.headers.get("Retry-After")
+            raise SalesforceRateLimited(
+                int(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        response.raise_for_status()
+        # A result per record, in order: {"id", "success", "errors"}
+        return response.json()
 
+    def create(self, contacts):
+        return self._save("POST", contacts)
 
-def _update_contact(salesforce_id, salesforce_contact, connection):
-    try:
-        # 204 (no content) results from successful update
-        # exceptions thrown on failure
-        connection.Contact.update(salesforce_id, salesforce_contact)
-    except Exception:
-        logger.exception("Not able to update contact")
+    def update(self, contacts):
+        """contacts must include their "Id" """
+        return self._save("PATCH", contacts)
 
 
 def _user_from_form(user_form):
@@ -67,6 +141,7 @@ def _user_from_form(user_form):
 
 
 def _user_profile_to_salesforce_contact(user_profile: models.UserProfile):
+    fosterer_profile = getattr(user_profile.user, "fostererprofile", None)
     return {
         "FirstName": user_profile.user.first_name,
         "LastName": user_profile.user.last_name,
@@ -74,42 +149,213 @@ def _user_profile_to_salesforce_contact(user_profile: models.UserProfile):
         "MailingCity": user_profile.city,
         "MailingState": user_profile.state,
         "MailingPostalCode": user_profile.zip_code,
+        "FosterProfile": (
+            "Complete"
+            if fosterer_profile and fosterer_profile.is_complete
+            else "Incomplete"
+        ),
     }
 
 
-def update_fosterer_profile_complete(user: models.User):
+def enqueue_contact_sync(user_profile: models.UserProfile):
+    """
+    Queue the profile's Salesforce contact to be created or updated by the
+    sync_salesforce_contacts command, with the profile's details at the
+    time it is sent
+    """
     if not settings.SALESFORCE_ENABLED:
         logger.info("Salesforce not enabled for this environment, skipping")
         return
+    models.SalesforceContactSync.objects.bulk_create(
+        [
+            models.SalesforceContactSync(
+                user_profile=user_profile,
+                status=models.SalesforceContactSync.Statuses.PENDING,
+                version=time.time_ns(),
+                attempts=0,
+                next_attempt_at=timezone.now(),
+                last_error="",
+            )
+        ],
+        update_conflicts=True,
+        unique_fields=["user_profile"],
+        update_fields=[
+            "status",
+            "version",
+            "attempts",
+            "next_attempt_at",
+            "last_error",
+        ],
+    )
+
 
+def update_fosterer_profile_complete(user: models.User):
+    if not settings.SALESFORCE_ENABLED:
+        logger.info("Salesforce not enabled for this environment, skipping")
+        return
     try:
         user_profile = models.UserProfile.objects.get(user=user)
-        connection = _salesforce_connection()
-        connection.Contact.update(
-            user_profile.salesforce_id, {"FosterProfile": "Complete"}
-        )
     except models.UserProfile.DoesNotExist:
         logger.info("Unable to retrieve UserProfile for user %s", user)
-    except Exception:
-        logger.exception("Not able to update contact")
+        return
+    enqueue_contact_sync(user_profile)
 
 
 def create_or_update_contact(user_profile: models.UserProfile):
-    if not settings.SALESFORCE_ENABLED:
-        logger.info("Salesforce not enabled for this environment, skipping")
-        return
+    enqueue_contact_sync(user_profile)
 
-    salesforce_contact = _user_profile_to_salesforce_contact(user_profile)
 
-    if user_profile.salesforce_id is not None:
-        _update_contact(
-            user_profile.salesforce_id, salesforce_contact, _salesforce_connection()
+def claim_syncs(limit):
+    """
+    Mark up to limit due syncs as syncing and return them with their
+    profiles. Rows locked by another worker are skipped.
+    """
+    Sync = models.SalesforceContactSync
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Sync.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Sync.Statuses.PENDING, next_attempt_at__lte=now)
+                | Q(
+                    status=Sync.Statuses.SYNCING,
+                    next_attempt_at__lte=now - CLAIM_TIMEOUT,
+                )
+            )
+            .order_by("next_attempt_at")
+            .values_list("id", flat=True)[:limit]
+        )
+        Sync.objects.filter(id__in=ids).update(
+            status=Sync.Statuses.SYNCING,
+            next_attempt_at=now,
+            attempts=F("attempts") + 1,
+        )
+    return list(
+        Sync.objects.filter(id__in=ids).select_related(
+            "user_profile__user__fostererprofile"
         )
+    )
+
+
+def _fail(sync, error):
+    sync.last_error = error
+    if sync.attempts >= MAX_ATTEMPTS:
+        sync.status = models.SalesforceContactSync.Statuses.FAILED
     else:
-        logger.info("salesforce_id is not present, creating new contact")
-        salesforce_id = _create_contact(salesforce_contact, _salesforce_connection())
-        if salesforce_id:
-            logger.info("salesforce id created")
-            # update profile with salesforce id
-            user_profile.salesforce_id = salesforce_id
-            user_profile.save()
+        sync.status = models.SalesforceContactSync.Statuses.PENDING
+        # 2, 4, 8... minutes
+        sync.next_attempt_at = timezone.now() + timedelta(minutes=2**sync.attempts)
+
+
+def _results_errors(result):
+    return ", ".join(
+        f"{error.get('statusCode')}: {error.get('message')}"
+        for error in result.get("errors") or []
+    )
+
+
+def _chunks(items):
+    return [
+        items[i : i + COLLECTION_SIZE] for i in range(0, len(items), COLLECTION_SIZE)
+    ]
+
+
+def sync_contacts(client, syncs):
+    """
+    Create or update the contacts of a batch of claimed syncs, a collection
+    request at a time, saving new salesforce_ids with bulk_update.
+
+    Returns (synced, failed, deferred, rate_limit): lists of syncs, deferred
+    being those not sent because Salesforce refused a request with
+    rate_limit (a SalesforceRateLimited) part way through.
+    """
+    synced, failed, deferred = [], [], []
+    rate_limit = None
+    created_profiles = []
+    creates = [sync for sync in syncs if not sync.user_profile.salesforce_id]
+    updates = [sync for sync in syncs if sync.user_profile.salesforce_id]
+    batches = [(batch, True) for batch in _chunks(creates)] + [
+        (batch, False) for batch in _chunks(updates)
+    ]
+
+    for batch, is_create in batches:
+        if rate_limit:
+            deferred.extend(batch)
+            continue
+        contacts = [
+            _user_profile_to_salesforce_contact(sync.user_profile) for sync in batch
+        ]
+        try:
+            if is_create:
+                results = client.create(contacts)
+            else:
+                results = client.update(
+                    [
+                        {"Id": sync.user_profile.salesforce_id, **contact}
+                        for sync, contact in zip(batch, contacts)
+                    ]
+                )
+        except SalesforceRateLimited as e:
+            rate_limit = e
+            deferred.extend(batch)
+            continue
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception("Salesforce contact sync request failed")
+            for sync in batch:
+                _fail(sync, f"{type(e).__name__}: {e}")
+            failed.extend(batch)
+            continue
+
+        for sync, result in zip(batch, results):
+            if result.get("success"):
+                if is_create:
+                    sync.user_profile.salesforce_id = result["id"]
+                    created_profiles.append(sync.user_profile)
+                synced.append(sync)
+            else:
+                _fail(sync, _results_errors(result))
+                failed.append(sync)
+
+    # Saved even if rate limited, so created contacts aren't created again
+    models.UserProfile.objects.bulk_update(created_profiles, ["salesforce_id"])
+    return synced, failed, deferred, rate_limit
+
+
+def _save_outcome(synced, failed):
+    Sync = models.SalesforceContactSync
+    if synced:
+        # Unless the profile was queued again while it was being sent
+        Sync.objects.filter(
+            reduce(or_, (Q(pk=sync.pk, version=sync.version) for sync in synced))
+        ).delete()
+    Sync.objects.bulk_update(failed, ["status", "next_attempt_at", "last_error"])
+
+
+def push_pending(client=None, batch_size=1000):
+    """
+    Claim and sync due contacts until none are left. Returns (synced,
+    failed) counts. Raises SalesforceRateLimited if Salesforce refuses
+    requests, after putting the claimed syncs back to be retried.
+    """
+    client = client or ContactClient.connect()
+    synced_count = failed_count = 0
+    while True:
+        syncs = claim_syncs(batch_size)
+        if not syncs:
+            break
+        synced, failed, deferred, rate_limit = sync_contacts(client, syncs)
+        _save_outcome(synced, failed)
+        synced_count += len(synced)
+        failed_count += len(failed)
+        if rate_limit:
+            # Not the contacts' fault, so the attempt doesn't count
+            models.SalesforceContactSync.objects.filter(
+                id__in=[sync.id for sync in deferred]
+            ).update(
+                status=models.SalesforceContactSync.Statuses.PENDING,
+                attempts=F("attempts") - 1,
+                next_attempt_at=timezone.now()
+                + timedelta(seconds=rate_limit.retry_after or 60),
+            )
+            raise rate_limit
+    return synced_count, failed_count
@@ -1,13 +1,16 @@
+from django.db.models import Prefetch
 from django.shortcuts import render, redirect
 from django.http import Http404
-from ..models.animals import Animal, AnimalShortList, AnimalComment
+from ..awg_permissions import is_awg_member
+from ..cached_models import get_animal
+from ..models.animals import Animal, AnimalComment, AnimalSubComment
+from ..shortlist import get_shortlist_ids
 
 
 def view(request, animal_id):
-    try:
-        animal = Animal.objects.get(id=animal_id)
-    except Animal.DoesNotExist as e:
-        raise Http404("Animal not found") from e
+    animal = get_animal(animal_id)
+    if not animal:
+        raise Http404("Animal not found")
 
     awg = animal.awg
     # If the animal listing is not published
@@ -16,31 +19,37 @@ def view(request, animal_id):
     # we redirect
     if (
         (not animal.is_currently_published())
-        and not awg.user_is_member_of_awg(request.user)
+        and not is_awg_member(request, awg)
         and not request.user.is_staff
     ):
         return redirect("/")
 
-    is_shortlisted = False
-    if request.user.id:
-        is_shortlisted = AnimalShortList.objects.filter(
-            user=request.user, animal=animal
-        ).exists()
-
-    comments = (
-        AnimalComment.objects.filter(animal=animal)
-        .prefetch_related("user")
-        .order_by("created_at")
-        .all()
-    )
+    # Only signed in users see comments. The comments and their users, and
+    # all their replies and their users, are two queries however many there are
+    comments = []
+    if request.user.is_authenticated:
+        comments = list(
+            AnimalComment.objects.filter(animal=animal)
+            .select_related("user")
+            .prefetch_related(
+                Prefetch(
+                    "animalsubcomment_set",
+                    queryset=AnimalSubComment.objects.select_related("user").order_by(
+                        "created_at"
+                    ),
+                )
+            )
+            .order_by("created_at")
+        )
 
     context = {
         "animal": animal,
-        "isShortlisted": is_shortlisted,
+        "isShortlisted": animal.id in get_shortlist_ids(request.user),
         "pageTitle": f"{animal.name} | {animal.animal_type.title()}",
         "comments": comments,
         "commentCount": len(comments),
-        "images": animal.animalimage_set.all(),
+        # Listed twice by the template
+        "images": list(animal.animalimage_set.all()),
         "himHer": "her" if animal.sex == Animal.AnimalSex.F else "him",
     }
     return render(request, "animal/view.html", context)
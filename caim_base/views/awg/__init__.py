@@ -1,12 +1,15 @@
 from .animals import (
     add_animal,
     animal_photos,
+    bulk_import_animals,
+    bulk_import_status,
     edit_animal,
     import_animal,
     list_animals,
     publish_animal,
 )
 from .applications import (
+    download_applications,
     list_applications,
     suggest_alternative_animal_modal,
     suggest_alternative_animal_submit,
@@ -4,20 +4,28 @@ from django import forms
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import BadRequest
-from django.core.paginator import Paginator
 from django.forms import DateInput, ModelForm
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods
 
+from caim_base.awg_permissions import AwgPermission
 from caim_base.views.awg.user_permissions import (
     check_awg_user_permissions_update_context,
 )
 
-from ...animal_petfinder_import import ImportAnimalError, import_animal_from_petfinder
+from ...animal_petfinder_import import (
+    ImportAnimalError,
+    import_animal_from_petfinder,
+    queue_petfinder_import,
+    retry_petfinder_import,
+)
 from ...animal_search import query_animals
-from ...models.animals import Animal, AnimalImage
+from ...breed_resolver import breed_resolver
+from ...forms import MultipleFileField, MultipleFileInput
+from ...models.animals import Animal, AnimalImage, PetfinderImport
 from ...models.awg import Awg
+from ...pagination import KeysetPaginator
 
 
 @login_required()
@@ -25,8 +33,7 @@ from ...models.awg import Awg
 def list_animals(request, awg_id):
     awg = get_object_or_404(Awg, pk=awg_id)
 
-    # @todo pagination
-    current_page = 1
+    cursor = request.GET.get("cursor") or None
     npp = 100
 
     query = query_animals(
@@ -35,18 +42,15 @@ def list_animals(request, awg_id):
         hide_unpublished_animals=False,
         hide_unpublished_awgs=False,
     )
-    all_animals = query.all()
-    paginator = Paginator(all_animals, npp)
-    animals = paginator.page(current_page)
+    animals = KeysetPaginator(query, "-created_at", npp).page(cursor)
 
     context = {
         "awg": awg,
         "pageTitle": f"{awg.name} | Manage animals",
         "animals": animals,
-        "paginator": paginator,
     }
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_ANIMALS"], context
+        request, awg, AwgPermission.MANAGE_ANIMALS, context
     )
     return render(request, "awg/manage/animals/list.html", context)
 
@@ -195,7 +199,7 @@ def edit_animal(request, awg_id, animal_id):
         "photos": photos,
     }
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_ANIMALS"], context
+        request, awg, AwgPermission.MANAGE_ANIMALS, context
     )
     return render(request, "awg/manage/animals/edit.html", context)
 
@@ -222,7 +226,7 @@ def add_animal(request, awg_id):
         "form": form,
     }
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_ANIMALS"], context
+        request, awg, AwgPermission.MANAGE_ANIMALS, context
     )
     return render(request, "awg/manage/animals/add.html", context)
 
@@ -306,7 +310,11 @@ def import_animal(request, awg_id):
                 url = request.POST["url"].strip()
                 animal = import_animal_from_petfinder(awg, url)
                 messages.success(request, "Animal imported")
-                if animal.primary_breed.name == "Unknown":
+                if (
+                    not animal.primary_breed
+                    or animal.primary_breed.slug
+                    in breed_resolver.fallback_slugs.values()
+                ):
                     messages.warning(
                         request,
                         "Primary Animal breed is unknown, please update it below.",
@@ -319,3 +327,92 @@ def import_animal(request, awg_id):
 
     context = {"awg": awg, "pageTitle": "Import from petfinder", "form": form}
     return render(request, "awg/manage/animals/import.html", context)
+
+
+class BulkImportForm(forms.Form):
+    urls = forms.CharField(
+        label="Petfinder URLs",
+        widget=forms.Textarea,
+        required=False,
+        help_text="One animal page URL per line",
+    )
+    pages = MultipleFileField(
+        label="Saved Petfinder pages",
+        widget=MultipleFileInput(attrs={"accept": ".html"}),
+        required=False,
+        help_text="Animal pages saved from your browser as HTML",
+    )
+    helper = FormHelper()
+    helper.add_input(Submit("submit", "Import", css_class="btn-primary"))
+    helper.form_method = "POST"
+
+    def clean_urls(self):
+        urls = []
+        for line in self.cleaned_data["urls"].splitlines():
+            url = line.strip()
+            if url and url not in urls:
+                urls.append(url)
+        return urls
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get("urls") and not cleaned_data.get("pages"):
+            raise forms.ValidationError("Enter some URLs or choose some pages")
+        return cleaned_data
+
+
+@login_required()
+@require_http_methods(["GET", "POST"])
+def bulk_import_animals(request, awg_id):
+    awg = get_object_or_404(Awg, pk=awg_id)
+    context = check_awg_user_permissions_update_context(
+        request, awg, AwgPermission.MANAGE_ANIMALS
+    )
+
+    if request.POST:
+        form = BulkImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            petfinder_import = queue_petfinder_import(
+                awg,
+                request.user,
+                form.cleaned_data["urls"],
+                form.cleaned_data["pages"],
+            )
+            return redirect(
+                f"{awg.get_absolute_url()}/animals/import/bulk/{petfinder_import.id}"
+            )
+    else:
+        form = BulkImportForm()
+
+    context.update(
+        {"awg": awg, "pageTitle": "Bulk import from petfinder", "form": form}
+    )
+    return render(request, "awg/manage/animals/bulk_import.html", context)
+
+
+@login_required()
+@require_http_methods(["GET", "POST"])
+def bulk_import_status(request, awg_id, import_id):
+    awg = get_object_or_404(Awg, pk=awg_id)
+    context = check_awg_user_permissions_update_context(
+        request, awg, AwgPermission.MANAGE_ANIMALS
+    )
+    petfinder_import = get_object_or_404(PetfinderImport, pk=import_id, awg=awg)
+
+    if request.method == "POST":
+        # Retry a failed import
+        if not retry_petfinder_import(petfinder_import):
+            raise BadRequest("Only a failed import can be retried")
+        return redirect(request.path)
+
+    context.update(
+        {
+            "awg": awg,
+            "pageTitle": "Bulk import from petfinder",
+            "petfinderImport": petfinder_import,
+            "animals": Animal.objects.filter(
+                id__in=petfinder_import.animal_ids
+            ).order_by("name"),
+        }
+    )
+    return render(request, "awg/manage/animals/bulk_import_status.html", context)
@@ -1,13 +1,16 @@
+import zipfile
 from textwrap import dedent
 from typing import Optional, Tuple
 
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.db.models import QuerySet
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.utils.text import slugify
 from django.views.decorators.http import require_http_methods
 
+from caim_base.awg_permissions import AwgPermission, get_awg_permissions
 from caim_base.models.animals import Animal
 from caim_base.models.awg import Awg
 from caim_base.models.fosterer import (
@@ -19,6 +22,11 @@ from caim_base.notifications import (
     notify_caim_foster_application_accepted,
     notify_caim_foster_application_rejected,
 )
+from caim_base.pdf_rendering import (
+    APPLICATION_PDF_PREFETCH,
+    APPLICATION_PDF_SELECT,
+    iter_application_pdfs,
+)
 from caim_base.views.awg.user_permissions import (
     check_awg_user_permissions_update_context,
 )
@@ -54,12 +62,12 @@ def list_applications(request, awg_id):
     }
     try:
         context = check_awg_user_permissions_update_context(
-            request, awg, ["MANAGE_APPLICATIONS"], context
+            request, awg, AwgPermission.MANAGE_APPLICATIONS, context
         )
     except PermissionDenied:
         try:
             context = check_awg_user_permissions_update_context(
-                request, awg, ["VIEW_APPLICATIONS"], context
+                request, awg, AwgPermission.VIEW_APPLICATIONS, context
             )
         except PermissionDenied as e:
             raise PermissionDenied(
@@ -69,13 +77,93 @@ def list_applications(request, awg_id):
     return render(request, "awg/manage/applications/list.html", context)
 
 
+class ZipStream:
+    """
+    File-like object for zipfile that keeps what is written until it's
+    taken, so an archive can be streamed as it is built
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def application_pdf_filename(application: FosterApplication):
+    fosterer = application.fosterer
+    name = slugify(
+        f"{fosterer.lastname} {fosterer.firstname} {application.animal.name}"
+    )
+    return f"{name}-{application.id}.pdf"
+
+
+@login_required()
+@require_http_methods(["GET"])
+def download_applications(request, awg_id):
+    """
+    A ZIP of the PDFs of the applications in the list, with the same
+    filters. The PDFs are rendered in parallel and each is sent as soon as
+    it's ready.
+    """
+    awg = get_object_or_404(Awg, pk=awg_id)
+    if not get_awg_permissions(request, awg) & (
+        AwgPermission.MANAGE_APPLICATIONS | AwgPermission.VIEW_APPLICATIONS
+    ):
+        raise PermissionDenied(
+            "User does not have permissions to view or manage applications"
+        )
+
+    applications = (
+        query_applications_for_awg(awg, status=request.GET.get("status", None))
+        .select_related(*APPLICATION_PDF_SELECT)
+        .prefetch_related(*APPLICATION_PDF_PREFETCH)
+    )
+    pdfs = iter_application_pdfs(applications)
+
+    def stream():
+        output = ZipStream()
+        failed = []
+        # PDFs are already compressed
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) as archive:
+            for application, pdf in pdfs:
+                if pdf is None:
+                    failed.append(application_pdf_filename(application))
+                    continue
+                archive.writestr(application_pdf_filename(application), pdf)
+                yield output.take()
+            if failed:
+                archive.writestr(
+                    "errors.txt",
+                    "These applications couldn't be downloaded, please try"
+                    " again or download them one at a time:\n" + "\n".join(failed),
+                )
+        yield output.take()
+
+    filename = f"{slugify(awg.name)}-applications.zip"
+    return StreamingHttpResponse(
+        stream(),
+        content_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @login_required()
 @require_http_methods(["POST"])
 def update_application_status_submit_modal(request, awg_id, application_id):
     awg = get_object_or_404(Awg, pk=awg_id)
 
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_APPLICATIONS"]
+        request, awg, AwgPermission.MANAGE_APPLICATIONS
     )
     application: FosterApplication = get_object_or_404(
         FosterApplication, id=application_id, animal__awg=awg
@@ -128,7 +216,7 @@ def update_application_status_submit_modal(request, awg_id, application_id):
 def update_application_status_modal(request, awg_id, application_id, status):
     awg: Awg = get_object_or_404(Awg, pk=awg_id)
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_APPLICATIONS"]
+        request, awg, AwgPermission.MANAGE_APPLICATIONS
     )
     application: FosterApplication = get_object_or_404(
         FosterApplication, id=application_id, animal__awg=awg
@@ -158,7 +246,7 @@ def update_application_status_modal(request, awg_id, application_id, status):
 def suggest_alternative_animal_modal(request, awg_id, application_id):
     awg: Awg = get_object_or_404(Awg, pk=awg_id)
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_APPLICATIONS"]
+        request, awg, AwgPermission.MANAGE_APPLICATIONS
     )
     application: FosterApplication = get_object_or_404(
         FosterApplication, id=application_id, animal__awg=awg
@@ -183,7 +271,7 @@ def suggest_alternative_animal_modal(request, awg_id, application_id):
 def suggest_alternative_animal_submit(request, awg_id, application_id):
     awg: Awg = get_object_or_404(Awg, pk=awg_id)
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_APPLICATIONS"]
+        request, awg, AwgPermission.MANAGE_APPLICATIONS
     )
     application: FosterApplication = get_object_or_404(
         FosterApplication, id=application_id, animal__awg=awg
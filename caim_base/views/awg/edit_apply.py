@@ -8,6 +8,7 @@ from django.http import Http404
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
+from ...awg_permissions import AwgPermission, get_awg_permissions
 from ...models.awg import Awg, AwgMember
 from ...notifications import notify_new_awg_application
 
@@ -137,8 +138,8 @@ def edit(request, awg_id):
     except Awg.DoesNotExist as e:
         raise Http404("Awg not found") from e
 
-    current_user_permissions = awg.get_permissions_for_user(request.user)
-    if "EDIT_PROFILE" not in current_user_permissions:
+    current_user_permissions = get_awg_permissions(request, awg)
+    if AwgPermission.EDIT_PROFILE not in current_user_permissions:
         raise PermissionDenied("User does not have permission to edit this AWG")
 
     if request.POST:
@@ -148,8 +149,6 @@ def edit(request, awg_id):
     else:
         form = AwgForm(instance=awg)
 
-    current_user_permissions = awg.get_permissions_for_user(request.user)
-
     context = {
         "awg": awg,
         "pageTitle": f"{awg.name} | Edit profile",
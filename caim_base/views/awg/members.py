@@ -4,6 +4,7 @@ from django.core.exceptions import BadRequest
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods
 
+from caim_base.awg_permissions import AwgPermission
 from caim_base.views.awg.user_permissions import (
     check_awg_user_permissions_update_context,
 )
@@ -24,7 +25,7 @@ def list_members(request, awg_id):
         "members": members,
     }
     context = check_awg_user_permissions_update_context(
-        request, awg, ["MANAGE_MEMBERS"], context
+        request, awg, AwgPermission.MANAGE_MEMBERS, context
     )
     return render(request, "awg/manage/members/list.html", context)
 
@@ -33,7 +34,9 @@ def list_members(request, awg_id):
 @require_http_methods(["POST"])
 def add_member(request, awg_id):
     awg = get_object_or_404(Awg, pk=awg_id)
-    _ = check_awg_user_permissions_update_context(request, awg, ["MANAGE_MEMBERS"])
+    _ = check_awg_user_permissions_update_context(
+        request, awg, AwgPermission.MANAGE_MEMBERS
+    )
 
     try:
         email = request.POST.get("email")
@@ -87,7 +90,9 @@ def add_member(request, awg_id):
 @require_http_methods(["POST"])
 def update_member(request, awg_id):
     awg = get_object_or_404(Awg, pk=awg_id)
-    _ = check_awg_user_permissions_update_context(request, awg, ["MANAGE_MEMBERS"])
+    _ = check_awg_user_permissions_update_context(
+        request, awg, AwgPermission.MANAGE_MEMBERS
+    )
     member_id = request.POST["membershipId"]
     action = request.POST["action"]
 
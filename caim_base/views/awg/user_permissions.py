@@ -1,22 +1,22 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Optional
 from django.core.exceptions import PermissionDenied
 
+from caim_base.awg_permissions import AwgPermission, get_awg_permissions
 from caim_base.models.awg import Awg
 
 
 def check_awg_user_permissions_update_context(
     request,
     awg: Awg,
-    required_permissions: Optional[List[str]],
+    required_permissions: Optional[AwgPermission],
     context: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     context = context if context is not None else {}
-    current_user_permissions = awg.get_permissions_for_user(request.user)
+    current_user_permissions = get_awg_permissions(request, awg)
 
     if required_permissions is not None:
-        for perm in required_permissions:
-            if perm not in current_user_permissions:
-                raise PermissionDenied("User does not have all required permissions")
+        if required_permissions not in current_user_permissions:
+            raise PermissionDenied("User does not have all required permissions")
 
     if "currentUserPermissions" in context.keys():
         if context["currentUserPermissions"] != current_user_permissions:
@@ -1,10 +1,12 @@
 from logging import getLogger
 
-from django.core.paginator import Paginator
 from django.shortcuts import render
 
-from ..animal_search import query_animals
-from ..models.animals import AnimalShortList, AnimalType, Breed, SavedSearch
+from ..animal_search import load_animals, search_animals
+from ..breed_resolver import breed_resolver
+from ..facets import get_facets
+from ..models.animals import AnimalType, SavedSearch
+from ..pagination import KeysetPaginator
 
 logger = getLogger(__name__)
 
@@ -35,9 +37,7 @@ def view(request):
     else:
         animal_type = None
 
-    breeds = Breed.objects.all()
-    if animal_type:
-        breeds = breeds.filter(animal_type=animal_type)
+    breeds = breed_resolver.choices(animal_type)
 
     search = {
         "animal_type": animal_type,
@@ -53,34 +53,35 @@ def view(request):
         "goodwith_dogs": request.GET.get("goodwith_dogs", "") == "on",
         "goodwith_kids": request.GET.get("goodwith_kids", "") == "on",
         "shortlist": request.GET.get("shortlist", "") == "on",
+        "q": request.GET.get("q", "").strip(),
     }
+    if search["q"] and "sort" not in request.GET:
+        search["sort"] = "-rank"
     if not search["zip"] and search["sort"] == "distance":
         search["sort"] = "-created_at"
+    if not search["q"] and search["sort"] == "-rank":
+        search["sort"] = "-created_at"
 
-    current_page = int(request.GET.get("page", 1))
+    cursor = request.GET.get("cursor") or None
     npp = int(request.GET.get("limit", 21))
 
-    query = query_animals(request.user, **search)
+    query = search_animals(request.user, **search)
 
     if request.user.is_authenticated:
-        shortlists = AnimalShortList.objects.filter(user=request.user.id)
-        shortlist_animal_ids = [s.animal_id for s in shortlists]
         saved_searches = SavedSearch.objects.filter(user=request.user.id)
     else:
-        shortlist_animal_ids = []
         saved_searches = []
 
-    all_animals = query.all()
-    paginator = Paginator(all_animals, npp)
-    animals = paginator.page(current_page)
+    animals = KeysetPaginator(query, search["sort"], npp, load=load_animals).page(
+        cursor
+    )
 
     context = {
         "animals": animals,
+        "facets": get_facets(request.user, search),
         "search": search,
         "breeds": breeds,
         "pageTitle": "Browse animals",
-        "shortlistAnimalIds": shortlist_animal_ids,
-        "paginator": paginator,
         "savedSearches": saved_searches,
         "animal_type": animal_type,
         "animal_types": dict(AnimalType.choices),
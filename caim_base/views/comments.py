@@ -9,7 +9,7 @@ from ..models.animals import Animal, AnimalComment, AnimalSubComment
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 
-from ..notifications import notify_animal_comment, notify_animal_comment_reply
+from ..outbox import enqueue_notification
 
 
 @login_required()
@@ -26,10 +26,7 @@ def add(request):
     comment = AnimalComment(user=request.user, animal=animal, body=body)
     comment.save()
 
-    # try:
-    notify_animal_comment(comment)
-    # except:
-    #    print("Could not send notifications")
+    enqueue_notification("notify_animal_comment", comment)
 
     return redirect(f"{animal.get_absolute_url()}#comment-{comment.id}")
 
@@ -104,8 +101,10 @@ class CreateSubComment(LoginRequiredMixin, CreateView):
             form.instance.comment = comment
             form.instance.user = self.request.user
             form.instance.body = self.request.POST.get("body")
-            notify_animal_comment_reply(form.instance)
-        return super(CreateSubComment, self).form_valid(form)
+        response = super(CreateSubComment, self).form_valid(form)
+        if is_ajax:
+            enqueue_notification("notify_animal_comment_reply", form.instance)
+        return response
 
     def get_success_url(self):
         comment = AnimalComment.objects.get(pk=self.kwargs["comment_id"])
@@ -1,27 +1,18 @@
-import logging
-import os
 from urllib.parse import quote
 
-from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
-from django.db.models import QuerySet
 from django.http import Http404, HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.template.loader import render_to_string
 from django.views.decorators.http import require_http_methods
-from weasyprint import CSS, HTML
 
-from ..models import TypeOfAnimals
 from ..models.animals import Animal
 from ..models.awg import Awg, AwgMember
-from ..models.fosterer import (
-    FosterApplication,
-    FostererExistingPetDetail,
-    FostererPersonInHomeDetail,
-    FostererProfile,
-    FostererReferenceDetail,
-)
+from ..models.fosterer import FosterApplication, FostererProfile
+from ..pdf_rendering import get_application_pdf
+
+# Seconds between reloads while a PDF is being rendered
+PDF_PENDING_REFRESH = 2
 
 
 @login_required()
@@ -117,72 +108,17 @@ def download_foster_application(request: HttpRequest) -> HttpResponse:
         FosterApplication, fosterer=fosterer, animal=animal
     )
 
-    existing_animals: QuerySet[
-        FostererExistingPetDetail
-    ] = FostererExistingPetDetail.objects.filter(fosterer_profile=fosterer)
-    references: QuerySet[
-        FostererReferenceDetail
-    ] = FostererReferenceDetail.objects.filter(fosterer_profile=fosterer)
-    people_in_home: QuerySet[
-        FostererPersonInHomeDetail
-    ] = FostererPersonInHomeDetail.objects.filter(fosterer_profile=fosterer)
-
-    animal_type_labels = []
-    if fosterer.type_of_animals:
-        animal_type_labels = [
-            TypeOfAnimals(animal_type).label for animal_type in fosterer.type_of_animals
-        ]
-
-    category_of_animals_labels = []
-    if fosterer.category_of_animals:
-        category_of_animals_labels = [
-            fosterer.CategoryOfAnimals(category).label
-            for category in fosterer.category_of_animals
-        ]
-
-    dog_size_labels = []
-    if fosterer.dog_size:
-        dog_size_labels = [
-            fosterer.DogSize(dog_size).label for dog_size in fosterer.dog_size
-        ]
-
-    behaviour_labels = []
-    if fosterer.behavioural_attributes:
-        behaviour_labels = [
-            fosterer.BehaviouralAttributes(behaviour).label
-            for behaviour in fosterer.behavioural_attributes
-        ]
-
-    experience_categories_labels = []
-    if fosterer.experience_categories:
-        experience_categories_labels = [
-            fosterer.ExperienceCategories(experience).label
-            for experience in fosterer.experience_categories
-        ]
-
-    context = {
-        "application": foster_application,
-        "existing_animals": existing_animals,
-        "references": references,
-        "people_in_home": people_in_home,
-        "animal_type_labels": animal_type_labels,
-        "dog_size_labels": dog_size_labels,
-        "category_of_animals_labels": category_of_animals_labels,
-        "behaviour_labels": behaviour_labels,
-        "experience_categories_labels": experience_categories_labels,
-    }
-
-    pdf_string = render_to_string("fosterer_profile/pdf.html", context, request)
-    pdf_file = HTML(string=pdf_string).write_pdf(
-        stylesheets=[
-            CSS(string="@page { size: letter portrait; margin: 1cm }"),
-            CSS(filename=os.path.join(settings.STATIC_ROOT, "vendor/normalize.css")),
-            CSS(filename=os.path.join(settings.STATIC_ROOT, "css/pdf.css")),
-        ]
-    )
-
-    response = HttpResponse(pdf_file, content_type="application/pdf")
+    pdf = get_application_pdf(foster_application)
+    if pdf is None:
+        # Being rendered, the page reloads until it's ready
+        response = render(
+            request,
+            "fosterer_profile/pdf_pending.html",
+            {"pageTitle": "Foster Application"},
+            status=202,
+        )
+        response["Refresh"] = str(PDF_PENDING_REFRESH)
+        return response
+    response = HttpResponse(pdf, content_type="application/pdf")
     response["Content-Disposition"] = f"filename=fosterer-profile-{fosterer_id}.pdf"
-    for a in existing_animals:
-        logging.info("animal spayed_neutered is %s", a.spayed_neutered)
     return response
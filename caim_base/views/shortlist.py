@@ -1,6 +1,7 @@
 from django.core.exceptions import BadRequest
 from django.http import JsonResponse
-from ..models.animals import Animal, AnimalShortList
+from ..models.animals import Animal
+from ..shortlist import set_shortlisted
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 
@@ -14,12 +15,6 @@ def api(request):
     user = request.user
     if not user or not animal:
         raise BadRequest("Params invalid")
-    if request.POST["isSet"] == "true":
-        a = AnimalShortList(user=user, animal=animal)
-        a.save()
-    else:
-        a = AnimalShortList.objects.filter(user=user, animal=animal).first()
-        if a:
-            a.delete()
+    set_shortlisted(user, animal, request.POST["isSet"] == "true")
 
     return JsonResponse({"ok": True})
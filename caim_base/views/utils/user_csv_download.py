@@ -1,73 +1,101 @@
 import csv
-from django.http import HttpResponse
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
 from ...models.user import User, UserProfile
 from ...models.fosterer import FostererProfile
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.decorators import user_passes_test
 
+HEADER = [
+    "UserId",
+    "Email",
+    "UserName",
+    "DateJoined",
+    "DateLastLogin",
+    "HasUserProfile",
+    "HasFostererProfile",
+    "HasAWGMembership",
+    "AWG_Ein",
+    "AWG_Name",
+    "AWG_Type",
+]
 
-# Download a list of users for upload to salesforce
-@login_required()
-@user_passes_test(lambda u: u.is_superuser)
-def view(request):
-    response = HttpResponse(
-        content_type="text/csv",
-        headers={"Content-Disposition": 'attachment; filename="caim-user-list.csv"'},
-    )
+CHUNK_SIZE = 2000
 
-    writer = csv.writer(response)
-    writer.writerow(
-        [
-            "UserId",
-            "Email",
-            "UserName",
-            "DateJoined",
-            "DateLastLogin",
-            "HasUserProfile",
-            "HasFostererProfile",
-            "HasAWGMembership",
-            "AWG_Ein",
-            "AWG_Name",
-            "AWG_Type",
-        ]
-    )
 
-    users = User.objects.all()
-    for user in users:
-        try:
-            user_profile = UserProfile.objects.get(user=user)
-        except UserProfile.DoesNotExist:
-            user_profile = None
+class Echo:
+    """File-like object for csv.writer that returns rows instead of storing them"""
 
-        try:
-            fosterer_profile = FostererProfile.objects.get(user=user)
-        except FostererProfile.DoesNotExist:
-            fosterer_profile = None
+    def write(self, value):
+        return value
 
-        awg_memberships = user.awgmember_set.all()
 
-        basic_row = [
-            user.id,
-            user.email,
-            user.username,
-            user.date_joined,
-            user.last_login,
-            "TRUE" if user_profile else "FALSE",
-            "TRUE" if fosterer_profile else "FALSE",
+def user_rows():
+    """
+    One query, read CHUNK_SIZE rows at a time: a row per AWG membership, or
+    one row for a user with no memberships
+    """
+    users = (
+        User.objects.annotate(
+            has_user_profile=Exists(UserProfile.objects.filter(user=OuterRef("pk"))),
+            has_fosterer_profile=Exists(
+                FostererProfile.objects.filter(user=OuterRef("pk"))
+            ),
+        )
+        .order_by("id", "awgmember__id")
+        .values_list(
+            "id",
+            "email",
+            "username",
+            "date_joined",
+            "last_login",
+            "has_user_profile",
+            "has_fosterer_profile",
+            "awgmember__id",
+            "awgmember__awg__company_ein",
+            "awgmember__awg__name",
+            "awgmember__awg__awg_type",
+        )
+    )
+    for (
+        *basic_row,
+        has_user_profile,
+        has_fosterer_profile,
+        membership_id,
+        ein,
+        name,
+        awg_type,
+    ) in users.iterator(chunk_size=CHUNK_SIZE):
+        basic_row += [
+            "TRUE" if has_user_profile else "FALSE",
+            "TRUE" if has_fosterer_profile else "FALSE",
         ]
-
-        if len(awg_memberships):
-            for awg_membership in awg_memberships:
-                writer.writerow(
-                    [
-                        *basic_row,
-                        "TRUE",
-                        awg_membership.awg.company_ein,
-                        awg_membership.awg.name,
-                        awg_membership.awg.awg_type,
-                    ]
-                )
+        if membership_id:
+            yield [*basic_row, "TRUE", ein, name, awg_type]
         else:
-            writer.writerow([*basic_row, "FALSE"])
+            yield [*basic_row, "FALSE"]
 
-    return response
+
+# Download a list of users for upload to salesforce
+@login_required()
+@user_passes_test(lambda u: u.is_superuser)
+def view(request):
+    # Written as it is read, so memory use doesn't grow with the number of
+    # users
+    writer = csv.writer(Echo())
+
+    def stream():
+        lines = [writer.writerow(HEADER)]
+        # Send a few hundred rows at a time rather than one per write
+        for row in user_rows():
+            lines.append(writer.writerow(row))
+            if len(lines) >= 500:
+                yield "".join(lines)
+                lines = []
+        yield "".join(lines)
+
+    return StreamingHttpResponse(
+        stream(),
+        content_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="caim-user-list.csv"'},
+    )
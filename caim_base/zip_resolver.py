@@ -0,0 +1,130 @@
+import logging
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Optional, Tuple
+
+from django.contrib.gis.geos import Point
+from django.db.models import F, FloatField, Func
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import cache_aside, invalidate_namespace, versioned_key
+from .models.geo import ZipCode
+
+logger = logging.getLogger(__name__)
+
+
+class ZipResolver:
+    """
+    Resolves ZIP codes to locations from an in-memory copy of the ZipCode table.
+
+    The table is loaded once per process into parallel arrays: sorted 5 digit
+    ZIPs as ints, plus float32 latitudes and longitudes. That is 12 bytes per
+    ZIP (~500KB for the ~42k US ZIPs) and a lookup is a binary search, versus
+    a database round trip per lookup through the ORM.
+
+    The table is also kept in the shared cache, so a process starting up
+    doesn't have to read the whole ZipCode table from the database.
+
+    Saving or deleting a ZipCode invalidates the copy in the current process
+    and the shared cache. Other processes reload after max_age seconds.
+    """
+
+    max_age = 60 * 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        # (zips, lats, lngs, other) - swapped in as one tuple so readers never
+        # see a partially loaded table
+        self._table = (array("i"), array("f"), array("f"), {})
+
+    def invalidate(self):
+        invalidate_namespace("zipcodes")
+        self._loaded_at = None
+
+    def _is_fresh(self):
+        return (
+            self._loaded_at is not None
+            and time.monotonic() - self._loaded_at < self.max_age
+        )
+
+    def _ensure_loaded(self):
+        if self._is_fresh():
+            return
+        with self._lock:
+            if not self._is_fresh():
+                self._load()
+
+    def _load(self):
+        self._table = cache_aside(
+            versioned_key("zipcodes", "table"), self._load_table, 24 * 60 * 60
+        )
+        self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _load_table():
+        rows = ZipCode.objects.annotate(
+            lat=Func(F("geo_location"), function="ST_Y", output_field=FloatField()),
+            lng=Func(F("geo_location"), function="ST_X", output_field=FloatField()),
+        ).values_list("zip_code", "lat", "lng")
+
+        numeric = []
+        # Anything that isn't a plain 5 digit ZIP is kept in a dict
+        other = {}
+        for zip_code, lat, lng in rows:
+            if len(zip_code) == 5 and zip_code.isdigit():
+                numeric.append((int(zip_code), lat, lng))
+            else:
+                other[zip_code] = (lat, lng)
+        numeric.sort()
+
+        logger.info("Loaded %d ZIP codes", len(numeric) + len(other))
+        return (
+            array("i", (row[0] for row in numeric)),
+            array("f", (row[1] for row in numeric)),
+            array("f", (row[2] for row in numeric)),
+            other,
+        )
+
+    def memory_usage(self) -> int:
+        """Approximate bytes used by the loaded table"""
+        zips, lats, lngs, other = self._table
+        arrays = sum(a.itemsize * len(a) for a in (zips, lats, lngs))
+        return arrays + sys.getsizeof(other)
+
+    def lookup(self, zip_code) -> Optional[Tuple[float, float]]:
+        """Returns (lat, lng) for the ZIP, or None if it is unknown"""
+        if not zip_code:
+            return None
+        zip_code = str(zip_code).strip()
+        self._ensure_loaded()
+        zips, lats, lngs, other = self._table
+        if len(zip_code) == 5 and zip_code.isdigit():
+            key = int(zip_code)
+            i = bisect_left(zips, key)
+            if i < len(zips) and zips[i] == key:
+                return lats[i], lngs[i]
+            return None
+        return other.get(zip_code)
+
+    def get_point(self, zip_code) -> Optional[Point]:
+        location = self.lookup(zip_code)
+        if location is None:
+            return None
+        return Point(location[1], location[0], srid=4326)
+
+    def is_valid(self, zip_code) -> bool:
+        return self.lookup(zip_code) is not None
+
+
+zip_resolver = ZipResolver()
+
+
+@receiver(post_save, sender=ZipCode)
+@receiver(post_delete, sender=ZipCode)
+def invalidate_zip_resolver(sender, **kwargs):
+    zip_resolver.invalidate()
@@ -1,5 +1,18 @@
 #!/usr/bin/env sh
 
+if [ -z "$REDIS_URL" ] && [ -z "$CACHE_BACKEND" ]; then
+    # Each gunicorn worker then has its own cache, see CACHE_MAX_TIMEOUT
+    echo "REDIS_URL is not set, using a per-process cache" >&2
+fi
+
 python manage.py migrate
 python manage.py collectstatic --no-input
+# Sends queued notification emails
+python manage.py deliver_outbox &
+# Runs Petfinder bulk imports queued from the website
+python manage.py run_petfinder_imports &
+# Runs the saved search digest when the hourly cron rule requests it
+python manage.py run_saved_search_digests &
+# Pushes profile changes to Salesforce, exits if Salesforce isn't enabled
+python manage.py sync_salesforce_contacts &
 gunicorn --bind :8000 --workers 2 caim.wsgi:application
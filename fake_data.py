@@ -13,7 +13,10 @@ from django.core.files import File
 from django.db import transaction
 from faker import Faker
 
-from caim_base.models.animals import Animal, AnimalImage, AnimalType, Breed, ZipCode
+from caim_base.breed_resolver import breed_resolver
+from caim_base.zip_resolver import zip_resolver
+from caim_base.models.animals import Animal, AnimalImage, AnimalType, Breed
+from caim_base.models.geo import ZipCode
 from caim_base.models.awg import Awg, AwgMember
 from caim_base.models.fosterer import (
     FosterApplication,
@@ -45,6 +48,8 @@ def load_zips():
             zips.append(p)
 
         ZipCode.objects.bulk_create(zips)
+    # bulk_create doesn't send post_save
+    zip_resolver.invalidate()
 
 
 def load_breeds(animal_type, file_name):
@@ -98,10 +103,6 @@ def map_sex(v):
     return None
 
 
-def lookup_breed(pfbreed):
-    return Breed.objects.filter(slug=pfbreed["slug"]).first()
-
-
 def upsert_awg(name, pf_id, city, state, zip, lat, lng):
     awg = Awg.objects.filter(petfinder_id=pf_id).first()
     if not awg:
@@ -120,9 +121,20 @@ def upsert_awg(name, pf_id, city, state, zip, lat, lng):
 
 
 def load_animals(animal_type, file_name):
+    animal_type = AnimalType(animal_type.upper())
     f = open(file_name)
     animals = json.load(f)
 
+    breed_ids = breed_resolver.resolve_many(
+        {
+            a["animal"][key]["slug"]
+            for a in animals.values()
+            for key in ("primary_breed", "secondary_breed")
+            if a["animal"].get(key)
+        },
+        animal_type,
+    )
+
     for hash_id in animals:
         try:
             a = animals[hash_id]
@@ -131,12 +143,12 @@ def load_animals(animal_type, file_name):
             print(a)
             print(aa)
 
-            primary_breed = None
-            secondary_breed = None
-            if "primary_breed" in aa and aa["primary_breed"]:
-                primary_breed = lookup_breed(aa["primary_breed"])
-            if "secondary_breed" in aa and aa["secondary_breed"]:
-                secondary_breed = lookup_breed(aa["primary_breed"])
+            primary_breed_id = None
+            secondary_breed_id = None
+            if aa.get("primary_breed"):
+                primary_breed_id = breed_ids[aa["primary_breed"]["slug"]]
+            if aa.get("secondary_breed"):
+                secondary_breed_id = breed_ids[aa["secondary_breed"]["slug"]]
 
             aorg = a["organization"]
             awg_pf_id = aorg["display_id"]
@@ -154,9 +166,9 @@ def load_animals(animal_type, file_name):
             print(aa)
             a = Animal(
                 name=aa["name"],
-                animal_type=AnimalType.DOG,
-                primary_breed=primary_breed,
-                secondary_breed=secondary_breed,
+                animal_type=animal_type,
+                primary_breed_id=primary_breed_id,
+                secondary_breed_id=secondary_breed_id,
                 petfinder_id=pf_id,
                 is_published=True,
                 awg_id=awg.id,